@@ -1,65 +1,157 @@
 #!/usr/bin/env python
 
+import argparse
 import logging
+import signal
+import sys
+from typing import List, Optional, Union
 
 import discord
-from discord.ext.commands import when_mentioned_or
 
 # Set the event loop policies here so any subsequent `new_event_loop()`
 # calls, in particular those as a result of the following imports,
 # return the correct loop object.
 from obsidion import _update_event_loop_policy, constants
-from obsidion.bot import Obsidion
+from obsidion.bot import ExitCodes, Obsidion, guild_prefix
+from obsidion.cluster import ClusterClient, Launcher
+from obsidion.streams import StreamGateway, StreamWorker
 
 _update_event_loop_policy()
 
 
 log = logging.getLogger("obsidion.main")
 
-# set activity
-activity = discord.Activity(
-    name=constants.Bot.status,
-    type=discord.ActivityType.watching,
-)
-
-intents = discord.Intents.none()
-intents.messages = True
-intents.guilds = True
-
-mentions = discord.AllowedMentions(
-    everyone=False,
-)
-
-bot = Obsidion(
-    case_insensitive=True,
-    activity=activity,
-    command_prefix=when_mentioned_or(constants.Bot.default_prefix),
-    allowed_mentions=mentions,
-    intents=intents,
-)
-
-# Load all required cogs
-
-# core cogs
-bot.load_extension("obsidion.core.development")
-bot.load_extension("obsidion.core.help")
-bot.load_extension("obsidion.core.error_handler")
-
-# extensions and main features
-bot.load_extension("obsidion.cogs.fun")
-bot.load_extension("obsidion.cogs.hypixel")
-bot.load_extension("obsidion.cogs.images")
-bot.load_extension("obsidion.cogs.info")
-bot.load_extension("obsidion.cogs.misc")
-# bot.load_extension("obsidion.cogs.rcon")
-bot.load_extension("obsidion.cogs.redstone")
-bot.load_extension("obsidion.cogs.servers")
-bot.load_extension("obsidion.cogs.events")
-bot.load_extension("obsidion.cogs.config")
-# bot.load_extension("obsidion.cogs.minecraft")
-
-if constants.Discord_bot_list.voting_enabled:
-    bot.load_extension("cogs.botlist")
-
-# run bot
-bot.run(constants.Bot.discord_token)
+
+def create_bot(
+    cluster: Optional[ClusterClient] = None,
+    shard_ids: Optional[List[int]] = None,
+    shard_count: Optional[int] = None,
+    streams: Optional[Union[StreamGateway, StreamWorker]] = None,
+) -> Obsidion:
+    """Create the bot, for every shard or just the given ones."""
+    # set activity
+    activity = discord.Activity(
+        name=constants.Bot.status,
+        type=discord.ActivityType.watching,
+    )
+
+    intents = discord.Intents.none()
+    intents.messages = True
+    intents.guilds = True
+
+    mentions = discord.AllowedMentions(
+        everyone=False,
+    )
+
+    return Obsidion(
+        case_insensitive=True,
+        activity=activity,
+        command_prefix=guild_prefix,
+        allowed_mentions=mentions,
+        intents=intents,
+        cluster=cluster,
+        shard_ids=shard_ids,
+        shard_count=shard_count,
+        streams=streams,
+        lean=constants.Bot.lean,
+    )
+
+
+def load_extensions(
+    bot: Obsidion, *, interactions: bool = False, defer: bool = True
+) -> None:
+    """Load the configured cogs.
+
+    Args:
+        bot (Obsidion): bot to load them into
+        interactions (bool): whether the bot serves the interactions endpoint
+        defer (bool): leave the deferred extensions until the bot is ready
+    """
+    extensions = constants.Extensions.load
+    gateway_extensions = constants.Streams.gateway_extensions
+    if isinstance(bot.streams, StreamGateway):
+        # the error handler is needed on both sides, and so is the history
+        # since the monitor and the workers both ping servers
+        extensions = [
+            "obsidion.core.error_handler",
+            "obsidion.cogs.history",
+        ] + gateway_extensions
+    elif interactions or isinstance(bot.streams, StreamWorker):
+        # no gateway connection, so nothing that needs the guild cache
+        extensions = [e for e in extensions if e not in gateway_extensions]
+    for extension in extensions:
+        if defer and extension in constants.Extensions.deferred:
+            bot.deferred_extensions.append(extension)
+        else:
+            bot.load_extension(extension)
+
+    # bot lists get the total of every cluster and the vote webhook can
+    # only listen in one process
+    primary = bot.cluster is None or bot.cluster.is_primary
+    if (
+        constants.Discord_bot_list.voting_enabled
+        and primary
+        and not interactions
+        and not isinstance(bot.streams, StreamWorker)
+    ):
+        bot.load_extension("obsidion.cogs.botlist")
+
+
+def run_bot(
+    cluster: Optional[ClusterClient] = None,
+    shard_ids: Optional[List[int]] = None,
+    shard_count: Optional[int] = None,
+) -> None:
+    bot = create_bot(cluster, shard_ids, shard_count)
+    load_extensions(bot)
+    bot.run(constants.Bot.discord_token)
+    # a worker stopped by a signal instead of the shutdown command has not
+    # been shut down on purpose, so the launcher has to start it again
+    sys.exit(bot.exit_code(ExitCodes.RESTART if cluster else ExitCodes.SHUTDOWN))
+
+
+def run_worker() -> None:
+    """Run stream commands without connecting to the gateway."""
+    worker = StreamWorker()
+    bot = create_bot(streams=worker)
+    load_extensions(bot)
+    loop = bot.loop
+    # stop reading the stream and finish what was read, then close below
+    loop.add_signal_handler(signal.SIGTERM, lambda: loop.create_task(bot.drain()))
+    try:
+        loop.run_until_complete(worker.run(bot, constants.Bot.discord_token))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(bot.close())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="obsidion")
+    parser.add_argument(
+        "role",
+        nargs="?",
+        choices=["bot", "gateway", "worker"],
+        default="bot",
+        help="gateway and worker split the bot over a Redis stream",
+    )
+    role = parser.parse_args().role
+
+    if role != "bot" and not constants.Redis.enabled:
+        log.critical("The gateway and workers need Redis, enable it in the config")
+        raise SystemExit(1)
+    if role == "gateway":
+        bot = create_bot(streams=StreamGateway())
+        load_extensions(bot)
+        bot.run(constants.Bot.discord_token)
+        sys.exit(bot.exit_code(ExitCodes.SHUTDOWN))
+    elif role == "worker":
+        run_worker()
+    elif constants.Cluster.enabled:
+        Launcher().run()
+    else:
+        run_bot()
+
+
+if __name__ == "__main__":
+    main()
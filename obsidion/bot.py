@@ -1,30 +1,117 @@
 import asyncio
 import datetime
+import importlib
 import logging
+import re
+import signal
 import socket
-import sys
+import time
 from enum import IntEnum
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Pattern, Set, Union
 
 import aiohttp
 import aioredis
 import discord
 import fakeredis.aioredis
 from discord.ext import commands
+from discord.gateway import DiscordWebSocket
+from discord.shard import Shard
 import asyncpg
 
 from obsidion import constants
+from obsidion.cluster import ClusterClient
 from obsidion.core.global_checks import init_global_checks
+from obsidion.utils.resolver import CachingResolver
+from obsidion.sessions import load_sessions, save_sessions
+from obsidion.startup import ServiceUnavailable, Startup
+from obsidion.streams import RestCache, StreamGateway, StreamWorker
+from obsidion.utils.settings import SettingsStore
 
 log = logging.getLogger(__name__)
 
-__all__ = ["Obsidion", "ExitCodes"]
+__all__ = ["Obsidion", "ExitCodes", "guild_prefix"]
+
+# text and news channels, the only ones commands can be run in
+LEAN_CHANNEL_TYPES = {0, 5}
+# guilds of resumed shards fetched at once
+HYDRATE_CONCURRENCY = 10
+# AutoShardedClient keeps its shards private, resuming needs them anyway
+SHARD_INTERNALS = ("_AutoShardedClient__shards", "_AutoShardedClient__queue")
+
+
+def compile_command_matcher(user_id: int, prefixes: Iterable[str]) -> Pattern:
+    """Match the start of any message that could invoke a command.
+
+    Args:
+        user_id (int): id of the bot, for the mention prefixes
+        prefixes (Iterable[str]): every text prefix in use
+
+    Returns:
+        Pattern: matches a prefix or mention at the start of the content
+    """
+    # longest first so one prefix that starts another can't shadow it
+    forms = [f"<@!?{user_id}>"] + [
+        re.escape(prefix) for prefix in sorted(set(prefixes), key=len, reverse=True)
+    ]
+    return re.compile("|".join(forms))
+
+
+def trim_guild_payload(data: dict) -> dict:
+    """Strip a GUILD_CREATE payload down to what commands and checks read.
+
+    Roles and the text channels are all the permission checks need. Voice
+    channels, categories, emojis, voice states and presences are dropped.
+    """
+    data["channels"] = [
+        c for c in data.get("channels", ()) if c["type"] in LEAN_CHANNEL_TYPES
+    ]
+    data["emojis"] = []
+    data.pop("voice_states", None)
+    data.pop("presences", None)
+    return data
+
+
+class ShuttingDown(commands.CommandError):
+    """A command arrived while the bot was draining to shut down."""
+
+
+def guild_prefix(bot: "Obsidion", message: discord.Message) -> List[str]:
+    """Prefix callable: mentions of the bot and the guild's own prefix."""
+    guild_id = message.guild.id if message.guild else None
+    return commands.when_mentioned(bot, message) + [bot.settings.prefix(guild_id)]
 
 
 class Obsidion(commands.AutoShardedBot):
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args,
+        cluster: Optional[ClusterClient] = None,
+        streams: Optional[Union[StreamGateway, StreamWorker]] = None,
+        lean: bool = False,
+        **kwargs,
+    ):
+        if lean:
+            # no command reads message history or any member but the author
+            kwargs.update(
+                max_messages=None,
+                member_cache_flags=discord.MemberCacheFlags.none(),
+                chunk_guilds_at_startup=False,
+            )
 
         super().__init__(*args, **kwargs)
+        # discord.py is pinned, this only fails if it is upgraded without care
+        self._can_resume = all(hasattr(self, name) for name in SHARD_INTERNALS)
+        if not self._can_resume:
+            log.critical(
+                f"discord.py {discord.__version__} has no {' or '.join(SHARD_INTERNALS)}, "
+                "gateway sessions will not be kept across restarts"
+            )
+
+        # set when this process runs one slice of the shards
+        self.cluster = cluster
+        # set when commands are handed between a gateway and workers
+        self.streams = streams
+        self._redis_tasks = []
 
         self.http_session: Optional[aiohttp.ClientSession] = None
         self.redis_session: Optional[aioredis.Redis] = None
@@ -32,15 +119,56 @@ class Obsidion(commands.AutoShardedBot):
         self.redis_closed = False
         self.db_pool = None
         self.db_ready = asyncio.Event()
+        self.startup = Startup()
+        self._startup_task = None
 
         self._connector = None
         self._resolver = None
+        self._prewarm_task = None
+        self._command_matchers: Dict[str, Pattern] = {}
+
+        self.settings = SettingsStore(constants.Bot.default_prefix)
+        self._settings_task = None
+
+        # extensions loaded once the bot is ready, so they don't delay startup
+        self.deferred_extensions: List[str] = []
+        self._deferred_task = None
+
+        # commands being invoked and writes that have to finish before closing
+        self.draining = False
+        self._drain_task = None
+        self._close_task = None
+        # set by shutdown, None when the bot was stopped some other way
+        self._shutdown_mode: Optional[ExitCodes] = None
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._background = set()
+
+        # gateway sessions left by the previous process, see obsidion.sessions
+        self._saved_sessions: Dict[int, dict] = {}
+        self._resumed_shards: Set[int] = set()
+        # guilds each resumed shard had, fetched once it is back
+        self._resume_guilds: Dict[int, List[int]] = {}
+        self._hydrate_task = None
+        self._rest_cache: Optional[RestCache] = None
 
         self.uptime = None
 
+        self._install_message_prefilter()
+        if lean:
+            self._install_lean_parsers()
+        if self.streams:
+            self.streams.install(self)
+
         # Do basic checks on every command
         init_global_checks(self)
 
+    @property
+    def resolver(self) -> Optional[CachingResolver]:
+        """The shared DNS resolver, also used for Minecraft SRV lookups."""
+        return self._resolver
+
     async def _create_db_pool(self) -> None:
         """
         Create the postgres connection pool.
@@ -81,13 +209,80 @@ class Obsidion(commands.AutoShardedBot):
     async def login(self, *args, **kwargs) -> None:
         """Re-create the connector and set up sessions before logging into Discord."""
         self._recreate()
+        self._prewarm_task = self.loop.create_task(self._prewarm_connections())
+        self._settings_task = self.loop.create_task(self._sync_settings())
+        self._deferred_task = self.loop.create_task(self._load_deferred_extensions())
+        jobs = []
+        if self.cluster:
+            jobs += [self.cluster.heartbeat, self.cluster.listen]
+        if self.streams:
+            jobs += self.streams.jobs
+        self._redis_tasks = [
+            self.loop.create_task(self._run_redis_job(job)) for job in jobs
+        ]
         await self.stats.create_socket()
         await super().login(*args, **kwargs)
         self.uptime = datetime.datetime.now()
 
+    async def start(self, *args, **kwargs) -> None:
+        """Connect to the gateway, draining before closing on SIGTERM."""
+        try:
+            # replaces the handler from Client.run, which stops the loop at once
+            self.loop.add_signal_handler(
+                signal.SIGTERM, lambda: self.loop.create_task(self.close())
+            )
+        except NotImplementedError:
+            pass
+        await super().start(*args, **kwargs)
+        if self._close_task:
+            # Client.run stops the loop as soon as this returns
+            await asyncio.shield(self._close_task)
+
     async def close(self) -> None:
-        """Close the Discord connection and the aiohttp session, connector, statsd client, and resolver."""
+        """Drain, then close everything. Safe to call more than once."""
+        if self._close_task is None:
+            self._close_task = self.loop.create_task(self._close())
+        await asyncio.shield(self._close_task)
+
+    async def _close(self) -> None:
+        """Close the Discord connection and the aiohttp session, connector, statsd client, resolver and the Redis and Postgres pools."""
+        await self.drain()
+        sockets = self._shard_sockets
+        keep_sessions = (
+            constants.Sessions.enabled
+            and constants.Redis.enabled
+            and self.redis_ready.is_set()
+            and sockets
+        )
+        if keep_sessions:
+            for ws in sockets.values():
+                self._keep_session(ws)
+            shard_guilds = {shard_id: [] for shard_id in sockets}
+            for guild in self.guilds:
+                shard_guilds.setdefault(guild.shard_id, []).append(guild.id)
+        if self._hydrate_task:
+            self._hydrate_task.cancel()
         await super().close()
+        if keep_sessions:
+            # saved once the shards stopped reading, so no event is replayed
+            await save_sessions(
+                self.redis_session, sockets, self.shard_count, shard_guilds
+            )
+
+        if self._startup_task:
+            self._startup_task.cancel()
+
+        if self._prewarm_task:
+            self._prewarm_task.cancel()
+
+        if self._settings_task:
+            self._settings_task.cancel()
+
+        if self._deferred_task:
+            self._deferred_task.cancel()
+
+        for task in self._redis_tasks:
+            task.cancel()
 
         if self.http_session:
             await self.http_session.close()
@@ -107,11 +302,228 @@ class Obsidion(commands.AutoShardedBot):
             self.redis_ready.clear()
             await self.redis_session.wait_closed()
 
+        if self.db_pool:
+            self.db_ready.clear()
+            try:
+                await asyncio.wait_for(self.db_pool.close(), 10)
+            except asyncio.TimeoutError:
+                self.db_pool.terminate()
+
+    @property
+    def _shard_sockets(self) -> Dict[int, DiscordWebSocket]:
+        if not self._can_resume:
+            return {}
+        return {
+            shard_id: self._get_websocket(shard_id=shard_id) for shard_id in self.shards
+        }
+
+    @staticmethod
+    def _keep_session(ws: DiscordWebSocket) -> None:
+        """Make discord.py close a shard's socket without ending its session."""
+        close = ws.close
+
+        async def resumable_close(code: int = 4000) -> None:
+            # Discord ends the session when the socket closes with 1000 or 1001
+            await close(code=4000)
+
+        ws.close = resumable_close
+
+    async def launch_shards(self) -> None:
+        """Launch the shards, resuming the sessions the previous process saved."""
+        if constants.Sessions.enabled and constants.Redis.enabled and self._can_resume:
+            await self._load_sessions()
+        await super().launch_shards()
+        resumed = {
+            shard_id: guild_ids
+            for shard_id, guild_ids in self._resume_guilds.items()
+            if shard_id in self._resumed_shards
+        }
+        self._resume_guilds.clear()
+        if resumed:
+            self._hydrate_task = self.loop.create_task(
+                self._hydrate_resumed_guilds(resumed)
+            )
+        if self._resumed_shards and len(self._resumed_shards) == len(
+            self._connection.shard_ids
+        ):
+            # no READY is coming when every shard picked up where it left off
+            self._connection.call_handlers("ready")
+            self.dispatch("ready")
+
+    async def _load_sessions(self) -> None:
+        try:
+            await self.startup.wait(["redis"], constants.Startup.gate_timeout)
+        except ServiceUnavailable:
+            return
+        if self.shard_count is None:
+            self.shard_count, _gateway = await self.http.get_bot_gateway()
+        self._saved_sessions = await load_sessions(
+            self.redis_session,
+            self.shard_ids or range(self.shard_count),
+            self.shard_count,
+        )
+        if self._saved_sessions:
+            # READY normally sets the user, and the prefilter needs our id
+            state = self._connection
+            state.user = discord.ClientUser(
+                state=state, data=await self.http.get_user("@me")
+            )
+            self._install_resume_hydration()
+            self._resume_guilds = {
+                shard_id: session.get("guilds", [])
+                for shard_id, session in self._saved_sessions.items()
+            }
+
+    async def _hydrate_resumed_guilds(self, shard_guilds: Dict[int, List[int]]) -> None:
+        """Fetch the guilds the resumed shards had over REST.
+
+        A resumed session never sends GUILD_CREATE, so the guilds would
+        otherwise be missing from the cache. The previous process saved the
+        guilds of each shard with its session, so nothing has to be listed,
+        and they are fetched in the background once the shards are back.
+        Until then messages fetch their own guild, see
+        _install_resume_hydration.
+        """
+        semaphore = asyncio.Semaphore(HYDRATE_CONCURRENCY)
+        state = self._connection
+
+        async def hydrate(guild_id: int) -> bool:
+            if state._get_guild(guild_id) is not None:
+                return True
+            async with semaphore:
+                try:
+                    await self._rest_cache.hydrate(guild_id)
+                except (discord.HTTPException, OSError, asyncio.TimeoutError) as e:
+                    # most likely a guild the bot left while it was down
+                    log.debug(f"Could not fetch resumed guild {guild_id}: {e!r}")
+                    return False
+            return True
+
+        for shard_id, guild_ids in shard_guilds.items():
+            fetched = await asyncio.gather(*(hydrate(g) for g in guild_ids))
+            log.info(
+                f"Fetched {sum(fetched)} of {len(guild_ids)} guilds of shard {shard_id}"
+            )
+
+    async def launch_shard(self, gateway, shard_id: int, *, initial=False) -> None:
+        """Resume a shard's saved session, or identify like discord.py does."""
+        session = self._saved_sessions.pop(shard_id, None)
+        if session is None:
+            return await super().launch_shard(gateway, shard_id, initial=initial)
+        try:
+            coro = DiscordWebSocket.from_client(
+                self,
+                initial=initial,
+                gateway=gateway,
+                shard_id=shard_id,
+                session=session["session_id"],
+                sequence=session["sequence"],
+                resume=True,
+            )
+            ws = await asyncio.wait_for(coro, timeout=180.0)
+        except Exception as e:
+            log.warning(f"Could not resume shard {shard_id}, identifying: {e!r}")
+            return await super().launch_shard(gateway, shard_id, initial=initial)
+
+        # if Discord rejects the session the shard re-identifies by itself
+        log.info(f"Resuming shard {shard_id} at sequence {session['sequence']}")
+        self._resumed_shards.add(shard_id)
+        # the same as AutoShardedClient.launch_shard, which can't take a session
+        shards, queue = (getattr(self, name) for name in SHARD_INTERNALS)
+        shard = Shard(ws, self, queue.put_nowait)
+        shards[shard_id] = shard
+        shard.launch()
+
+    def _install_resume_hydration(self) -> None:
+        """Fetch the guilds of messages that arrive before their GUILD_CREATE.
+
+        The guilds of a resumed shard are fetched in the background once it
+        connects, this covers messages that arrive before theirs is.
+        """
+        self._rest_cache = RestCache(self)
+        parse_message_create = self._connection.parsers["MESSAGE_CREATE"]
+
+        def hydrate(data: dict) -> None:
+            guild_id = data.get("guild_id")
+            if (
+                guild_id
+                and self._connection._get_guild(int(guild_id)) is None
+                and self.wants_message(data)
+            ):
+                self.create_background_task(
+                    self._hydrate_message(parse_message_create, data)
+                )
+            else:
+                parse_message_create(data)
+
+        self._connection.parsers["MESSAGE_CREATE"] = hydrate
+
+    async def _hydrate_message(self, parse, data: dict) -> None:
+        try:
+            guild = await self._rest_cache.guild(int(data["guild_id"]))
+            await self._rest_cache.channel(int(data["channel_id"]), guild)
+        except discord.HTTPException as e:
+            log.warning(f"Could not fetch the guild of message {data['id']}: {e}")
+            return
+        parse(data)
+
+    def create_background_task(self, coro) -> asyncio.Task:
+        """Run a coroutine, like a write, that has to finish before the bot closes."""
+        task = self.loop.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def drain(self) -> None:
+        """Stop taking commands and let the running ones and pending writes finish."""
+        if self._drain_task is None:
+            self._drain_task = self.loop.create_task(self._drain())
+        await asyncio.shield(self._drain_task)
+
+    async def _drain(self) -> None:
+        self.draining = True
+        start = time.perf_counter()
+        log.info(
+            f"Draining {self._in_flight} commands and {len(self._background)} "
+            "background tasks before shutting down"
+        )
+        # stream and interaction commands are background tasks until they
+        # reach invoke, so wait for those too before unloading any commands
+        idle = self.loop.create_task(self._idle.wait())
+        await asyncio.wait(
+            [idle, *self._background], timeout=constants.Shutdown.drain_timeout
+        )
+        idle.cancel()
+        if self._in_flight:
+            log.warning(f"Gave up on {self._in_flight} commands that didn't finish")
+
+        # stops the cogs' loops, which flush what they have buffered
+        for name in list(self.extensions):
+            try:
+                self.unload_extension(name)
+            except Exception:
+                log.exception(f"Failed to unload {name} while draining")
+
+        if self._background:
+            _done, pending = await asyncio.wait(
+                self._background, timeout=constants.Shutdown.flush_timeout
+            )
+            for task in pending:
+                task.cancel()
+            if pending:
+                log.warning(f"Cancelled {len(pending)} unfinished background tasks")
+        log.info(f"Drained in {time.perf_counter() - start:.2f}s")
+
     def _recreate(self) -> None:
         """Re-create the connector, aiohttp session, the APIClient and the Redis session."""
         # Use asyncio for DNS resolution instead of threads so threads aren't spammed.
-        # Doesn't seem to have any state with regards to being closed, so no need to worry?
-        self._resolver = aiohttp.AsyncResolver()
+        # Answers are cached for as long as their TTL allows so requests to the
+        # upstream APIs we hit constantly skip DNS entirely.
+        self._resolver = CachingResolver(
+            min_ttl=constants.HTTP.dns_min_ttl,
+            max_ttl=constants.HTTP.dns_max_ttl,
+            max_entries=constants.HTTP.dns_cache_size,
+        )
 
         # Its __del__ does send a warning but it doesn't always show up for some reason.
         if self._connector and not self._connector._closed:
@@ -124,17 +536,19 @@ class Obsidion(commands.AutoShardedBot):
                 "The previous redis pool was not closed; it will remain open and be overwritten"
             )
 
-        # Create the redis session
-        self.loop.create_task(self._create_redis_session())
-
-        # Create the postgres pool
-        self.loop.create_task(self._create_db_pool())
+        # Start Redis and Postgres together, with retries, before commands run
+        self.startup = Startup()
+        self.startup.add("redis", self._create_redis_session)
+        self.startup.add("database", self._create_db_pool)
 
         # Use AF_INET as its socket family to prevent HTTPS related problems both locally
-        # and in production.
+        # and in production. aiohttp's own DNS cache uses one fixed TTL for every
+        # host, so leave caching to the resolver.
         self._connector = aiohttp.TCPConnector(
             resolver=self._resolver,
             family=socket.AF_INET,
+            use_dns_cache=False,
+            keepalive_timeout=constants.HTTP.keepalive_timeout,
         )
 
         # Client.login() will call HTTPClient.static_login() which will create a session using
@@ -148,10 +562,207 @@ class Obsidion(commands.AutoShardedBot):
             )
 
         self.http_session = aiohttp.ClientSession(connector=self._connector)
+        # warm connections help the first commands but aren't worth waiting for
+        self.startup.add("http", self._prewarm_once, required=False)
+        self._startup_task = self.loop.create_task(self.startup.run())
+
+    async def _prewarm_connections(self) -> None:
+        """
+        Keep warm keep-alive connections open to the upstreams we use the most.
+        Without this the first request after a deploy or a quiet period pays for
+        DNS, TCP and TLS on top of the request itself.
+        """
+        await self.startup.done.wait()
+        while not self.is_closed():
+            await asyncio.sleep(constants.HTTP.prewarm_interval)
+            await self._prewarm_once()
+
+    async def _prewarm_once(self) -> None:
+        await asyncio.gather(
+            *(self._prewarm_url(url) for url in constants.HTTP.prewarm_urls)
+        )
+
+    async def _prewarm_url(self, url: str) -> None:
+        """Open (or refresh) a pooled connection to a single upstream."""
+        try:
+            async with self.http_session.head(url, allow_redirects=False):
+                pass
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            log.debug(f"Failed to prewarm a connection to {url}: {e}")
+        except RuntimeError as e:
+            # the session was closed under us, the next pass uses the new one
+            log.debug(f"Could not prewarm {url}: {e}")
+
+    async def _sync_settings(self) -> None:
+        """Load the guild settings, then keep them in step with other processes."""
+        await self.db_ready.wait()
+        try:
+            await self.settings.load(self.db_pool)
+        except Exception:
+            log.exception("Failed to load guild settings, using the defaults")
+        await self.redis_ready.wait()
+        await self.settings.listen(self.db_pool, self.redis_session)
+
+    async def _load_deferred_extensions(self) -> None:
+        """Load the extensions that were left out of startup."""
+        await self.wait_until_ready()
+        start = time.perf_counter()
+        for name in self.deferred_extensions:
+            try:
+                # run the slow imports on a thread so the gateway isn't blocked,
+                # load_extension then finds them in sys.modules
+                await self.loop.run_in_executor(None, importlib.import_module, name)
+                self.load_extension(name)
+            except Exception:
+                log.exception(f"Failed to load deferred extension {name}")
+        if self.deferred_extensions:
+            log.info(
+                f"Loaded {len(self.deferred_extensions)} deferred extensions in "
+                f"{time.perf_counter() - start:.2f}s"
+            )
+
+    async def _run_redis_job(self, job) -> None:
+        await self.redis_ready.wait()
+        await job(self)
+
+    async def lease(self, name: str, ttl: int) -> bool:
+        """Whether this process should run a job that only one process may run.
+
+        The first process to claim ``name`` in Redis holds it for as long as
+        it asks again within ``ttl`` seconds, whether the others are clusters,
+        stream workers or interaction replicas. Without Redis every process
+        runs the job itself.
+
+        Args:
+            name (str): name of the job
+            ttl (int): seconds the lease lasts without being renewed
+
+        Returns:
+            bool: whether this process holds the lease
+        """
+        if not self.redis_ready.is_set():
+            return True
+        key = f"lease_{name}"
+        try:
+            if await self.redis_session.set(
+                key,
+                self.settings.instance,
+                expire=ttl,
+                exist=self.redis_session.SET_IF_NOT_EXIST,
+            ):
+                return True
+            if await self.redis_session.get(key, encoding="utf-8") != (
+                self.settings.instance
+            ):
+                return False
+            await self.redis_session.expire(key, ttl)
+            return True
+        except (aioredis.RedisError, OSError) as e:
+            log.warning(f"Could not check the {name} lease, running it here: {e!r}")
+            return True
+
+    async def guild_count(self) -> int:
+        """Number of guilds the whole bot is in, across every cluster."""
+        source = self.cluster or self.streams
+        if source is None:
+            return len(self.guilds)
+        try:
+            return await source.guild_count(self)
+        except (aioredis.RedisError, OSError) as e:
+            log.warning(f"Could not fetch the guild count from Redis: {e}")
+            return len(self.guilds)
+
+    def _install_message_prefilter(self) -> None:
+        """
+        Drop MESSAGE_CREATE payloads that can't be commands before discord.py parses them.
+
+        Nearly every message the bot sees is ordinary chat. Filtering the raw
+        payload skips building the Message object, the context, prefix
+        resolution and check evaluation for all of them.
+        """
+        parse_message_create = self._connection.parsers["MESSAGE_CREATE"]
+
+        def prefilter(data: dict) -> None:
+            if self.wants_message(data):
+                parse_message_create(data)
+
+        self._connection.parsers["MESSAGE_CREATE"] = prefilter
+
+    def _install_lean_parsers(self) -> None:
+        """Keep only the guild state that commands and checks actually read."""
+        parsers = self._connection.parsers
+        parse_guild_create = parsers["GUILD_CREATE"]
+        parse_guild_update = parsers["GUILD_UPDATE"]
+        parse_channel_create = parsers["CHANNEL_CREATE"]
+
+        def guild_create(data: dict) -> None:
+            parse_guild_create(trim_guild_payload(data))
+
+        def guild_update(data: dict) -> None:
+            parse_guild_update(trim_guild_payload(data))
+
+        def channel_create(data: dict) -> None:
+            if "guild_id" not in data or data["type"] in LEAN_CHANNEL_TYPES:
+                parse_channel_create(data)
+
+        parsers["GUILD_CREATE"] = guild_create
+        parsers["GUILD_UPDATE"] = guild_update
+        parsers["CHANNEL_CREATE"] = channel_create
+        parsers["GUILD_EMOJIS_UPDATE"] = lambda data: None
+
+    def command_matcher(self, prefix: str) -> Optional[Pattern]:
+        """Matcher for messages using a prefix or mentioning the bot."""
+        matcher = self._command_matchers.get(prefix)
+        if matcher is None and self._connection.self_id is not None:
+            matcher = self._command_matchers[prefix] = compile_command_matcher(
+                self._connection.self_id, [prefix]
+            )
+        return matcher
+
+    def wants_message(self, data: dict) -> bool:
+        """Whether a raw message payload is worth handing to discord.py."""
+        if self.extra_events.get("on_message") or self._listeners.get("message"):
+            # a listener or wait_for needs to see every message
+            return True
+        if data.get("author", {}).get("bot"):
+            return False
+        guild_id = data.get("guild_id")
+        matcher = self.command_matcher(
+            self.settings.prefix(int(guild_id) if guild_id else None)
+        )
+        if matcher is None:
+            # not ready yet, so we don't know our own mention
+            return True
+        return matcher.match(data.get("content", "")) is not None
 
     async def get_context(self, message, *, cls=commands.Context):
         return await super().get_context(message, cls=cls)
 
+    async def invoke(self, ctx: commands.Context) -> None:
+        """Hold commands until the services they may need have started, and count them until they finish."""
+        if ctx.command is None:
+            await super().invoke(ctx)
+            return
+        self._in_flight += 1
+        self._idle.clear()
+        try:
+            await self.startup.gate()
+            await super().invoke(ctx)
+        finally:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self._idle.set()
+
+    async def on_message(self, message: discord.Message) -> None:
+        if self.draining:
+            # workers and the interactions server stop taking work themselves,
+            # so only new gateway messages are turned away
+            ctx = await self.get_context(message)
+            if ctx.command is not None and not message.author.bot:
+                self.dispatch("command_error", ctx, ShuttingDown())
+            return
+        await self.process_commands(message)
+
     async def process_commands(self, message: discord.Message):
         if not message.author.bot:
             ctx = await self.get_context(message)
@@ -176,8 +787,15 @@ class Obsidion(commands.AutoShardedBot):
         else:
             self._shutdown_mode = ExitCodes.RESTART
 
-        await self.logout()
-        sys.exit(self._shutdown_mode)
+        # the exit happens in run_bot once run returns, raising SystemExit
+        # here would only end whichever task called shutdown
+        await self.close()
+
+    def exit_code(self, stopped: "ExitCodes") -> "ExitCodes":
+        """Code to exit with once closed, ``stopped`` if shutdown was never called."""
+        if self._shutdown_mode is None:
+            return stopped
+        return self._shutdown_mode
 
 
 class ExitCodes(IntEnum):
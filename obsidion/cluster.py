@@ -0,0 +1,251 @@
+"""
+Run the bot as several processes, each owning a slice of the shards.
+
+The launcher works out the shard count, splits the shards into contiguous
+ranges and starts one worker process per range. Every worker is a normal
+:class:`~obsidion.bot.Obsidion` with its own http session, redis and postgres
+pools, and writes a heartbeat to Redis with its guild count. The launcher
+restarts workers that exit or stop heartbeating, and workers add up each
+other's heartbeats when they need numbers for the whole bot.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+import aioredis
+
+from obsidion import constants
+
+log = logging.getLogger(__name__)
+
+HEARTBEAT_KEY = "cluster_{}"
+IPC_CHANNEL = "cluster_ipc"
+GATEWAY_URL = "https://discord.com/api/v7/gateway/bot"
+# discord allows one IDENTIFY every five seconds
+IDENTIFY_INTERVAL = 5.5
+
+
+class ClusterClient:
+    """A worker's view of the cluster it belongs to."""
+
+    def __init__(self, cluster_id: int, cluster_count: int, shard_ids: List[int]):
+        self.id = cluster_id
+        self.count = cluster_count
+        self.shard_ids = shard_ids
+
+    @property
+    def is_primary(self) -> bool:
+        """Whether this worker runs the jobs only one process should run."""
+        return self.id == 0
+
+    async def heartbeat(self, bot) -> None:
+        """Tell the launcher and the other workers this process is alive."""
+        while not bot.is_closed():
+            payload = {
+                "pid": os.getpid(),
+                "guilds": len(bot.guilds),
+                "shards": self.shard_ids,
+                "latency": bot.latency if bot.is_ready() else None,
+                "time": time.time(),
+            }
+            try:
+                await bot.redis_session.set(
+                    HEARTBEAT_KEY.format(self.id),
+                    json.dumps(payload),
+                    expire=constants.Cluster.heartbeat_timeout,
+                )
+            except (aioredis.RedisError, OSError) as e:
+                log.warning(f"Failed to send the cluster heartbeat: {e}")
+            await asyncio.sleep(constants.Cluster.heartbeat_interval)
+
+    async def status(self, redis) -> Dict[int, Optional[dict]]:
+        """The last heartbeat of every worker, None for workers that are down."""
+        keys = [HEARTBEAT_KEY.format(i) for i in range(self.count)]
+        values = await redis.mget(*keys, encoding="utf-8")
+        return {
+            i: json.loads(value) if value else None for i, value in enumerate(values)
+        }
+
+    async def guild_count(self, bot) -> int:
+        """Guilds across every worker, using this worker's live count for itself."""
+        status = await self.status(bot.redis_session)
+        status.pop(self.id, None)
+        return len(bot.guilds) + sum(s["guilds"] for s in status.values() if s)
+
+    @staticmethod
+    async def broadcast(redis, op: str, cluster: Optional[int] = None) -> None:
+        """Ask one worker, or all of them, to ``shutdown`` or ``restart``."""
+        await redis.publish(IPC_CHANNEL, json.dumps({"op": op, "cluster": cluster}))
+
+    async def listen(self, bot) -> None:
+        """Act on the messages broadcast to the cluster."""
+        (channel,) = await bot.redis_session.subscribe(IPC_CHANNEL)
+        while await channel.wait_message():
+            message = json.loads(await channel.get(encoding="utf-8"))
+            if message.get("cluster") not in (None, self.id):
+                continue
+            log.info(f"Cluster {self.id} received {message['op']}")
+            # not awaited, closing the bot cancels this listener
+            if message["op"] == "shutdown":
+                bot.loop.create_task(bot.shutdown())
+            elif message["op"] == "restart":
+                bot.loop.create_task(bot.shutdown(restart=True))
+
+
+def split_shards(shard_count: int, cluster_count: int) -> List[List[int]]:
+    """Split the shards into contiguous, nearly equal ranges."""
+    cluster_count = max(1, min(cluster_count, shard_count))
+    size, extra = divmod(shard_count, cluster_count)
+    ranges, start = [], 0
+    for i in range(cluster_count):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def _run_worker(cluster_id: int, cluster_count: int, shard_ids, shard_count) -> None:
+    # imported here so the launcher process never builds a bot itself
+    from obsidion.__main__ import run_bot
+
+    run_bot(
+        cluster=ClusterClient(cluster_id, cluster_count, shard_ids),
+        shard_ids=shard_ids,
+        shard_count=shard_count,
+    )
+
+
+class Worker:
+    def __init__(self, cluster_id: int, shard_ids: List[int]):
+        self.id = cluster_id
+        self.shard_ids = shard_ids
+        self.process: Optional[multiprocessing.Process] = None
+        self.started = 0.0
+        self.stopped = False
+
+
+class Launcher:
+    """Start the workers and keep them running."""
+
+    def __init__(self):
+        self.context = multiprocessing.get_context("spawn")
+        self.workers: List[Worker] = []
+        self.shard_count = 0
+        self.redis = None
+        self.closing = False
+
+    async def fetch_shard_count(self) -> int:
+        if constants.Cluster.shard_count:
+            return int(constants.Cluster.shard_count)
+        headers = {"Authorization": f"Bot {constants.Bot.discord_token}"}
+        async with aiohttp.ClientSession() as session:
+            async with session.get(GATEWAY_URL, headers=headers) as resp:
+                resp.raise_for_status()
+                return (await resp.json())["shards"]
+
+    def start(self, worker: Worker) -> None:
+        worker.process = self.context.Process(
+            target=_run_worker,
+            args=(worker.id, len(self.workers), worker.shard_ids, self.shard_count),
+            name=f"obsidion-cluster-{worker.id}",
+        )
+        worker.process.start()
+        worker.started = time.monotonic()
+        log.info(
+            f"Started cluster {worker.id} (pid {worker.process.pid}) with shards "
+            f"{worker.shard_ids[0]}-{worker.shard_ids[-1]}"
+        )
+
+    async def restart(self, worker: Worker, reason: str) -> None:
+        log.warning(f"Restarting cluster {worker.id}: {reason}")
+        if worker.process.is_alive():
+            worker.process.terminate()
+            await asyncio.get_event_loop().run_in_executor(
+                None, worker.process.join, 30
+            )
+            if worker.process.is_alive():
+                worker.process.kill()
+        await asyncio.sleep(constants.Cluster.restart_delay)
+        if not self.closing:
+            self.start(worker)
+
+    async def check(self, worker: Worker) -> None:
+        """Restart a worker that died or went quiet.
+
+        Only a worker told to shut down exits with ``ExitCodes.SHUTDOWN``, a
+        worker stopped any other way, signals included, is started again.
+        """
+        from obsidion.bot import ExitCodes
+
+        if worker.stopped:
+            return
+        if not worker.process.is_alive():
+            code = worker.process.exitcode
+            if code == ExitCodes.SHUTDOWN:
+                log.info(f"Cluster {worker.id} shut down")
+                worker.stopped = True
+                return
+            await self.restart(worker, f"exited with code {code}")
+            return
+        if time.monotonic() - worker.started < constants.Cluster.startup_timeout:
+            return
+        if not await self.redis.exists(HEARTBEAT_KEY.format(worker.id)):
+            await self.restart(worker, "no heartbeat")
+
+    async def start_all(self) -> None:
+        for worker in self.workers:
+            if self.closing:
+                return
+            self.start(worker)
+            # stay clear of the identify rate limit while the shards connect
+            await asyncio.sleep(len(worker.shard_ids) * IDENTIFY_INTERVAL)
+
+    async def supervise(self) -> None:
+        self.shard_count = await self.fetch_shard_count()
+        ranges = split_shards(self.shard_count, constants.Cluster.clusters)
+        self.workers = [Worker(i, shards) for i, shards in enumerate(ranges)]
+        self.redis = await aioredis.create_redis_pool(
+            address=(constants.Redis.host, constants.Redis.port),
+        )
+        log.info(f"Running {self.shard_count} shards in {len(self.workers)} clusters")
+
+        starting = asyncio.ensure_future(self.start_all())
+        while not self.closing and not all(w.stopped for w in self.workers):
+            await asyncio.gather(
+                *(self.check(worker) for worker in self.workers if worker.process)
+            )
+            await asyncio.sleep(constants.Cluster.heartbeat_interval)
+        starting.cancel()
+
+        self.redis.close()
+        await self.redis.wait_closed()
+
+    def stop(self) -> None:
+        """Terminate every worker, they close their connections on SIGTERM."""
+        self.closing = True
+        for worker in self.workers:
+            if worker.process and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers:
+            if worker.process:
+                worker.process.join(30)
+
+    def run(self) -> None:
+        if not constants.Redis.enabled:
+            log.critical("Clustering needs Redis, enable it in the config")
+            raise SystemExit(1)
+        loop = asyncio.get_event_loop()
+        loop.add_signal_handler(signal.SIGTERM, lambda: setattr(self, "closing", True))
+        try:
+            loop.run_until_complete(self.supervise())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
@@ -20,25 +20,34 @@ class botlist(commands.Cog):
         self.dblpy = dbl.DBLClient(
             self.bot,
             constants.Discord_bot_list.dbl_token,
-            autopost=True,
+            autopost=False,
             webhook_path="/dblwebhook",
             webhook_auth="password",
             webhook_port=5000,
         )
 
+        self.top_gg.start()
         self.botsfordiscord.start()
         self.discord_boats.start()
         self.discord_bot_list.start()
         self.discord_labs.start()
         self.bots_on_discord.start()
 
+    @tasks.loop(minutes=30.0)
+    async def top_gg(self):
+        # dblpy's autopost would only count the guilds of this cluster
+        await self.dblpy.post_guild_count(
+            guild_count=await self.bot.guild_count(),
+            shard_count=self.bot.shard_count,
+        )
+
     @tasks.loop(minutes=30.0)
     async def botsfordiscord(self):
         headers = {
             "Content-Type": "application/json",
             "Authorization": constants.Discord_bot_list.bots4discord_token,
         }
-        json = {"server_count": len(self.bot.guilds)}
+        json = {"server_count": await self.bot.guild_count()}
 
         await self.session.post(
             f"https://botsfordiscord.com/api/bot/{constants.Bot.clientid}",
@@ -51,7 +60,7 @@ class botlist(commands.Cog):
         headers = {
             "Authorization": constants.Discord_bot_list.discordboats_token,
         }
-        json = {"server_count": len(self.bot.guilds)}
+        json = {"server_count": await self.bot.guild_count()}
 
         await self.session.post(
             f"https://discord.boats/api/bot/{constants.Bot.clientid}",
@@ -65,7 +74,7 @@ class botlist(commands.Cog):
             "Content-Type": "application/json",
             "Authorization": constants.Discord_bot_list.discordbotlist_token,
         }
-        json = {"guilds": len(self.bot.guilds)}
+        json = {"guilds": await self.bot.guild_count()}
 
         await self.session.post(
             f"https://discordbotlist.com/api/v1/bots/{constants.Bot.clientid}/stats",
@@ -78,7 +87,7 @@ class botlist(commands.Cog):
         headers = {
             "token": constants.Discord_bot_list.discodlabs_token,
         }
-        json = {"server_count": len(self.bot.guilds)}
+        json = {"server_count": await self.bot.guild_count()}
 
         await self.session.post(
             f"https://bots.discordlabs.org/v2/bot/{constants.Bot.clientid}/stats",
@@ -92,7 +101,7 @@ class botlist(commands.Cog):
             "Content-Type": "application/json",
             "Authorization": constants.Discord_bot_list.botsondiscord_token,
         }
-        json = {"guildCount": len(self.bot.guilds)}
+        json = {"guildCount": await self.bot.guild_count()}
 
         await self.session.post(
             f"https://bots.ondiscord.xyz/bot-api/bots/{constants.Bot.clientid}",
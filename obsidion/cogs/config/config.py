@@ -1,6 +1,142 @@
+import discord
 from discord.ext import commands
 
+from obsidion.bot import Obsidion
+from obsidion.startup import requires
+
+MAX_PREFIX_LENGTH = 10
+
 
 class config(commands.Cog):
-    def __init__(self, bot):
+    """Change how the bot behaves in your server."""
+
+    def __init__(self, bot: Obsidion):
         self.bot = bot
+
+    async def update(self, ctx: commands.Context, **changes):
+        return await self.bot.settings.update(
+            self.bot.db_pool, self.bot.redis_session, ctx.guild.id, **changes
+        )
+
+    @commands.group(invoke_without_command=True)
+    @commands.guild_only()
+    async def settings(self, ctx: commands.Context):
+        """View the settings of this server."""
+        store = self.bot.settings
+        guild_settings = store.get(ctx.guild.id)
+        disabled_commands = disabled_cogs = []
+        if guild_settings is not None:
+            disabled_commands = store.commands.unpack(guild_settings.disabled_commands)
+            disabled_cogs = store.cogs.unpack(guild_settings.disabled_cogs)
+
+        embed = discord.Embed(title=f"Settings for {ctx.guild.name}", color=0x00FF00)
+        embed.add_field(name="Prefix", value=f"`{store.prefix(ctx.guild.id)}`")
+        embed.add_field(
+            name="Default Server",
+            value=f"`{store.default_server(ctx.guild.id) or 'None'}`",
+        )
+        embed.add_field(
+            name="Disabled Commands",
+            value=", ".join(f"`{name}`" for name in disabled_commands) or "None",
+            inline=False,
+        )
+        embed.add_field(
+            name="Disabled Categories",
+            value=", ".join(f"`{name}`" for name in disabled_cogs) or "None",
+            inline=False,
+        )
+        await ctx.send(embed=embed)
+
+    @settings.command(name="prefix")
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    @requires("database", "redis")
+    async def settings_prefix(self, ctx: commands.Context, prefix: str = None):
+        """Change the prefix in this server, leave it out to reset it."""
+        if prefix and len(prefix) > MAX_PREFIX_LENGTH:
+            await ctx.send(
+                f"{ctx.author}, :x: A prefix can be at most {MAX_PREFIX_LENGTH} characters."
+            )
+            return
+        await self.update(ctx, prefix=prefix)
+        await ctx.send(
+            f":white_check_mark: The prefix is now `{self.bot.settings.prefix(ctx.guild.id)}`"
+        )
+
+    def resolve_target(self, name: str):
+        """Find the command or category a name refers to.
+
+        Returns:
+            tuple: ``"command"`` or ``"cog"`` and the qualified name, or None if nothing matches
+        """
+        command = self.bot.get_command(name)
+        if command is not None:
+            return "command", command.qualified_name
+        cog = self.bot.get_cog(name.lower())
+        if cog is not None:
+            return "cog", cog.qualified_name
+        return None
+
+    async def toggle(self, ctx: commands.Context, name: str, disable: bool):
+        target = self.resolve_target(name)
+        if target is None:
+            await ctx.send(
+                f"{ctx.author}, :x: There is no command or category `{name}`."
+            )
+            return
+        kind, qualified_name = target
+        cog_name = (
+            qualified_name
+            if kind == "cog"
+            else self.bot.get_command(qualified_name).cog_name
+        )
+        if cog_name in self.bot.settings.PROTECTED_COGS:
+            await ctx.send(f"{ctx.author}, :x: `{qualified_name}` can't be disabled.")
+            return
+
+        store = self.bot.settings
+        guild_settings = store.get(ctx.guild.id)
+        registry = store.commands if kind == "command" else store.cogs
+        attribute = "disabled_commands" if kind == "command" else "disabled_cogs"
+        names = set(
+            registry.unpack(getattr(guild_settings, attribute))
+            if guild_settings
+            else ()
+        )
+        if disable:
+            names.add(qualified_name)
+        else:
+            names.discard(qualified_name)
+        await self.update(ctx, **{attribute: sorted(names)})
+        await ctx.send(
+            f":white_check_mark: `{qualified_name}` is now "
+            f"{'disabled' if disable else 'enabled'} in this server"
+        )
+
+    @settings.command(name="disable")
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    @requires("database", "redis")
+    async def settings_disable(self, ctx: commands.Context, *, name: str):
+        """Disable a command or a whole category in this server."""
+        await self.toggle(ctx, name, True)
+
+    @settings.command(name="enable")
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    @requires("database", "redis")
+    async def settings_enable(self, ctx: commands.Context, *, name: str):
+        """Enable a command or category again."""
+        await self.toggle(ctx, name, False)
+
+    @settings.command(name="server")
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    @requires("database", "redis")
+    async def settings_server(self, ctx: commands.Context, address: str = None):
+        """Set the server used when no address is given, leave it out to clear it."""
+        await self.update(ctx, default_server=address)
+        if address:
+            await ctx.send(f":white_check_mark: The default server is now `{address}`")
+        else:
+            await ctx.send(":white_check_mark: The default server has been cleared")
@@ -0,0 +1,5 @@
+from .history import history
+
+
+def setup(bot):
+    bot.add_cog(history(bot))
@@ -0,0 +1,121 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+import discord
+from discord.ext import commands, tasks
+
+from obsidion import constants
+from obsidion.bot import Obsidion
+from obsidion.startup import requires
+from obsidion.utils.java_ping import normalise_address
+
+from . import samples
+
+log = logging.getLogger(__name__)
+
+
+class history(commands.Cog):
+    """Uptime and player count history of Minecraft servers."""
+
+    def __init__(self, bot: Obsidion):
+        self.bot = bot
+        # samples of servers people monitor or look up, recorded in every
+        # process that pings servers and folded into the shared rollups
+        self.history = samples.ServerHistory(
+            constants.History.capacity,
+            constants.History.max_servers,
+            watched=self.watched,
+        )
+        self.flush_history.change_interval(seconds=constants.History.flush_interval)
+        self.flush_history.start()
+
+    def cog_unload(self) -> None:
+        """Flush the samples that are left on cog unload."""
+        self.flush_history.cancel()
+        self.bot.create_background_task(self.write_history())
+
+    def watched(self, address: str) -> bool:
+        """Whether the monitor in this process is subscribed to the server."""
+        return address in getattr(self.bot.get_cog("monitor"), "subscribers", ())
+
+    @commands.Cog.listener()
+    async def on_server_ping(self, address: str, data: Optional[dict]) -> None:
+        """Keep a sample of every ping, whether it came from a command or the monitor."""
+        self.history.record(normalise_address(address), data)
+
+    @tasks.loop(seconds=300.0)
+    async def flush_history(self) -> None:
+        """Fold the samples taken since the last flush into the Postgres rollups."""
+        await self.write_history()
+
+    @flush_history.before_loop
+    async def create_table(self) -> None:
+        """Create the history table if needed."""
+        await self.bot.db_ready.wait()
+        async with self.bot.db_pool.acquire() as conn:
+            await conn.execute(samples.CREATE_TABLE)
+
+    async def write_history(self) -> None:
+        await self.bot.db_ready.wait()
+        try:
+            written = await self.history.flush(
+                self.bot.db_pool,
+                constants.History.hourly_retention,
+                constants.History.daily_retention,
+                constants.History.idle_expiry,
+            )
+        except Exception:
+            log.exception("Failed to flush the server history")
+        else:
+            log.debug(f"Flushed {written} server status samples")
+
+    @commands.command()
+    @commands.cooldown(rate=1, per=5.0, type=commands.BucketType.user)
+    @requires("database")
+    async def serverhistory(self, ctx: commands.Context, address: str, days: int = 7):
+        """View the uptime and player count history of a server."""
+        await ctx.channel.trigger_typing()
+        address = normalise_address(address)
+        days = max(1, min(days, constants.History.daily_retention))
+        # hourly points give a useful chart for a week, after that use days
+        resolution = (
+            "hour" if days <= min(7, constants.History.hourly_retention) else "day"
+        )
+
+        async with self.bot.db_pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT bucket, samples, online, players_sum, players_max FROM server_history "
+                "WHERE address = $1 AND resolution = $2 AND bucket >= $3 ORDER BY bucket",
+                address,
+                resolution,
+                datetime.utcnow() - timedelta(days=days),
+            )
+        if not rows:
+            await ctx.send(
+                f"{ctx.author}, :x: There is no history for `{address}` yet, "
+                "it is recorded for servers that are watched or looked up."
+            )
+            return
+
+        samples = sum(row["samples"] for row in rows)
+        online = sum(row["online"] for row in rows)
+        averages = [
+            row["players_sum"] / row["online"] if row["online"] else 0 for row in rows
+        ]
+        embed = discord.Embed(title=f"History of {address}", color=0x00FF00)
+        embed.add_field(name="Uptime", value=f"`{online / samples:.2%}`")
+        embed.add_field(
+            name="Players",
+            value=(
+                f"Peak: `{max(row['players_max'] for row in rows):,}`\n"
+                f"Average: `{sum(row['players_sum'] for row in rows) / max(online, 1):,.1f}`"
+            ),
+        )
+        embed.add_field(
+            name=f"Average Players per {resolution.capitalize()}",
+            value=f"```{samples.sparkline(averages)}```",
+            inline=False,
+        )
+        embed.set_footer(text=f"Last {days} days | {samples:,} samples")
+        await ctx.send(embed=embed)
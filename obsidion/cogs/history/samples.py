@@ -0,0 +1,250 @@
+import logging
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS server_history (
+    address TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket TIMESTAMP NOT NULL,
+    samples INTEGER NOT NULL,
+    online INTEGER NOT NULL,
+    players_sum BIGINT NOT NULL,
+    players_max INTEGER NOT NULL,
+    latency_sum DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (address, resolution, bucket)
+)
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO server_history
+    (address, resolution, bucket, samples, online, players_sum, players_max, latency_sum)
+VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+ON CONFLICT (address, resolution, bucket) DO UPDATE SET
+    samples = server_history.samples + EXCLUDED.samples,
+    online = server_history.online + EXCLUDED.online,
+    players_sum = server_history.players_sum + EXCLUDED.players_sum,
+    players_max = GREATEST(server_history.players_max, EXCLUDED.players_max),
+    latency_sum = server_history.latency_sum + EXCLUDED.latency_sum
+"""
+
+SPARK_CHARACTERS = "▁▂▃▄▅▆▇█"
+
+# one sample: unix time, online, players, latency in ms
+Sample = Tuple[float, bool, int, float]
+
+
+class SampleBuffer:
+    """Fixed size ring buffer of status samples, stored in typed arrays."""
+
+    __slots__ = (
+        "timestamps",
+        "online",
+        "players",
+        "latency",
+        "_start",
+        "_size",
+        "_unflushed",
+    )
+
+    def __init__(self, capacity: int):
+        self.timestamps = array("d", [0.0]) * capacity
+        self.online = array("b", [0]) * capacity
+        self.players = array("l", [0]) * capacity
+        self.latency = array("f", [0.0]) * capacity
+        self._start = 0
+        self._size = 0
+        self._unflushed = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def pending(self) -> int:
+        """Number of samples not flushed yet."""
+        return self._unflushed
+
+    @property
+    def last_timestamp(self) -> float:
+        if not self._size:
+            return 0.0
+        return self.timestamps[(self._start + self._size - 1) % self.capacity]
+
+    def append(self, timestamp: float, online: bool, players: int, latency: float):
+        """Add a sample, overwriting the oldest one once the buffer is full."""
+        index = (self._start + self._size) % self.capacity
+        self.timestamps[index] = timestamp
+        self.online[index] = online
+        self.players[index] = players
+        self.latency[index] = latency
+        if self._size == self.capacity:
+            self._start = (self._start + 1) % self.capacity
+        else:
+            self._size += 1
+        self._unflushed = min(self._unflushed + 1, self.capacity)
+
+    def _samples(self, count: int) -> Iterator[Sample]:
+        for offset in range(self._size - count, self._size):
+            index = (self._start + offset) % self.capacity
+            yield (
+                self.timestamps[index],
+                bool(self.online[index]),
+                self.players[index],
+                self.latency[index],
+            )
+
+    def unflushed(self) -> List[Sample]:
+        """Samples added since the last flush, oldest first."""
+        return list(self._samples(self._unflushed))
+
+    def mark_flushed(self, count: int) -> None:
+        """Record that the oldest ``count`` unflushed samples have been written."""
+        self._unflushed = max(self._unflushed - count, 0)
+
+
+def rollup(samples: List[Sample], resolution: str) -> Dict[datetime, List]:
+    """Downsample samples into hourly or daily buckets.
+
+    Args:
+        samples (List[Sample]): samples to aggregate
+        resolution (str): ``hour`` or ``day``
+
+    Returns:
+        Dict[datetime, List]: samples, online, players sum, players max and latency sum per bucket
+    """
+    buckets: Dict[datetime, List] = {}
+    for timestamp, online, players, latency in samples:
+        bucket = datetime.utcfromtimestamp(timestamp).replace(
+            minute=0, second=0, microsecond=0
+        )
+        if resolution == "day":
+            bucket = bucket.replace(hour=0)
+        row = buckets.setdefault(bucket, [0, 0, 0, 0, 0.0])
+        row[0] += 1
+        row[1] += online
+        row[2] += players
+        row[3] = max(row[3], players)
+        row[4] += latency
+    return buckets
+
+
+def sparkline(values: List[float]) -> str:
+    """Draw values as a line of block characters."""
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    spread = (high - low) or 1
+    return "".join(
+        SPARK_CHARACTERS[int((value - low) / spread * (len(SPARK_CHARACTERS) - 1))]
+        for value in values
+    )
+
+
+class ServerHistory:
+    """
+    Keep recent status samples in memory and fold them into Postgres rollups.
+
+    Raw samples never reach the database, each flush only adds to one hourly and
+    one daily row per server, and old rollups are pruned, so storage per server
+    stays roughly constant. At most ``max_servers`` buffers are kept in memory,
+    the least recently pinged servers that aren't watched are dropped first.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        max_servers: int,
+        watched: Callable[[str], bool] = lambda address: False,
+    ):
+        self.capacity = capacity
+        self.max_servers = max_servers
+        self.watched = watched
+        # least recently pinged first
+        self.buffers: "OrderedDict[str, SampleBuffer]" = OrderedDict()
+        # unflushed samples lost with dropped buffers since the last flush
+        self.dropped = 0
+
+    def record(self, address: str, data: Optional[dict]) -> None:
+        """Store the result of a ping, None or False meaning the server was offline."""
+        buffer = self.buffers.get(address)
+        if buffer is None:
+            buffer = self.buffers[address] = SampleBuffer(self.capacity)
+            self._evict()
+        else:
+            self.buffers.move_to_end(address)
+        if data:
+            buffer.append(
+                time.time(),
+                True,
+                data["players"]["online"],
+                data.get("latency") or 0.0,
+            )
+        else:
+            buffer.append(time.time(), False, 0, 0.0)
+
+    def _evict(self) -> None:
+        excess = len(self.buffers) - self.max_servers
+        if excess <= 0:
+            return
+        # one-off lookups go first, watched servers keep their history
+        unwatched = [a for a in self.buffers if not self.watched(a)]
+        for address in unwatched[:excess]:
+            self.dropped += self.buffers.pop(address).pending
+
+    async def flush(
+        self,
+        pool,
+        hourly_retention: int,
+        daily_retention: int,
+        idle_expiry: int,
+    ) -> int:
+        """Write every unflushed sample into the rollups and prune old data.
+
+        Samples are only marked as flushed once the write has committed, so a
+        failed flush leaves them for the next one.
+
+        Returns:
+            int: number of samples written
+        """
+        rows = []
+        flushed: List[Tuple[SampleBuffer, int]] = []
+        for address, buffer in list(self.buffers.items()):
+            samples = buffer.unflushed()
+            if not samples and buffer.last_timestamp < time.time() - idle_expiry:
+                # nobody has looked at this server for a while
+                del self.buffers[address]
+                continue
+            flushed.append((buffer, len(samples)))
+            for resolution in ("hour", "day"):
+                for bucket, values in rollup(samples, resolution).items():
+                    rows.append((address, resolution, bucket, *values))
+
+        now = datetime.utcnow()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                if rows:
+                    await conn.executemany(UPSERT_ROLLUP, rows)
+                await conn.execute(
+                    "DELETE FROM server_history WHERE (resolution = 'hour' AND bucket < $1) "
+                    "OR (resolution = 'day' AND bucket < $2)",
+                    now - timedelta(days=hourly_retention),
+                    now - timedelta(days=daily_retention),
+                )
+        # samples recorded while writing stay unflushed
+        for buffer, count in flushed:
+            buffer.mark_flushed(count)
+        if self.dropped:
+            log.info(
+                f"Dropped {self.dropped} samples of servers evicted before a flush"
+            )
+            self.dropped = 0
+        return sum(count for _buffer, count in flushed)
@@ -0,0 +1,196 @@
+import json
+import logging
+import re
+import time
+from typing import Dict, Iterable, List
+
+from obsidion import constants
+
+log = logging.getLogger(__name__)
+
+API_URL = "https://api.hypixel.net"
+# hypixel keys are uuids, anything else is a placeholder from the config
+KEY_FORMAT = re.compile(
+    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.I
+)
+# requests a key may make per window before the first response tells us the real limit
+DEFAULT_LIMIT = 120
+DEFAULT_WINDOW = 60.0
+
+
+class HypixelError(Exception):
+    """The Hypixel API could not answer a request."""
+
+
+class RateLimited(HypixelError):
+    """Every key has used up its quota."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            f"Hypixel is rate limiting us, try again in {retry_after:.0f}s"
+        )
+        self.retry_after = retry_after
+
+
+class APIKey:
+    """Quota of one API key, as last reported by Hypixel."""
+
+    __slots__ = ("key", "limit", "remaining", "reset_at", "retry_at")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.limit = DEFAULT_LIMIT
+        self.remaining = DEFAULT_LIMIT
+        self.reset_at = 0.0
+        # set after a 429, the key isn't used again until then
+        self.retry_at = 0.0
+
+    def headroom(self, now: float) -> int:
+        if now >= self.reset_at:
+            return self.limit
+        return self.remaining
+
+
+class KeyPool:
+    """
+    Hand out the API key with the most requests left in its window.
+
+    Quotas come from the ``RateLimit-*`` headers of every response. A request
+    is counted against its key as soon as it starts, so a burst of concurrent
+    requests is spread over the keys instead of all landing on the same one.
+    """
+
+    def __init__(self, keys: Iterable[str]):
+        self.keys: Dict[str, APIKey] = {key: APIKey(key) for key in keys}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def acquire(self) -> APIKey:
+        """Reserve one request on the key with the most headroom.
+
+        Raises:
+            RateLimited: no key has any quota left
+        """
+        now = time.monotonic()
+        usable = [key for key in self.keys.values() if key.retry_at <= now]
+        if not usable:
+            if not self.keys:
+                raise HypixelError("No Hypixel API keys are configured")
+            raise RateLimited(min(key.retry_at for key in self.keys.values()) - now)
+
+        key = max(usable, key=lambda k: k.headroom(now))
+        if now >= key.reset_at:
+            key.remaining = key.limit
+            key.reset_at = now + DEFAULT_WINDOW
+        if key.remaining <= 0:
+            raise RateLimited(min(k.reset_at for k in usable) - now)
+        key.remaining -= 1
+        return key
+
+    @staticmethod
+    def update(key: APIKey, headers) -> None:
+        """Record the quota Hypixel reported for a key."""
+        try:
+            key.limit = int(headers["RateLimit-Limit"])
+            key.remaining = int(headers["RateLimit-Remaining"])
+            key.reset_at = time.monotonic() + int(headers["RateLimit-Reset"])
+        except (KeyError, ValueError):
+            pass
+
+    @staticmethod
+    def backoff(key: APIKey, headers) -> None:
+        """Stop using a key that was rate limited until its window resets."""
+        retry_after = headers.get("Retry-After") or headers.get("RateLimit-Reset")
+        try:
+            retry_after = float(retry_after)
+        except (TypeError, ValueError):
+            retry_after = DEFAULT_WINDOW
+        key.remaining = 0
+        key.retry_at = key.reset_at = time.monotonic() + retry_after
+
+    def remove(self, key: APIKey) -> None:
+        self.keys.pop(key.key, None)
+
+
+class HypixelAPI:
+    """
+    Client for the Hypixel API sharing the bot's http and redis sessions.
+
+    Successful responses are cached in Redis for as long as
+    ``hypixel.cache_ttl`` allows for their endpoint, so popular lookups only
+    cost quota once per ttl across every guild.
+    """
+
+    def __init__(self, bot, keys: Iterable[str]):
+        self.bot = bot
+        self.pool = KeyPool(key for key in keys if KEY_FORMAT.match(str(key)))
+        if not self.pool:
+            log.warning("No valid Hypixel API keys are configured")
+
+    @staticmethod
+    def keys_from_config() -> List[str]:
+        return list(constants.Hypixel.api_keys or []) + [
+            str(constants.Bot.hypixelapi_token)
+        ]
+
+    @staticmethod
+    def cache_key(endpoint: str, params: Dict[str, str]) -> str:
+        args = "_".join(f"{k}={v}" for k, v in sorted(params.items()))
+        return f"hypixel_{endpoint}_{args}" if args else f"hypixel_{endpoint}"
+
+    async def get(self, endpoint: str, **params: str) -> dict:
+        """Get a response from the API, using the cache when it is fresh enough.
+
+        Args:
+            endpoint (str): endpoint without the leading slash, e.g. ``watchdogstats``
+            **params (str): query string parameters other than the key
+
+        Raises:
+            RateLimited: every key is out of quota
+            HypixelError: the API refused the request
+
+        Returns:
+            dict: the json response
+        """
+        cache_key = self.cache_key(endpoint, params)
+        if await self.bot.redis_session.exists(cache_key):
+            return json.loads(await self.bot.redis_session.get(cache_key))
+
+        data = await self.request(endpoint, params)
+        ttl = constants.Hypixel.cache_ttl.get(endpoint, constants.Hypixel.default_ttl)
+        await self.bot.redis_session.set(cache_key, json.dumps(data), expire=ttl)
+        return data
+
+    async def request(self, endpoint: str, params: Dict[str, str]) -> dict:
+        """Make a request, moving on to another key if one gets rate limited."""
+        for _ in range(max(len(self.pool), 1)):
+            key = self.pool.acquire()
+            async with self.bot.http_session.get(
+                f"{API_URL}/{endpoint}", params={**params, "key": key.key}
+            ) as resp:
+                if resp.status == 429:
+                    log.info(f"Hypixel key ...{key.key[-4:]} was rate limited")
+                    self.pool.backoff(key, resp.headers)
+                    continue
+                self.pool.update(key, resp.headers)
+                if resp.status == 403:
+                    log.error(f"Hypixel rejected key ...{key.key[-4:]}, removing it")
+                    self.pool.remove(key)
+                    continue
+                try:
+                    data = await resp.json(content_type=None)
+                except ValueError as e:
+                    raise HypixelError(f"Hypixel returned {resp.status}") from e
+            if not data.get("success"):
+                raise HypixelError(data.get("cause", "The Hypixel API had an error"))
+            return data
+        raise self.exhausted()
+
+    def exhausted(self) -> HypixelError:
+        now = time.monotonic()
+        if not self.pool:
+            return HypixelError("No Hypixel API keys are configured")
+        return RateLimited(
+            max(min(key.retry_at for key in self.pool.keys.values()) - now, 0)
+        )
@@ -1,9 +1,35 @@
-from aiohypixel import HypixelSession
+import asyncio
+import json
+import logging
+import time
+from typing import Optional
 
+import aioredis
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 from obsidion import constants
+from obsidion.startup import services_ready
+from obsidion.utils.chat_formatting import humanize_timedelta
+
+from .api import HypixelAPI, HypixelError
+from .series import Snapshot, TimeSeries
+
+log = logging.getLogger(__name__)
+
+# redis key the process polling hypixel shares its latest responses under
+STATS_KEY = "hypixel_stats"
+
+
+def format_rate(rate: Optional[float]) -> str:
+    return "Collecting data..." if rate is None else f"{rate:,.0f}"
+
+
+def format_trend(trend: Optional[float]) -> str:
+    if trend is None:
+        return "Collecting data..."
+    arrow = ":arrow_up:" if trend > 0 else ":arrow_down:" if trend < 0 else ""
+    return f"{arrow} {trend:+.1%}"
 
 
 class hypixel(commands.Cog):
@@ -11,37 +37,170 @@ class hypixel(commands.Cog):
         self.bot = bot
         self.session = bot.http_session
 
-        self.hypixel_session = HypixelSession(
-            api_keys=(
-                [str(constants.Bot.hypixelapi_token), "strong", "random key"]
-            )  # I HATE THIS I NEED TO FIX THE LIBRARY
+        self.api = HypixelAPI(bot, HypixelAPI.keys_from_config())
+
+        # latest responses, refreshed in the background so commands never wait on hypixel
+        self.watchdog: Optional[dict] = None
+        self.booster_data: Optional[dict] = None
+        self.updated = 0.0
+        self.series = TimeSeries(
+            constants.Hypixel.history_span, constants.Hypixel.poll_interval
+        )
+        self.poll_stats.change_interval(seconds=constants.Hypixel.poll_interval)
+        self.poll_stats.start()
+
+    def cog_unload(self) -> None:
+        """Stop polling Hypixel on cog unload."""
+        self.poll_stats.cancel()
+
+    async def cog_check(self, ctx: commands.Context) -> bool:
+        # api responses are cached in Redis
+        return await services_ready(ctx, "redis")
+
+    @tasks.loop(seconds=60.0)
+    async def poll_stats(self) -> None:
+        """Take a snapshot of the watchdog and booster endpoints.
+
+        Only the process holding the lease asks Hypixel, the others pick up
+        the responses it mirrors to Redis.
+        """
+        lease_ttl = int(constants.Hypixel.poll_interval * 2.5)
+        if not await self.bot.lease("hypixel_stats", lease_ttl):
+            await self.read_stats()
+            return
+        watchdog, boosters = await asyncio.gather(
+            self.api.request("watchdogstats", {}),
+            self.api.request("boosters", {}),
+            return_exceptions=True,
         )
+        for result in (watchdog, boosters):
+            if isinstance(result, Exception):
+                log.warning(f"Could not poll Hypixel: {result!r}")
+        if isinstance(watchdog, Exception) or isinstance(boosters, Exception):
+            # half a snapshot would break the rates, so skip this one
+            return
+
+        self.record(watchdog, boosters, time.time())
+        if self.bot.redis_ready.is_set():
+            stats = {
+                "watchdog": watchdog,
+                "boosters": boosters,
+                "updated": self.updated,
+            }
+            try:
+                # a mirror older than a few polls is no use to the others
+                await self.bot.redis_session.set(
+                    STATS_KEY,
+                    json.dumps(stats),
+                    expire=int(constants.Hypixel.poll_interval * 5),
+                )
+            except (aioredis.RedisError, OSError) as e:
+                log.warning(f"Could not mirror the Hypixel stats to Redis: {e!r}")
+
+    async def read_stats(self) -> None:
+        """Use the responses mirrored in Redis if they are newer than ours."""
+        if not self.bot.redis_ready.is_set():
+            return
+        try:
+            saved = await self.bot.redis_session.get(STATS_KEY)
+        except (aioredis.RedisError, OSError) as e:
+            log.warning(f"Could not load the Hypixel stats from Redis: {e!r}")
+            return
+        if saved is None:
+            return
+        stats = json.loads(saved)
+        if stats["updated"] > self.updated:
+            self.record(stats["watchdog"], stats["boosters"], stats["updated"])
+
+    def record(self, watchdog: dict, boosters: dict, updated: float) -> None:
+        """Keep a snapshot of both endpoints and add it to the series."""
+        self.watchdog, self.booster_data = watchdog, boosters
+        self.updated = updated
+        self.series.add(
+            Snapshot(
+                self.updated,
+                watchdog["watchdog_total"],
+                watchdog["watchdog_rollingDaily"],
+                watchdog["staff_total"],
+                watchdog["staff_rollingDaily"],
+                len(boosters["boosters"]),
+            )
+        )
+
+    @poll_stats.before_loop
+    async def before_poll_stats(self) -> None:
+        await self.bot.wait_until_ready()
+
+    def footer(self, embed: discord.Embed) -> None:
+        age = humanize_timedelta(seconds=time.time() - self.updated)
+        embed.set_footer(text=f"Updated {age} ago" if age else "Updated just now")
 
     @commands.command()
     async def watchdogstats(self, ctx: commands.Context):
         """Get the current watchdog statistics."""
-        await ctx.channel.trigger_typing()
-        data = await self.hypixel_session.get_watchdog_stats()
+        data = self.watchdog
+        if data is None:
+            # nothing polled yet, answer from the api directly
+            await ctx.channel.trigger_typing()
+            try:
+                data = await self.api.get("watchdogstats")
+            except HypixelError as e:
+                await ctx.send(f"{ctx.author}, :x: {e}")
+                return
         embed = discord.Embed(title="Watchdog Stats", colour=0x00FF00)
-        embed.add_field(name="Total Bans", value=f"{data.total:,}")
-        embed.add_field(name="Rolling Daily", value=f"{data.rolling_daily:,}")
-        embed.add_field(name="Last Minute", value=f"{data.last_minute:,}")
-        embed.add_field(name="Staff Total", value=f"{data.staff_total:,}")
+        embed.add_field(name="Total Bans", value=f"{data['watchdog_total']:,}")
+        embed.add_field(
+            name="Rolling Daily", value=f"{data['watchdog_rollingDaily']:,}"
+        )
+        embed.add_field(name="Last Minute", value=f"{data['watchdog_lastMinute']:,}")
+        embed.add_field(name="Staff Total", value=f"{data['staff_total']:,}")
+        embed.add_field(
+            name="Staff Rolling Daily", value=f"{data['staff_rollingDaily']:,}"
+        )
+        embed.add_field(
+            name="Bans per Hour",
+            value=(
+                f"Watchdog: `{format_rate(self.series.rate('watchdog_total'))}`\n"
+                f"Staff: `{format_rate(self.series.rate('staff_total'))}`"
+            ),
+        )
         embed.add_field(
-            name="Staff Rolling Daily", value=f"{data.staff_rolling_daily:,}"
+            name="Daily Bans vs Yesterday",
+            value=(
+                f"Watchdog: {format_trend(self.series.trend('watchdog_daily'))}\n"
+                f"Staff: {format_trend(self.series.trend('staff_daily'))}"
+            ),
         )
-        embed.timestamp = ctx.message.created_at
+        if self.watchdog is not None:
+            self.footer(embed)
         await ctx.send(embed=embed)
 
     @commands.command()
     async def boosters(self, ctx: commands.Context):
         """Get the current boosters online."""
-        await ctx.channel.trigger_typing()
-        data = await self.hypixel_session.get_boosters()
-        # it is a tuple of a list of all the different boosters
+        data = self.booster_data
+        if data is None:
+            await ctx.channel.trigger_typing()
+            try:
+                data = await self.api.get("boosters")
+            except HypixelError as e:
+                await ctx.send(f"{ctx.author}, :x: {e}")
+                return
         embed = discord.Embed(
             title="Boosters",
-            description=f"Total Boosters online: {len(data[0]):,}",
+            description=f"Total Boosters online: {len(data['boosters']):,}",
             colour=0x00FF00,
         )
+        hour_ago = self.series.at(3600)
+        latest = self.series.latest
+        if hour_ago is not None and latest is not None and hour_ago is not latest:
+            embed.add_field(
+                name="Change in the Last Hour",
+                value=f"{latest.boosters - hour_ago.boosters:+,}",
+            )
+        trend = self.series.trend("boosters")
+        if trend is not None:
+            embed.add_field(name="Compared with Yesterday", value=format_trend(trend))
+        if self.booster_data is not None:
+            self.footer(embed)
         await ctx.send(embed=embed)
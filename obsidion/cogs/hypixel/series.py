@@ -0,0 +1,62 @@
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+
+
+class Snapshot(NamedTuple):
+    timestamp: float
+    watchdog_total: int
+    watchdog_daily: int
+    staff_total: int
+    staff_daily: int
+    boosters: int
+
+
+class TimeSeries:
+    """Snapshots of the watchdog and booster endpoints from the last ``span`` seconds."""
+
+    def __init__(self, span: float, interval: float):
+        # one spare slot per hour in case polls drift early
+        self.span = span
+        self.samples = deque(maxlen=int(span / interval) + int(span / 3600) + 1)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    @property
+    def latest(self) -> Optional[Snapshot]:
+        return self.samples[-1] if self.samples else None
+
+    def add(self, snapshot: Snapshot) -> None:
+        self.samples.append(snapshot)
+
+    def at(self, seconds_ago: float) -> Optional[Snapshot]:
+        """The oldest snapshot taken no longer than ``seconds_ago`` seconds ago."""
+        cutoff = time.time() - seconds_ago
+        for snapshot in self.samples:
+            if snapshot.timestamp >= cutoff:
+                return snapshot
+        return None
+
+    def rate(self, field: str, window: float = 3600) -> Optional[float]:
+        """How much a counter grew per hour over the last ``window`` seconds."""
+        start, end = self.at(window), self.latest
+        if start is None or end is None or end.timestamp - start.timestamp < 60:
+            return None
+        change = getattr(end, field) - getattr(start, field)
+        return change / (end.timestamp - start.timestamp) * 3600
+
+    def trend(self, field: str, window: float = 86400) -> Optional[float]:
+        """Relative change of a field compared with ``window`` seconds ago.
+
+        Returns None until the series covers nearly the whole window.
+        """
+        start, end = self.at(window), self.latest
+        if start is None or end is None:
+            return None
+        if end.timestamp - start.timestamp < window * 0.95:
+            return None
+        previous = getattr(start, field)
+        if not previous:
+            return None
+        return (getattr(end, field) - previous) / previous
@@ -1,18 +1,82 @@
+import asyncio
 import base64
+import csv
+import hashlib
 import io
 import json
 import logging
+import os
+import re
+import sqlite3
+import time
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
 
+import aiohttp
+import aioredis
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 from obsidion import constants
 from obsidion.bot import Obsidion
+from obsidion.startup import requires
+from obsidion.utils.bedrock_ping import ping_bedrock
+from obsidion.utils.chat_formatting import humanize_timedelta, text_to_file
+from obsidion.utils.java_ping import (
+    PingError,
+    ping_java,
+    resolve_java_address,
+    split_address,
+    valid_address,
+)
 from obsidion.utils.utils import get
+from obsidion.utils.wiki_index import WikiIndex
 
 log = logging.getLogger(__name__)
 
+# seconds between edits of a message that is being filled in with results
+EDIT_INTERVAL = 2.0
+# more servers than this don't fit in an embed so they are sent as CSV
+BULK_EMBED_LIMIT = 50
+# longest address shown in the bulk embed, so 50 servers fit in its 6000 characters
+BULK_ADDRESS_LIMIT = 32
+# bulk result of an address that can't be parsed
+INVALID_ADDRESS = "invalid"
+# seconds to remember where an uploaded favicon lives
+FAVICON_EXPIRY = 30 * 24 * 60 * 60
+# stop using a signed CDN url this many seconds before it expires
+FAVICON_EXPIRY_MARGIN = 60 * 60
+
+SALES_URL = "https://api.mojang.com/orders/statistics"
+SALES_METRICS = ["item_sold_minecraft", "prepaid_card_redeemed_minecraft"]
+
+BUG_SEARCH_URL = "https://bugs.mojang.com/rest/api/2/search"
+BUG_KEY = re.compile(r"^[A-Z][A-Z0-9]*-\d+$")
+BUG_FIELDS = [
+    "summary",
+    "description",
+    "project",
+    "creator",
+    "created",
+    "updated",
+    "votes",
+    "watches",
+    "issuetype",
+    "status",
+    "resolution",
+    "versions",
+    "fixVersions",
+]
+BUG_EXPIRY = 600
+MAX_BUGS = 10
+
+WIKI_API_URL = "https://minecraft.gamepedia.com/api.php"
+WIKI_FOOTER_ICON = (
+    "https://upload.wikimedia.org/wikipedia/commons/thumb/5/53/Wikimedia-logo.png"
+    "/600px-Wikimedia-logo.png"
+)
+
 
 class info(commands.Cog):
     """commands that are bot related."""
@@ -21,6 +85,23 @@ class info(commands.Cog):
         """initialise the bot"""
         self.bot = bot
 
+        # service health and sales, refreshed in the background
+        self.mojang_status = {}
+        self.poll_mojang_status.change_interval(
+            seconds=constants.Mojang.status_interval
+        )
+        self.poll_mojang_status.start()
+
+        # offline copy of the wiki, the live API is only used when it's missing
+        self.wiki_index = None
+        if os.path.isfile(constants.Wiki.index_path or ""):
+            try:
+                self.wiki_index = WikiIndex(
+                    constants.Wiki.index_path, constants.Wiki.mmap_size
+                )
+            except sqlite3.Error:
+                log.exception("Could not open the wiki index")
+
     @staticmethod
     async def get_uuid(session, username: str):
         url = f"https://api.mojang.com/users/profiles/minecraft/{username}"
@@ -35,6 +116,7 @@ class info(commands.Cog):
         aliases=["whois", "p", "names", "namehistory", "pastnames", "namehis"]
     )
     @commands.cooldown(rate=1, per=5.0, type=commands.BucketType.user)
+    @requires("redis")
     async def profile(self, ctx: commands.Context, username: str):
         """View a players Minecraft UUID, Username history and skin."""
         await ctx.channel.trigger_typing()
@@ -89,46 +171,84 @@ class info(commands.Cog):
 
         await ctx.send(embed=embed)
 
-    @staticmethod
-    def get_server(ip: str, port):
-        """returns the server icon"""
-        if ":" in ip:  # deal with them providing port in string instead of seperate
-            ip, port = ip.split(":")
-            return (ip, port)
+    def default_server(self, ctx: commands.Context) -> Optional[str]:
+        """The server a guild has set to use when no address is given."""
+        if ctx.guild is None:
+            return None
+        return self.bot.settings.default_server(ctx.guild.id)
+
+    async def get_java_status(self, server_ip: str, port: int = None):
+        """Get the status of a Java server, pinging it directly where possible.
+
+        The address is resolved through SRV records like a real client would.
+        Results are cached for five minutes. The Obsidion API is only used when
+        the server can't be pinged from here.
+
+        Args:
+            server_ip (str): address of the server
+            port (int, optional): port of the server. Defaults to None.
+
+        Returns:
+            dict: status of the server or False if it is offline
+        """
         if port:
-            return (ip, port)
-        return (ip, None)
+            key = f"server_{server_ip}:{port}"
+        else:
+            key = f"server_{server_ip}"
+        if await self.bot.redis_session.exists(key):
+            return json.loads(await self.bot.redis_session.get(key))
+
+        try:
+            host, srv_port, address = await resolve_java_address(
+                self.bot.resolver, server_ip, int(port) if port else None
+            )
+            data = await ping_java(
+                host, srv_port, timeout=constants.Ping.timeout, connect_host=address
+            )
+        except PingError as e:
+            log.debug(f"Could not ping {server_ip} directly: {e}")
+            data = False
+            if constants.Ping.use_api_fallback:
+                url = f"{constants.Bot.api}/server/java"
+                payload = {"server": server_ip}
+                if port:
+                    payload["port"] = port
+                data = await get(self.bot.http_session, url, payload)
+        self.bot.dispatch(
+            "server_ping", f"{server_ip}:{port}" if port else server_ip, data
+        )
+        self.bot.redis_session.set(key, json.dumps(data), expire=300)
+        return data
 
     @commands.command()
     @commands.cooldown(rate=1, per=5.0, type=commands.BucketType.user)
-    async def server(self, ctx: commands.Context, server_ip: str, port: int = None):
+    @requires("redis")
+    async def server(
+        self, ctx: commands.Context, server_ip: str = None, port: int = None
+    ):
         """Get info on a minecraft server"""
+        server_ip = server_ip or self.default_server(ctx)
+        if server_ip is None:
+            await ctx.send(
+                f"{ctx.author}, :x: Give a server address or set a default with "
+                f"`{ctx.prefix}settings server <address>`"
+            )
+            return
         await ctx.channel.trigger_typing()
-        url = f"{constants.Bot.api}/server/java"
-        server_ip, _port = self.get_server(server_ip, port)
+        server_ip, _port = split_address(server_ip)
         if _port:
             port = _port
-        if port:
-            payload = {"server": server_ip, "port": port}
-        else:
-            payload = {"server": server_ip}
-
-        if port:
-            key = f"server_{server_ip}:ip"
-        else:
-            key = f"server_{server_ip}"
-        if await self.bot.redis_session.exists(key):
-            data = json.loads(await self.bot.redis_session.get(key))
-        else:
-            data = await get(ctx.bot.http_session, url, payload)
-            self.bot.redis_session.set(key, json.dumps(data), expire=300)
+        data = await self.get_java_status(server_ip, port)
         if not data:
             await ctx.send(
                 f"{ctx.author}, :x: The Java edition Minecraft server `{server_ip}` is currently not online or cannot be requested"
             )
             return
         embed = discord.Embed(title=f"Java Server: {server_ip}", color=0x00FF00)
-        embed.add_field(name="Description", value=data["description"])
+        # Discord rejects empty fields and a MOTD can be empty
+        embed.add_field(
+            name="Description", value=data["description"][:1024] or "\u200b"
+        )
 
         embed.add_field(
             name="Players",
@@ -144,48 +264,304 @@ class info(commands.Cog):
             value=f"Java Edition \n Running: `{data['version']['name']}` \n Protocol: `{data['version']['protocol']}`",
             inline=False,
         )
+        if data.get("latency") is not None:
+            embed.add_field(name="Latency", value=f"`{data['latency']}ms`")
         if data["favicon"]:
-            encoded = base64.decodebytes(data["favicon"][22:].encode("utf-8"))
-            image_bytesio = io.BytesIO(encoded)
-            favicon = discord.File(image_bytesio, "favicon.png")
+            key = self.favicon_key(data["favicon"])
+            url = await self.get_favicon_url(data["favicon"], key)
+            if url:
+                embed.set_thumbnail(url=url)
+                await ctx.send(embed=embed)
+                return
+            # nowhere to keep favicons so upload it once with this message
+            favicon = self.favicon_file(data["favicon"])
             embed.set_thumbnail(url="attachment://favicon.png")
-            await ctx.send(embed=embed, file=favicon)
+            message = await ctx.send(embed=embed, file=favicon)
+            if message.embeds and message.embeds[0].thumbnail.url:
+                await self.cache_favicon_url(key, message.embeds[0].thumbnail.url)
         else:
             embed.set_thumbnail(
                 url="https://media.discordapp.net/attachments/493764139290984459/602058959284863051/unknown.png"
             )
             await ctx.send(embed=embed)
 
+    @staticmethod
+    def favicon_key(favicon: str) -> str:
+        """Cache key of a favicon, the hash of its contents."""
+        return f"favicon_{hashlib.sha256(favicon.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    def favicon_file(favicon: str, filename: str = "favicon.png") -> discord.File:
+        """Decode a base64 favicon data URI into a file ready to upload."""
+        encoded = base64.decodebytes(favicon[22:].encode("utf-8"))
+        return discord.File(io.BytesIO(encoded), filename)
+
+    @staticmethod
+    def favicon_expiry(url: str) -> int:
+        """Seconds a favicon url can be cached for.
+
+        Discord signs attachment urls and stops serving them once the hex unix
+        time in their ``ex`` parameter has passed.
+        """
+        expires = parse_qs(urlsplit(url).query).get("ex")
+        if not expires:
+            return FAVICON_EXPIRY
+        try:
+            lifetime = int(expires[0], 16) - time.time() - FAVICON_EXPIRY_MARGIN
+        except ValueError:
+            return 0
+        return max(0, min(FAVICON_EXPIRY, int(lifetime)))
+
+    async def cache_favicon_url(self, key: str, url: str) -> None:
+        expiry = self.favicon_expiry(url)
+        if expiry:
+            await self.bot.redis_session.set(key, url, expire=expiry)
+
+    async def get_favicon_url(self, favicon: str, key: str) -> Optional[str]:
+        """Get the Discord CDN url of a favicon, uploading it only the first time it is seen.
+
+        Favicons are uploaded to the favicon channel and remembered by the hash of
+        their contents until their url expires, so popular servers rarely send
+        their icon again.
+
+        Args:
+            favicon (str): base64 data URI of the favicon
+            key (str): cache key from favicon_key
+
+        Returns:
+            Optional[str]: url of the uploaded favicon, None if it has to be attached
+        """
+        if await self.bot.redis_session.exists(key):
+            return await self.bot.redis_session.get(key, encoding="utf-8")
+
+        channel = self.bot.get_channel(constants.Channels.favicon_channel)
+        if channel is None:
+            return None
+        try:
+            message = await channel.send(file=self.favicon_file(favicon, f"{key}.png"))
+        except discord.HTTPException as e:
+            # Forbidden included, the favicon is attached to the reply instead
+            log.warning(f"Could not upload a favicon to the favicon channel: {e}")
+            return None
+        url = message.attachments[0].url
+        await self.cache_favicon_url(key, url)
+        return url
+
+    @staticmethod
+    def bulk_address(address: str) -> str:
+        """Shorten an address so it can't push a field past Discord's limits."""
+        address = address.replace("`", "")
+        if len(address) > BULK_ADDRESS_LIMIT:
+            return address[: BULK_ADDRESS_LIMIT - 1] + "…"
+        return address
+
+    def format_bulk_line(self, address: str, data) -> str:
+        """Describe the result of one server in the bulk status embed."""
+        address = self.bulk_address(address)
+        if data is None:
+            return f":hourglass: `{address}` - timed out"
+        if data == INVALID_ADDRESS:
+            return f":warning: `{address}` - invalid address"
+        if not data:
+            return f":x: `{address}` - offline"
+        return (
+            f":white_check_mark: `{address}` - "
+            f"{data['players']['online']:,}/{data['players']['max']:,} players, "
+            f"`{data['version']['name'][:24]}`"
+        )
+
+    def bulk_embed(
+        self, addresses: List[str], results: Dict[str, Optional[dict]]
+    ) -> discord.Embed:
+        """Build the bulk status embed, one field for every eight servers."""
+        embed = discord.Embed(
+            title=f"Java Servers ({len(results)}/{len(addresses)} checked)",
+            color=0x00FF00,
+        )
+        for start in range(0, len(addresses), 8):
+            lines = [
+                (
+                    self.format_bulk_line(address, results[address])
+                    if address in results
+                    else f":mag: `{self.bulk_address(address)}` - pinging"
+                )
+                for address in addresses[start : start + 8]
+            ]
+            embed.add_field(
+                name=f"Servers {start + 1}-{start + len(lines)}",
+                value="\n".join(lines),
+                inline=False,
+            )
+        return embed
+
+    @staticmethod
+    def bulk_csv(addresses: List[str], results: Dict[str, Optional[dict]]) -> str:
+        """Write the bulk status results as CSV."""
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(
+            ["address", "status", "online", "max", "version", "protocol", "latency"]
+        )
+        for address in addresses:
+            data = results.get(address)
+            if data is None:
+                writer.writerow([address, "timeout"] + [""] * 5)
+                continue
+            if data == INVALID_ADDRESS:
+                writer.writerow([address, "invalid"] + [""] * 5)
+                continue
+            if not data:
+                writer.writerow([address, "offline"] + [""] * 5)
+                continue
+            writer.writerow(
+                [
+                    address,
+                    "online",
+                    data["players"]["online"],
+                    data["players"]["max"],
+                    data["version"]["name"],
+                    data["version"]["protocol"],
+                    data.get("latency", ""),
+                ]
+            )
+        return output.getvalue()
+
     @commands.command()
-    @commands.cooldown(rate=1, per=5.0, type=commands.BucketType.user)
-    async def serverpe(self, ctx: commands.Context, server_ip: str, port: int = None):
-        """Get info on a minecraft PE server"""
-        await ctx.channel.trigger_typing()
-        url = f"{constants.Bot.api}/server/bedrock"
-        server_ip, _port = self.get_server(server_ip, port)
-        if _port:
-            port = _port
-        if port:
-            payload = {"server": server_ip, "port": port}
+    @commands.cooldown(rate=1, per=30.0, type=commands.BucketType.user)
+    @requires("redis")
+    async def servers(self, ctx: commands.Context, *addresses: str):
+        """Get the status of many Java servers at once.
+
+        Addresses can also be given in an attached text file. Start the list
+        with `csv` to get the results as a CSV file, long lists always are.
+        """
+        as_csv = bool(addresses) and addresses[0].lower() == "csv"
+        if as_csv:
+            addresses = addresses[1:]
+        addresses = list(addresses)
+        for attachment in ctx.message.attachments:
+            text = (await attachment.read()).decode("utf-8", "ignore")
+            addresses.extend(text.replace(",", " ").split())
+        # drop duplicates but keep the order they were given in
+        addresses = list(dict.fromkeys(addresses))
+
+        if not addresses:
+            await ctx.send(f"{ctx.author}, :x: Please provide some servers to check.")
+            return
+        if len(addresses) > constants.Ping.bulk_limit:
+            await ctx.send(
+                f"{ctx.author}, :x: You can only check {constants.Ping.bulk_limit} servers at once."
+            )
+            return
+        as_csv = as_csv or len(addresses) > BULK_EMBED_LIMIT
+
+        semaphore = asyncio.Semaphore(constants.Ping.bulk_concurrency)
+        results: Dict[str, Optional[dict]] = {}
+
+        async def check(address: str) -> None:
+            # one bad address must not take the rest of the list down with it
+            server_ip, port = split_address(address)
+            if not valid_address(server_ip, port):
+                results[address] = INVALID_ADDRESS
+                return
+            async with semaphore:
+                try:
+                    results[address] = await asyncio.wait_for(
+                        self.get_java_status(server_ip, port),
+                        constants.Ping.bulk_deadline,
+                    )
+                except asyncio.TimeoutError:
+                    results[address] = None
+                except ValueError:
+                    # includes hostnames IDNA can't encode
+                    results[address] = INVALID_ADDRESS
+                except (PingError, aiohttp.ClientError, OSError) as e:
+                    log.debug(f"Could not check {address}: {e!r}")
+                    results[address] = False
+
+        message = None
+        if not as_csv:
+            message = await ctx.send(embed=self.bulk_embed(addresses, results))
+        last_edit = time.monotonic()
+        for finished in asyncio.as_completed([check(a) for a in addresses]):
+            await finished
+            # coalesce edits so a fast list doesn't run into the rate limit
+            if message and time.monotonic() - last_edit >= EDIT_INTERVAL:
+                await message.edit(embed=self.bulk_embed(addresses, results))
+                last_edit = time.monotonic()
+
+        if as_csv:
+            await ctx.send(
+                file=text_to_file(self.bulk_csv(addresses, results), "servers.csv")
+            )
         else:
-            payload = {"server": server_ip}
+            await message.edit(embed=self.bulk_embed(addresses, results))
+
+    async def get_bedrock_status(self, server_ip: str, port: int = None):
+        """Get the status of a Bedrock server with a single UDP ping from here.
+
+        Results are cached for five minutes. The Obsidion API is only used when
+        the server can't be pinged from here.
 
+        Args:
+            server_ip (str): address of the server
+            port (int, optional): port of the server. Defaults to None.
+
+        Returns:
+            dict: status of the server or False if it is offline
+        """
         if port:
-            key = f"bserver_{server_ip}:ip"
+            key = f"bserver_{server_ip}:{port}"
         else:
             key = f"bserver_{server_ip}"
         if await self.bot.redis_session.exists(key):
-            data = json.loads(await self.bot.redis_session.get(key))
-        else:
-            data = await get(ctx.bot.http_session, url, payload)
-            self.bot.redis_session.set(key, json.dumps(data), expire=300)
+            return json.loads(await self.bot.redis_session.get(key))
+
+        try:
+            data = await ping_bedrock(
+                server_ip,
+                int(port or 19132),
+                timeout=constants.Ping.bedrock_timeout,
+                retries=constants.Ping.bedrock_retries,
+            )
+        except PingError as e:
+            log.debug(f"Could not ping {server_ip} directly: {e}")
+            data = False
+            if constants.Ping.use_api_fallback:
+                url = f"{constants.Bot.api}/server/bedrock"
+                payload = {"server": server_ip}
+                if port:
+                    payload["port"] = port
+                data = await get(self.bot.http_session, url, payload)
+        self.bot.redis_session.set(key, json.dumps(data), expire=300)
+        return data
+
+    @commands.command()
+    @commands.cooldown(rate=1, per=5.0, type=commands.BucketType.user)
+    @requires("redis")
+    async def serverpe(
+        self, ctx: commands.Context, server_ip: str = None, port: int = None
+    ):
+        """Get info on a minecraft PE server"""
+        server_ip = server_ip or self.default_server(ctx)
+        if server_ip is None:
+            await ctx.send(
+                f"{ctx.author}, :x: Give a server address or set a default with "
+                f"`{ctx.prefix}settings server <address>`"
+            )
+            return
+        await ctx.channel.trigger_typing()
+        server_ip, _port = split_address(server_ip)
+        if _port:
+            port = _port
+        data = await self.get_bedrock_status(server_ip, port)
         if not data:
             await ctx.send(
                 f"{ctx.author}, :x: The Bedrock edition Minecraft server `{server_ip}` is currently not online or cannot be requested"
             )
             return
         embed = discord.Embed(title=f"Bedrock Server: {server_ip}", color=0x00FF00)
-        embed.add_field(name="Description", value=data["motd"])
+        embed.add_field(name="Description", value=data["motd"][:1024] or "\u200b")
 
         embed.add_field(
             name="Players",
@@ -196,6 +572,8 @@ class info(commands.Cog):
             value=f"Bedrock Edition \n Running: `{data['software']['version']}` \n Map: `{data['map']}`",
             inline=True,
         )
+        if data.get("latency") is not None:
+            embed.add_field(name="Latency", value=f"`{data['latency']}ms`")
         if data["players"]["names"]:
             names = ""
             for player in data["players"]["names"][:10]:
@@ -203,69 +581,156 @@ class info(commands.Cog):
             embed.add_field(name="Players Online", value=names, inline=False)
         await ctx.send(embed=embed)
 
+    @tasks.loop(seconds=60.0)
+    async def poll_mojang_status(self) -> None:
+        """Refresh the snapshot of Mojang service health and game sales.
+
+        Only the process holding the lease asks Mojang, the others pick up the
+        snapshot it mirrors to Redis, so upstream load doesn't grow with the
+        number of processes.
+        """
+        lease_ttl = int(constants.Mojang.status_interval * 2.5)
+        if not await self.bot.lease("mojang_status", lease_ttl):
+            await self.read_mojang_status()
+            return
+        services = await get(self.bot.http_session, f"{constants.Bot.api}/mojang/check")
+        sales = False
+        payload = {"metricKeys": SALES_METRICS}
+        async with self.bot.http_session.post(SALES_URL, json=payload) as resp:
+            if resp.status == 200:
+                sales = await resp.json()
+
+        # keep the last good value of whichever half failed
+        snapshot = dict(self.mojang_status)
+        if services:
+            snapshot["services"] = services
+        if sales:
+            snapshot["sales"] = sales
+        if services or sales:
+            snapshot["updated"] = time.time()
+        self.mojang_status = snapshot
+        # the snapshot lives in memory, Redis only keeps it across restarts
+        if self.bot.redis_ready.is_set():
+            try:
+                await self.bot.redis_session.set("mojang_status", json.dumps(snapshot))
+            except (aioredis.RedisError, OSError) as e:
+                log.warning(f"Could not mirror the Mojang status to Redis: {e!r}")
+
+    @poll_mojang_status.before_loop
+    async def load_mojang_status(self) -> None:
+        """Start from the snapshot mirrored in Redis so a restart isn't blank.
+
+        Polling starts without it if Redis isn't up in time.
+        """
+        try:
+            await asyncio.wait_for(
+                self.bot.redis_ready.wait(), constants.Startup.gate_timeout
+            )
+        except asyncio.TimeoutError:
+            log.warning("Redis isn't up, polling Mojang without the saved status")
+            return
+        await self.read_mojang_status()
+
+    async def read_mojang_status(self) -> None:
+        """Use the snapshot mirrored in Redis if it is newer than ours."""
+        if not self.bot.redis_ready.is_set():
+            return
+        try:
+            saved = await self.bot.redis_session.get("mojang_status")
+        except (aioredis.RedisError, OSError) as e:
+            log.warning(f"Could not load the saved Mojang status: {e!r}")
+            return
+        if saved is None:
+            return
+        snapshot = json.loads(saved)
+        if snapshot.get("updated", 0) >= self.mojang_status.get("updated", 0):
+            self.mojang_status = snapshot
+
+    def cog_unload(self) -> None:
+        """Stop polling Mojang and close the wiki index on cog unload."""
+        self.poll_mojang_status.cancel()
+        if self.wiki_index is not None:
+            self.wiki_index.close()
+
     @commands.command(aliases=["sales"])
     @commands.cooldown(rate=1, per=5.0, type=commands.BucketType.user)
     async def status(self, ctx: commands.Context):
         """Check the status of all the Mojang services"""
-        await ctx.channel.trigger_typing()
-        data = await get(ctx.bot.http_session, f"{constants.Bot.api}/mojang/check")
-        sales_mapping = {
-            "item_sold_minecraft": True,
-            "prepaid_card_redeemed_minecraft": True,
-            "item_sold_cobalt": False,
-            "item_sold_scrolls": False,
-        }
-        payload = {"metricKeys": [k for (k, v) in sales_mapping.items() if v]}
+        snapshot = self.mojang_status
+        if "updated" not in snapshot:
+            await ctx.send(
+                f"{ctx.author}, :x: The Mojang status is still being fetched, please try again shortly."
+            )
+            return
 
-        if await self.bot.redis_session.exists("status"):
-            sales_data = json.loads(await self.bot.redis_session.get("status"))
-        else:
-            url = "https://api.mojang.com/orders/statistics"
-            async with ctx.bot.http_session.post(url, json=payload) as resp:
-                if resp.status == 200:
-                    sales_data = await resp.json()
-            await self.bot.redis_session.set("status", json.dumps(sales_data))
-
-        services = ""
-        for service in data:
-            if data[service] == "green":
-                services += (
-                    f":green_heart: - {service}: **This service is healthy.** \n"
-                )
-            else:
-                services += f":heart: - {service}: **This service is offline.** \n"
         embed = discord.Embed(title="Minecraft Service Status", color=0x00FF00)
-        embed.add_field(
-            name="Minecraft Game Sales",
-            value=f"Total Sales: **{sales_data['total']:,}** Last 24 Hours: **{sales_data['last24h']:,}**",
-        )
-        embed.add_field(name="Minecraft Services:", value=services, inline=False)
-
+        if "sales" in snapshot:
+            sales_data = snapshot["sales"]
+            embed.add_field(
+                name="Minecraft Game Sales",
+                value=f"Total Sales: **{sales_data['total']:,}** Last 24 Hours: **{sales_data['last24h']:,}**",
+            )
+        if "services" in snapshot:
+            data = snapshot["services"]
+            services = ""
+            for service in data:
+                if data[service] == "green":
+                    services += (
+                        f":green_heart: - {service}: **This service is healthy.** \n"
+                    )
+                else:
+                    services += f":heart: - {service}: **This service is offline.** \n"
+            embed.add_field(name="Minecraft Services:", value=services, inline=False)
+
+        age = humanize_timedelta(seconds=time.time() - snapshot["updated"])
+        embed.set_footer(text=f"Updated {age} ago" if age else "Updated just now")
         await ctx.send(embed=embed)
 
-    @commands.command()
-    @commands.cooldown(rate=1, per=1.0, type=commands.BucketType.user)
-    async def mcbug(self, ctx: commands.Context, bug: str = None):
-        """Gets info on a bug from bugs.mojang.com."""
-        if not bug:
-            await ctx.send(f"{ctx.message.author.mention},  :x: Please provide a bug.")
-            return
-        await ctx.channel.trigger_typing()
-        data = await get(
-            ctx.bot.http_session, f"https://bugs.mojang.com/rest/api/latest/issue/{bug}"
-        )
-        if not data:
-            await ctx.send(
-                f"{ctx.message.author.mention},  :x: The bug {bug} was not found."
+    async def get_bugs(self, keys: List[str]) -> Dict[str, dict]:
+        """Get issues from bugs.mojang.com, fetching every uncached one in a single search.
+
+        Args:
+            keys (List[str]): issue keys such as MC-4
+
+        Returns:
+            Dict[str, dict]: issues that exist, by key
+        """
+        bugs = {}
+        missing = []
+        for key in keys:
+            if await self.bot.redis_session.exists(f"mcbug_{key}"):
+                bugs[key] = json.loads(await self.bot.redis_session.get(f"mcbug_{key}"))
+            else:
+                missing.append(key)
+        if not missing:
+            return bugs
+
+        params = {
+            "jql": f"key in ({','.join(missing)})",
+            "fields": ",".join(BUG_FIELDS),
+            "maxResults": len(missing),
+            # don't fail the whole search because one of the keys doesn't exist
+            "validateQuery": "warn",
+        }
+        data = await get(self.bot.http_session, BUG_SEARCH_URL, params)
+        for issue in data["issues"] if data else []:
+            bugs[issue["key"]] = issue
+            self.bot.redis_session.set(
+                f"mcbug_{issue['key']}", json.dumps(issue), expire=BUG_EXPIRY
             )
-            return
+        return bugs
+
+    @staticmethod
+    def bug_embed(key: str, data: dict) -> discord.Embed:
+        """Show everything about a single bug."""
         embed = discord.Embed(
-            description=data["fields"]["description"], color=0x00FF00,
+            description=(data["fields"]["description"] or "")[:2000],
+            color=0x00FF00,
         )
 
         embed.set_author(
             name=f"{data['fields']['project']['name']} - {data['fields']['summary']}",
-            url=f"https://bugs.mojang.com/browse/{bug}",
+            url=f"https://bugs.mojang.com/browse/{key}",
         )
 
         info = (
@@ -281,17 +746,66 @@ class info(commands.Cog):
             f"Type: {data['fields']['issuetype']['name']}\n"
             f"Status: {data['fields']['status']['name']}\n"
         )
-        if data["fields"]["resolution"]["name"]:
+        if data["fields"]["resolution"]:
             details += f"Resolution: {data['fields']['resolution']['name']}\n"
-        if "version" in data["fields"]:
+        if data["fields"].get("versions"):
             details += f"Affected: { ', '.join(s['name'] for s in data['fields']['versions'])}\n"
-        if "fixVersions" in data["fields"]:
-            if len(data["fields"]["fixVersions"]) >= 1:
-                details += f"Fixed Version: {data['fields']['fixVersions'][0]} + {len(data['fields']['fixVersions'])}\n"
+        if data["fields"].get("fixVersions"):
+            details += f"Fixed Version: {data['fields']['fixVersions'][0]['name']} + {len(data['fields']['fixVersions'])}\n"
 
         embed.add_field(name="Information", value=info)
         embed.add_field(name="Details", value=details)
+        return embed
+
+    @commands.command()
+    @commands.cooldown(rate=1, per=1.0, type=commands.BucketType.user)
+    @requires("redis")
+    async def mcbug(self, ctx: commands.Context, *bugs: str):
+        """Gets info on one or more bugs from bugs.mojang.com."""
+        keys = list(dict.fromkeys(bug.upper() for bug in bugs))
+        if not keys:
+            await ctx.send(f"{ctx.message.author.mention},  :x: Please provide a bug.")
+            return
+        invalid = [key for key in keys if not BUG_KEY.match(key)]
+        if invalid:
+            await ctx.send(
+                f"{ctx.message.author.mention},  :x: `{invalid[0]}` is not a bug, they look like `MC-4`."
+            )
+            return
+        if len(keys) > MAX_BUGS:
+            await ctx.send(
+                f"{ctx.message.author.mention},  :x: You can only look up {MAX_BUGS} bugs at once."
+            )
+            return
+        await ctx.channel.trigger_typing()
+        data = await self.get_bugs(keys)
+        if not data:
+            await ctx.send(
+                f"{ctx.message.author.mention},  :x: The bug {keys[0]} was not found."
+            )
+            return
 
+        if len(keys) == 1:
+            await ctx.send(embed=self.bug_embed(keys[0], data[keys[0]]))
+            return
+
+        embed = discord.Embed(title="Mojang Bugs", color=0x00FF00)
+        for key in keys:
+            if key not in data:
+                embed.add_field(name=key, value="This bug was not found.", inline=False)
+                continue
+            fields = data[key]["fields"]
+            status = fields["status"]["name"]
+            if fields["resolution"]:
+                status += f" ({fields['resolution']['name']})"
+            embed.add_field(
+                name=f"{key} - {fields['summary']}"[:256],
+                value=(
+                    f"[{fields['issuetype']['name']}](https://bugs.mojang.com/browse/{key}) | "
+                    f"Status: {status} | Votes: {fields['votes']['votes']}"
+                ),
+                inline=False,
+            )
         await ctx.send(embed=embed)
 
     @commands.command()
@@ -300,54 +814,59 @@ class info(commands.Cog):
         """Get an article from the minecraft wiki"""
         await ctx.channel.trigger_typing()
 
-        def generate_payload(query):
-            """Generate the payload for Gamepedia based on a query string."""
-            payload = {
-                "action": "query",
-                "titles": query.replace(" ", "_"),
-                "format": "json",
-                "formatversion": "2",  # Cleaner json results
-                "prop": "extracts",  # Include extract in returned results
-                "exintro": "1",  # Only return summary paragraph(s) before main content
-                "redirects": "1",  # Follow redirects
-                "explaintext": "1",  # Make sure it's plaintext (not HTML)
-            }
-            return payload
-
-        base_url = "https://minecraft.gamepedia.com/api.php"
-        footer_icon = (
-            "https://upload.wikimedia.org/wikipedia/commons/thumb/5/53/Wikimedia-logo.png"
-            "/600px-Wikimedia-logo.png"
-        )
-
-        payload = generate_payload(query)
-
-        result = await get(ctx.bot.http_session, base_url, payload)
+        page = None
+        if self.wiki_index is not None:
+            try:
+                page = self.wiki_index.lookup(query)
+            except sqlite3.Error:
+                log.exception("Wiki index lookup failed")
+        if page is None:
+            page = await self.fetch_wiki_page(query)
 
+        if page is None:
+            await ctx.send(f"I'm sorry, I couldn't find \"{query}\" on Gamepedia")
+            return
+        await ctx.send(embed=self.wiki_embed(*page))
+
+    async def fetch_wiki_page(self, query: str) -> Optional[Tuple[str, str]]:
+        """Get the title and intro of an article from the live wiki API."""
+        payload = {
+            "action": "query",
+            "titles": query.replace(" ", "_"),
+            "format": "json",
+            "formatversion": "2",  # Cleaner json results
+            "prop": "extracts",  # Include extract in returned results
+            "exintro": "1",  # Only return summary paragraph(s) before main content
+            "redirects": "1",  # Follow redirects
+            "explaintext": "1",  # Make sure it's plaintext (not HTML)
+        }
+        result = await get(self.bot.http_session, WIKI_API_URL, payload)
         try:
             # Get the last page. Usually this is the only page.
             page = result["query"]["pages"][-1]
-            title = page["title"]
-            description = page["extract"].strip().replace("\n", "\n\n")
-            url = f"https://minecraft.gamepedia.com/{title.replace(' ', '_')}"
-
-            if len(description) > 1500:
-                description = description[:1500].strip()
-                description += f"... [(read more)]({url})"
-
-            embed = discord.Embed(
-                title=f"Minecraft Gamepedia: {title}",
-                description=f"\u2063\n{description}\n\u2063",
-                color=0x00FF00,
-                url=url,
-            )
-            embed.set_footer(
-                text="Information provided by Wikimedia", icon_url=footer_icon
-            )
-            await ctx.send(embed=embed)
+            return page["title"], page["extract"]
+        except (KeyError, TypeError):
+            return None
 
-        except KeyError:
-            await ctx.send(f"I'm sorry, I couldn't find \"{query}\" on Gamepedia")
+    @staticmethod
+    def wiki_embed(title: str, extract: str) -> discord.Embed:
+        description = extract.strip().replace("\n", "\n\n")
+        url = f"https://minecraft.gamepedia.com/{title.replace(' ', '_')}"
+
+        if len(description) > 1500:
+            description = description[:1500].strip()
+            description += f"... [(read more)]({url})"
+
+        embed = discord.Embed(
+            title=f"Minecraft Gamepedia: {title}",
+            description=f"\u2063\n{description}\n\u2063",
+            color=0x00FF00,
+            url=url,
+        )
+        embed.set_footer(
+            text="Information provided by Wikimedia", icon_url=WIKI_FOOTER_ICON
+        )
+        return embed
 
     # @commands.command()
     async def version(self, ctx):
@@ -87,10 +87,17 @@ class miscellaneous(commands.Cog):
         print(uptime_str)
 
         statics = (
+            f"Servers: `{await self.bot.guild_count():,}`\n"
+            f"Shards: `{self.bot.shard_count}`\n"
             f"Memory Usage: `{ram}MB`\n"
             f"Uptime: `{uptime_str}`\n"
             f"Discord.py: `v{discord.__version__}`"
         )
+        if self.bot.cluster:
+            statics = (
+                f"Cluster: `{self.bot.cluster.id + 1}/{self.bot.cluster.count}`\n"
+                + statics
+            )
 
         links = (
             "[INVITE BOT](https://discordapp.com/oauth2/authorize?client_id=691589447074054224&scope=bot&permissions=314448)\n"
@@ -0,0 +1,5 @@
+from .monitor import monitor
+
+
+def setup(bot):
+    bot.add_cog(monitor(bot))
@@ -0,0 +1,288 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Set, Tuple
+
+import discord
+from discord.ext import commands, tasks
+
+from obsidion import constants
+from obsidion.bot import Obsidion
+from obsidion.startup import requires
+from obsidion.utils.java_ping import (
+    PingError,
+    normalise_address,
+    ping_java,
+    resolve_java_address,
+    split_address,
+    valid_address,
+)
+
+from .scheduler import TimerWheel
+
+log = logging.getLogger(__name__)
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS monitored_servers (
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    address TEXT NOT NULL,
+    PRIMARY KEY (guild_id, address)
+)
+"""
+
+
+class monitor(commands.Cog):
+    """Watch Minecraft servers and get told when they change."""
+
+    def __init__(self, bot: Obsidion):
+        self.bot = bot
+        self.wheel = TimerWheel(constants.Monitor.interval, constants.Monitor.slots)
+
+        # address -> {guild_id: channel_id}, one ping serves every guild watching it
+        self.subscribers: Dict[str, Dict[int, int]] = {}
+        self.guild_servers: Dict[int, Set[str]] = {}
+        # address -> (online, version) seen on the last ping
+        self.last_state: Dict[str, Tuple[bool, Optional[str]]] = {}
+        # address -> failed pings in a row
+        self.failures: Dict[str, int] = {}
+
+        self._in_flight: Set[str] = set()
+        self._semaphore = asyncio.Semaphore(constants.Monitor.concurrency)
+
+        self.scheduler.change_interval(seconds=self.wheel.tick)
+        self.scheduler.start()
+
+    def cog_unload(self) -> None:
+        """Stop pinging servers on cog unload."""
+        self.scheduler.cancel()
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether a guild is on one of the shards this process runs."""
+        return (guild_id >> 22) % self.bot.shard_count in self.bot.cluster.shard_ids
+
+    @staticmethod
+    def normalise(address: str) -> str:
+        return normalise_address(address)
+
+    def subscribe(self, guild_id: int, channel_id: int, address: str) -> None:
+        self.subscribers.setdefault(address, {})[guild_id] = channel_id
+        self.guild_servers.setdefault(guild_id, set()).add(address)
+        self.wheel.add(address)
+
+    def unsubscribe(self, guild_id: int, address: str) -> None:
+        guilds = self.subscribers.get(address, {})
+        guilds.pop(guild_id, None)
+        self.guild_servers.get(guild_id, set()).discard(address)
+        if not guilds:
+            self.subscribers.pop(address, None)
+            self.last_state.pop(address, None)
+            self.failures.pop(address, None)
+            self.wheel.discard(address)
+
+    @tasks.loop(seconds=1.0)
+    async def scheduler(self) -> None:
+        """Start the pings that are due on this tick of the wheel."""
+        for address in self.wheel.advance():
+            # a server that is slower than a whole interval keeps its old ping
+            if address not in self._in_flight:
+                self._in_flight.add(address)
+                self.bot.create_background_task(self.check(address))
+
+    @scheduler.before_loop
+    async def load_subscriptions(self) -> None:
+        """Create the table if needed and schedule every watched server."""
+        await self.bot.db_ready.wait()
+        async with self.bot.db_pool.acquire() as conn:
+            await conn.execute(CREATE_TABLE)
+            rows = await conn.fetch(
+                "SELECT guild_id, channel_id, address FROM monitored_servers"
+            )
+        for row in rows:
+            # another cluster watches the servers of guilds on its own shards
+            if self.bot.cluster and not self.owns_guild(row["guild_id"]):
+                continue
+            self.subscribe(row["guild_id"], row["channel_id"], row["address"])
+        log.info(f"Monitoring {len(self.wheel)} servers for {len(rows)} subscriptions")
+
+    async def fetch_status(self, address: str) -> Optional[dict]:
+        """Ping a watched server, returning None if it is offline."""
+        host, port = split_address(address)
+        async with self._semaphore:
+            try:
+                host, port, ip = await resolve_java_address(
+                    self.bot.resolver, host, port
+                )
+                return await ping_java(
+                    host, port, timeout=constants.Ping.timeout, connect_host=ip
+                )
+            except (PingError, OSError, ValueError):
+                return None
+
+    async def check(self, address: str) -> None:
+        """Ping a server and alert every subscribed channel if it changed."""
+        try:
+            data = await self.fetch_status(address)
+        finally:
+            self._in_flight.discard(address)
+        self.bot.dispatch("server_ping", address, data)
+
+        if address not in self.subscribers:
+            # it was unwatched while we were pinging it
+            return
+        if data is None:
+            self.failures[address] = self.failures.get(address, 0) + 1
+            # a single lost ping isn't worth waking anyone up for
+            if self.failures[address] < constants.Monitor.offline_after:
+                return
+        else:
+            self.failures.pop(address, None)
+        state = (data is not None, data["version"]["name"] if data else None)
+        previous = self.last_state.get(address)
+        self.last_state[address] = state
+        if previous is None or previous == state:
+            return
+
+        embed = self.change_embed(address, previous, state, data)
+        channels = [
+            self.bot.get_channel(channel_id)
+            for channel_id in self.subscribers[address].values()
+        ]
+        await asyncio.gather(
+            *(self.send_alert(channel, embed) for channel in channels if channel)
+        )
+
+    @staticmethod
+    async def send_alert(channel: discord.TextChannel, embed: discord.Embed) -> None:
+        try:
+            await channel.send(embed=embed)
+        except discord.HTTPException as e:
+            log.debug(f"Could not send a monitor alert to {channel.id}: {e}")
+
+    @staticmethod
+    def change_embed(
+        address: str,
+        previous: Tuple[bool, Optional[str]],
+        state: Tuple[bool, Optional[str]],
+        data: Optional[dict],
+    ) -> discord.Embed:
+        """Describe how a server changed since it was last pinged."""
+        if not state[0]:
+            return discord.Embed(
+                title=f"{address} has gone offline", color=discord.Colour.red()
+            )
+        if not previous[0]:
+            embed = discord.Embed(title=f"{address} is back online", color=0x00FF00)
+        else:
+            embed = discord.Embed(
+                title=f"{address} changed version",
+                description=f"`{previous[1]}` -> `{state[1]}`",
+                color=0x00FF00,
+            )
+        embed.add_field(
+            name="Players",
+            value=f"Online: `{data['players']['online']:,}` \n Maximum: `{data['players']['max']:,}`",
+        )
+        embed.add_field(name="Version", value=f"`{state[1]}`")
+        return embed
+
+    @commands.group(name="monitor", invoke_without_command=True)
+    @commands.guild_only()
+    async def _monitor(self, ctx: commands.Context):
+        """List the servers watched in this server."""
+        addresses = sorted(self.guild_servers.get(ctx.guild.id, ()))
+        if not addresses:
+            await ctx.send(
+                f"No servers are being watched, add one with `{ctx.prefix}monitor add <server>`"
+            )
+            return
+        lines = []
+        for address in addresses:
+            channel_id = self.subscribers[address][ctx.guild.id]
+            state = self.last_state.get(address)
+            if state is None:
+                status = ":grey_question:"
+            elif state[0]:
+                status = ":green_heart:"
+            else:
+                status = ":heart:"
+            lines.append(f"{status} `{address}` in <#{channel_id}>")
+        embed = discord.Embed(
+            title="Watched Servers", description="\n".join(lines), color=0x00FF00
+        )
+        await ctx.send(embed=embed)
+
+    @_monitor.command(name="add")
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    @requires("database")
+    async def monitor_add(
+        self,
+        ctx: commands.Context,
+        address: str,
+        channel: discord.TextChannel = None,
+    ):
+        """Watch a server and post changes to a channel."""
+        channel = channel or ctx.channel
+        host, port = split_address(address)
+        if not valid_address(host, port):
+            await ctx.send(
+                f"{ctx.author}, :x: `{address[:64]}` is not a valid server address."
+            )
+            return
+        address = self.normalise(address)
+        watched = self.guild_servers.get(ctx.guild.id, set())
+        if address not in watched and len(watched) >= constants.Monitor.max_per_guild:
+            await ctx.send(
+                f"{ctx.author}, :x: You can only watch {constants.Monitor.max_per_guild} servers."
+            )
+            return
+
+        # a typo would otherwise be pinged forever and only ever show as offline
+        await ctx.channel.trigger_typing()
+        try:
+            await resolve_java_address(self.bot.resolver, host, port)
+        except (PingError, OSError, ValueError):
+            await ctx.send(
+                f"{ctx.author}, :x: `{address}` could not be found, check the address."
+            )
+            return
+        data = await self.fetch_status(address)
+
+        async with self.bot.db_pool.acquire() as conn:
+            await conn.execute(
+                "INSERT INTO monitored_servers (guild_id, channel_id, address) "
+                "VALUES ($1, $2, $3) ON CONFLICT (guild_id, address) "
+                "DO UPDATE SET channel_id = EXCLUDED.channel_id",
+                ctx.guild.id,
+                channel.id,
+                address,
+            )
+        self.subscribe(ctx.guild.id, channel.id, address)
+        # the first scheduled ping reports a change from this
+        self.last_state.setdefault(
+            address, (data is not None, data["version"]["name"] if data else None)
+        )
+        await ctx.send(
+            f":white_check_mark: Changes to `{address}` will be posted in {channel.mention}, "
+            f"it is {'online' if data else 'offline'} right now"
+        )
+
+    @_monitor.command(name="remove", aliases=["delete"])
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    @requires("database")
+    async def monitor_remove(self, ctx: commands.Context, address: str):
+        """Stop watching a server."""
+        address = self.normalise(address)
+        if address not in self.guild_servers.get(ctx.guild.id, ()):
+            await ctx.send(f"{ctx.author}, :x: `{address}` is not being watched.")
+            return
+
+        async with self.bot.db_pool.acquire() as conn:
+            await conn.execute(
+                "DELETE FROM monitored_servers WHERE guild_id = $1 AND address = $2",
+                ctx.guild.id,
+                address,
+            )
+        self.unsubscribe(ctx.guild.id, address)
+        await ctx.send(f":white_check_mark: Stopped watching `{address}`")
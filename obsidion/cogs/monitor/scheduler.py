@@ -0,0 +1,50 @@
+from typing import Dict, Hashable, List, Set
+
+
+class TimerWheel:
+    """
+    Spread periodic jobs evenly over an interval.
+
+    The interval is cut into ``slots`` ticks and every key lives in exactly one
+    slot, always the emptiest one when it is added. Each call to :meth:`advance`
+    hands back the keys due on the current tick, so however many keys are
+    registered they run at a steady rate instead of all at once.
+    """
+
+    def __init__(self, interval: float, slots: int):
+        self.interval = interval
+        self.slots = slots
+        self._wheel: List[Set[Hashable]] = [set() for _ in range(slots)]
+        self._slot_of: Dict[Hashable, int] = {}
+        self._position = 0
+
+    @property
+    def tick(self) -> float:
+        """Seconds between two calls to :meth:`advance`."""
+        return self.interval / self.slots
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slot_of
+
+    def add(self, key: Hashable) -> None:
+        """Schedule a key in the least busy slot, doing nothing if it is already scheduled."""
+        if key in self._slot_of:
+            return
+        slot = min(range(self.slots), key=lambda i: len(self._wheel[i]))
+        self._wheel[slot].add(key)
+        self._slot_of[key] = slot
+
+    def discard(self, key: Hashable) -> None:
+        """Stop scheduling a key."""
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            self._wheel[slot].discard(key)
+
+    def advance(self) -> Set[Hashable]:
+        """Move the wheel on by one tick and return the keys that are due."""
+        due = set(self._wheel[self._position])
+        self._position = (self._position + 1) % self.slots
+        return due
@@ -1,5 +1,4 @@
 from discord.ext import commands
-from asyncrcon import AsyncRCON, AuthenticationException
 
 
 class rcon(commands.Cog):
@@ -10,6 +9,9 @@ class rcon(commands.Cog):
     @commands.cooldown(rate=1, per=5.0, type=commands.BucketType.user)
     async def rsend(self, ctx: commands.Context, addr: str, pw: str, message: str):
         """Send an rcon message to a minecraft server."""
+        # the rcon cog is optional, keep its dependency out of startup
+        from asyncrcon import AsyncRCON, AuthenticationException
+
         await ctx.trigger_typing()
 
         _rcon = AsyncRCON(addr, pw)
@@ -1,5 +1,14 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
 import discord
 from discord.ext import commands
+
+from obsidion import constants
+from obsidion.startup import services_ready
 from .utils import (
     wyncraftClasses,
     hiveMCStatus,
@@ -13,7 +22,25 @@ from .utils import (
     veltpvp,
 )
 from obsidion.utils.utils import usernameToUUID
-import json
+
+log = logging.getLogger(__name__)
+
+# seconds between edits of a message that is being filled in with results
+EDIT_INTERVAL = 2.0
+# seconds a player's stats are cached for
+CACHE_EXPIRY = 28800
+# players per block of the comparison table and stats shown in it
+COMPARE_COLUMNS = 5
+COMPARE_ROWS = 12
+# hive stats that aren't worth comparing
+HIVE_HIDDEN_STATS = {
+    "UUID",
+    "cached",
+    "firstLogin",
+    "lastLogin",
+    "achievements",
+    "title",
+}
 
 hive_con = {
     # "survival_games": "SG",
@@ -48,9 +75,374 @@ hive_con = {
 }
 
 
+def summarise_wynncraft(data: dict) -> str:
+    levels = [c["class_level"] for c in data["classes"]] or [0]
+    return f"Classes: `{len(data['classes'])}`\nHighest Level: `{max(levels)}`"
+
+
+def summarise_hive(data: dict) -> str:
+    return f"Rank: `{data['rank'][0]}`"
+
+
+def summarise_games(data: dict) -> str:
+    games = [list(game)[0] for game in data["game_stats"]]
+    return f"Games: `{len(games)}`\n" + ", ".join(games[:5])
+
+
+def summarise_rank(data: dict) -> str:
+    played = data.get("timeplayed") or data.get("time_played")
+    return f"Rank: `{data['rank']}`\nTime Played: `{played}`"
+
+
+def summarise_minesaga(data: dict) -> str:
+    return f"Joined: `{data['joined']}`\nPlay Time: `{data['play_time']}`"
+
+
+def summarise_manacube(data: dict) -> str:
+    return f"Rank: `{data['rank']}`\nCubits: `{data['cubits']}`"
+
+
+def compare_wynncraft(data: dict, game: Optional[str]) -> Dict[str, str]:
+    levels = [c["class_level"] for c in data["classes"]] or [0]
+    return {
+        "Classes": str(len(data["classes"])),
+        "Highest Level": str(max(levels)),
+        "Total Level": str(sum(levels)),
+        "Deaths": str(sum(c["class_deaths"] for c in data["classes"])),
+    }
+
+
+def compare_hive(data: dict, game: Optional[str]) -> Dict[str, str]:
+    return {
+        stat: str(value)
+        for stat, value in data["stats"][0].items()
+        if stat not in HIVE_HIDDEN_STATS and not isinstance(value, (list, dict))
+    }
+
+
+def compare_profile(*fields: str):
+    """Compare the stats of one game, or the given profile fields without a game."""
+
+    def compare(data: dict, game: Optional[str]) -> Dict[str, str]:
+        if game is None:
+            stats = {
+                field.replace("_", " ").title(): str(data[field])
+                for field in fields
+                if field in data
+            }
+            stats["Games"] = str(len(data["game_stats"]))
+            return stats
+        for entry in data["game_stats"]:
+            name, stats = next(iter(entry.items()))
+            if squash(name) == squash(game):
+                return {stat: str(value) for stat, value in stats.items()}
+        return {}
+
+    return compare
+
+
+def compare_manacube(data: dict, game: Optional[str]) -> Dict[str, str]:
+    if game is None:
+        return {
+            "Rank": str(data["rank"]),
+            "Cubits": str(data["cubits"]),
+            "First Seen": str(data["firstSeen"]),
+        }
+    stats = data.get(squash(game))
+    if not isinstance(stats, dict):
+        return {}
+    return {stat: str(value) for stat, value in stats.items()}
+
+
+def squash(name: str) -> str:
+    return name.lower().replace(" ", "").replace("_", "")
+
+
+# name: (host, redis key prefix, fetcher, command with the full stats, summary, comparison)
+NETWORKS = {
+    "Wynncraft": (
+        "api.wynncraft.com",
+        "wyncraft",
+        wyncraftClasses,
+        "wyncraft",
+        summarise_wynncraft,
+        compare_wynncraft,
+    ),
+    "Hive": (
+        "api.hivemc.com",
+        "hiveMCRank",
+        hiveMCRank,
+        "hiverank",
+        summarise_hive,
+        compare_hive,
+    ),
+    "BlocksMC": (
+        "blocksmc.com",
+        "blocksmc",
+        blocksmc,
+        "blocksmc",
+        summarise_rank,
+        compare_profile("rank", "timeplayed"),
+    ),
+    "GommeHD": (
+        "www.gommehd.net",
+        "gommehd",
+        gommehd,
+        "gommehd",
+        summarise_games,
+        compare_profile(),
+    ),
+    "VeltPVP": (
+        "www.veltpvp.com",
+        "veltpvp",
+        veltpvp,
+        "veltpvp",
+        summarise_rank,
+        compare_profile("rank", "time_played", "first_joined", "last_seen"),
+    ),
+    "Minesaga": (
+        "www.minesaga.org",
+        "minesaga",
+        minesaga,
+        "minesaga",
+        summarise_minesaga,
+        compare_profile("joined", "last_seen", "play_time"),
+    ),
+    "UniversoCraft": (
+        "stats.universocraft.com",
+        "universocraft",
+        universocraft,
+        "universocraft",
+        summarise_games,
+        compare_profile(),
+    ),
+    "Manacube": (
+        "manacube.com",
+        "manacube",
+        manacube,
+        "manacube",
+        summarise_manacube,
+        compare_manacube,
+    ),
+}
+
+
 class servers(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # host -> semaphore, so a big comparison doesn't hammer one site
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def cog_check(self, ctx: commands.Context) -> bool:
+        # every command caches player stats in Redis
+        return await services_ready(ctx, "redis")
+
+    async def fetch_player(self, host: str, key: str, fetcher, *args):
+        """Get a player's stats from a network, cached in Redis for eight hours.
+
+        Args:
+            host (str): host the fetcher talks to, requests to it are rate limited together
+            key (str): redis key of the stats
+            fetcher: coroutine function from utils taking the args and a session
+
+        Returns:
+            dict: stats of the player or False if they have none
+        """
+        if await self.bot.redis_session.exists(key):
+            return json.loads(await self.bot.redis_session.get(key))
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(
+                constants.Servers.host_concurrency
+            )
+        async with limit:
+            data = await fetcher(*args, self.bot.http_session)
+        await self.bot.redis_session.set(key, json.dumps(data), expire=CACHE_EXPIRY)
+        return data
+
+    @staticmethod
+    def lookup_embed(
+        username: str, uuid, results: Dict[str, str], prefix: str
+    ) -> discord.Embed:
+        embed = discord.Embed(
+            title=f"Network lookup for {username}",
+            description=f"{len(results)}/{len(NETWORKS)} networks checked",
+            color=0x00FF00,
+        )
+        if uuid:
+            embed.set_thumbnail(url=f"https://visage.surgeplay.com/bust/{uuid}")
+        for name, (_, _, _, command, _, _) in NETWORKS.items():
+            value = results.get(name, ":hourglass: Checking...")
+            if not value.startswith(":"):
+                value += f"\nMore: `{prefix}{command} {username}`"
+            embed.add_field(name=name, value=value)
+        return embed
+
+    @commands.command(aliases=["networks"])
+    @commands.cooldown(rate=1, per=15.0, type=commands.BucketType.user)
+    async def lookup(self, ctx: commands.Context, username: str):
+        """Find a player's stats on every supported network at once."""
+        results: Dict[str, str] = {}
+        uuid = None
+
+        async def check(name: str) -> None:
+            host, prefix, fetcher, _, summarise, _ = NETWORKS[name]
+            try:
+                data = await asyncio.wait_for(
+                    self.fetch_player(host, f"{prefix}_{username}", fetcher, username),
+                    constants.Servers.lookup_deadline,
+                )
+            except asyncio.TimeoutError:
+                results[name] = ":stopwatch: Timed out"
+                return
+            except Exception as e:
+                # the scrapers break whenever a site changes its pages
+                log.debug(f"Looking up {username} on {name} failed: {e!r}")
+                results[name] = ":warning: Unavailable"
+                return
+            if not data:
+                results[name] = ":x: Not found"
+                return
+            try:
+                results[name] = summarise(data)
+            except (KeyError, IndexError, TypeError):
+                results[name] = "Found"
+
+        async def resolve_uuid() -> None:
+            nonlocal uuid
+            try:
+                uuid = await usernameToUUID(username, self.bot.http_session)
+            except Exception as e:
+                log.debug(f"Could not resolve the uuid of {username}: {e!r}")
+
+        message = await ctx.send(
+            embed=self.lookup_embed(username, uuid, results, ctx.prefix)
+        )
+        last_edit = time.monotonic()
+        for finished in asyncio.as_completed(
+            [resolve_uuid(), *(check(name) for name in NETWORKS)]
+        ):
+            await finished
+            # coalesce edits so fast networks don't run into the rate limit
+            if time.monotonic() - last_edit >= EDIT_INTERVAL:
+                await message.edit(
+                    embed=self.lookup_embed(username, uuid, results, ctx.prefix)
+                )
+                last_edit = time.monotonic()
+        await message.edit(embed=self.lookup_embed(username, uuid, results, ctx.prefix))
+
+    @staticmethod
+    def compare_table(usernames: List[str], stats: Dict[str, Dict[str, str]]) -> str:
+        """Lay the players' stats out side by side, a block of columns at a time."""
+        rows: List[str] = []
+        for player in usernames:
+            for stat in stats.get(player, {}):
+                if stat not in rows:
+                    rows.append(stat)
+        rows = rows[:COMPARE_ROWS]
+
+        blocks = []
+        for start in range(0, len(usernames), COMPARE_COLUMNS):
+            players = usernames[start : start + COMPARE_COLUMNS]
+            lines = [f"{'':<14}" + "".join(f"{p[:10]:>11}" for p in players)]
+            for stat in rows:
+                cells = "".join(f"{stats[p].get(stat, '-')[:10]:>11}" for p in players)
+                lines.append(f"{stat[:14]:<14}{cells}")
+            blocks.append("```\n" + "\n".join(lines) + "\n```")
+        return "\n".join(blocks)
+
+    @commands.command()
+    @commands.cooldown(rate=1, per=30.0, type=commands.BucketType.user)
+    async def compare(self, ctx: commands.Context, network: str, *usernames: str):
+        """Compare the stats of 2 to 10 players on a network.
+
+        Pick a game with network:game, for example hive:bedwars or blocksmc:skywars.
+        """
+        network, _, game = network.partition(":")
+        game = game or None
+        names = {squash(name): name for name in NETWORKS}
+        if squash(network) not in names:
+            await ctx.send(
+                f"{ctx.author}, :x: Pick one of these networks: {', '.join(NETWORKS)}"
+            )
+            return
+        name = names[squash(network)]
+        # the same player given twice would only waste a column
+        usernames = list(dict.fromkeys(usernames))
+        if not 2 <= len(usernames) <= constants.Servers.compare_max_players:
+            await ctx.send(
+                f"{ctx.author}, :x: You can compare between 2 and "
+                f"{constants.Servers.compare_max_players} players."
+            )
+            return
+
+        host, prefix, fetcher, _, _, extract = NETWORKS[name]
+        code = None
+        if name == "Hive":
+            if game is None or game.lower() not in hive_con:
+                await ctx.send(
+                    f"{ctx.author}, :x: Pick a Hive game, for example `hive:bedwars`"
+                )
+                return
+            code = hive_con[game.lower()]
+            prefix, fetcher = f"hiveMCGameStats_{code}", hiveMCGameStats
+
+        await ctx.channel.trigger_typing()
+        stats: Dict[str, Dict[str, str]] = {}
+        missing: Dict[str, str] = {}
+        games: List[str] = []
+
+        async def fetch(username: str) -> None:
+            args = (username, code) if name == "Hive" else (username,)
+            try:
+                data = await asyncio.wait_for(
+                    self.fetch_player(host, f"{prefix}_{username}", fetcher, *args),
+                    constants.Servers.lookup_deadline,
+                )
+            except asyncio.TimeoutError:
+                missing[username] = "timed out"
+                return
+            except Exception as e:
+                log.debug(f"Fetching {username} from {name} failed: {e!r}")
+                missing[username] = "unavailable"
+                return
+            if not data:
+                missing[username] = "not found"
+                return
+            try:
+                stats[username] = extract(data, None if name == "Hive" else game)
+            except (KeyError, IndexError, TypeError):
+                missing[username] = "unavailable"
+                return
+            for entry in data.get("game_stats", []):
+                games.extend(g for g in entry if g not in games)
+
+        await asyncio.gather(*(fetch(username) for username in usernames))
+
+        found = [username for username in usernames if username in stats]
+        embed = discord.Embed(
+            title=f"{name} comparison" + (f": {game}" if game else ""),
+            color=0x00FF00,
+        )
+        if found and any(stats[username] for username in found):
+            embed.description = self.compare_table(found, stats)
+        else:
+            embed.description = "There are no stats to compare."
+        if missing:
+            embed.add_field(
+                name="Missing",
+                value="\n".join(
+                    f"`{username}`: {reason}" for username, reason in missing.items()
+                ),
+            )
+        if games and game is None:
+            embed.add_field(
+                name="Games",
+                value=", ".join(games[:20])
+                + f"\nCompare one with `{ctx.prefix}compare {name.lower()}:<game>`",
+            )
+        embed.timestamp = ctx.message.created_at
+        await ctx.send(embed=embed)
 
     @commands.command()
     @commands.cooldown(rate=1, per=5.0, type=commands.BucketType.user)
@@ -497,7 +889,8 @@ class servers(commands.Cog):
                 else:
                     value += f"`{stat}`: {data['stats'][0][stat]}\n"
             embed.add_field(
-                name=f"{game.replace('_', ' ').upper()} Stats", value=value,
+                name=f"{game.replace('_', ' ').upper()} Stats",
+                value=value,
             )
             await ctx.send(embed=embed)
         else:
@@ -1,5 +1,11 @@
 import json
-from bs4 import BeautifulSoup
+
+
+def parse_html(html):
+    # bs4 and lxml are only imported once a scraper first needs them
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, "lxml")
 
 
 async def get_html(url, session):
@@ -101,7 +107,7 @@ async def wyncraftClasses(username, session):
 async def blocksmc(username, session):
     url = f"https://blocksmc.com/player/{username}"
     html = await get_html(url, session)
-    soup = BeautifulSoup(html, "lxml")
+    soup = parse_html(html)
     try:
         rank = (
             soup.find("p", {"class": ["profile-rank"]})
@@ -133,7 +139,7 @@ async def blocksmc(username, session):
 async def universocraft(username, session):
     url = f"https://stats.universocraft.com/stats.php?player={username}"
     html = await get_html(url, session)
-    soup = BeautifulSoup(html, "lxml")
+    soup = parse_html(html)
     data = {"game_stats": []}
     if (
         soup.find("p").get_text()
@@ -154,7 +160,7 @@ async def universocraft(username, session):
 async def minesaga(username, session):
     url = f"https://www.minesaga.org/player/{username}"
     html = await get_html(url, session)
-    soup = BeautifulSoup(html, "lxml")
+    soup = parse_html(html)
     main_info = soup.find("div", {"class": ["dd-profile-details"]})
     try:
         joined = main_info.find("h4").get_text().strip()
@@ -189,7 +195,7 @@ async def minesaga(username, session):
 async def gommehd(username, session):
     url = f"https://www.gommehd.net/player/index?playerName={username}"
     html = await get_html(url, session)
-    soup = BeautifulSoup(html, "lxml")
+    soup = parse_html(html)
     data = {"game_stats": []}
     if soup.find("title").get_text() == "Statistiken":
         return False
@@ -209,7 +215,7 @@ async def veltpvp(username, session):
     html = await get_html(url, session)
     if html == False:
         return False
-    soup = BeautifulSoup(html, "lxml")
+    soup = parse_html(html)
     rank = soup.find("div", {"id": "profile"}).find("h2").get_text().strip()
     last_seen = (
         soup.find("div", {"class": "bottom"})
@@ -15,7 +15,7 @@ import logging
 import os
 from collections.abc import Mapping
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 import yaml
 
@@ -182,6 +182,8 @@ class Bot(metaclass=YAMLGetter):
     hypixelapi_token: str
     status: str
     default_prefix: str
+    # drop the message cache and any guild state commands don't read
+    lean: bool
 
 
 class Channels(metaclass=YAMLGetter):
@@ -192,6 +194,7 @@ class Channels(metaclass=YAMLGetter):
     stack_trace_channel: int
     feedback_channel: int
     bug_channel: int
+    favicon_channel: int
 
 
 class Discord_bot_list(metaclass=YAMLGetter):
@@ -216,6 +219,32 @@ class Database(metaclass=YAMLGetter):
     port: int
 
 
+class Startup(metaclass=YAMLGetter):
+    section = "startup"
+
+    timeout: float
+    retries: int
+    retry_delay: float
+    # longest a command waits for Redis and Postgres after a restart
+    gate_timeout: float
+
+
+class Shutdown(metaclass=YAMLGetter):
+    section = "shutdown"
+
+    # longest to wait for running commands, then for the cogs to flush
+    drain_timeout: float
+    flush_timeout: float
+
+
+class Sessions(metaclass=YAMLGetter):
+    section = "sessions"
+
+    # resume gateway sessions across restarts, needs Redis
+    enabled: bool
+    ttl: int
+
+
 class Redis(metaclass=YAMLGetter):
     section = "redis"
 
@@ -233,6 +262,135 @@ class Stats(metaclass=YAMLGetter):
     statsd_host: str
 
 
+class HTTP(metaclass=YAMLGetter):
+    section = "http"
+
+    dns_min_ttl: int
+    dns_max_ttl: int
+    dns_cache_size: int
+    keepalive_timeout: int
+    prewarm_interval: int
+    prewarm_urls: List[str]
+
+
+class Ping(metaclass=YAMLGetter):
+    section = "ping"
+
+    timeout: float
+    bedrock_timeout: float
+    bedrock_retries: int
+    use_api_fallback: bool
+    bulk_limit: int
+    bulk_concurrency: int
+    bulk_deadline: float
+
+
+class Servers(metaclass=YAMLGetter):
+    section = "servers"
+
+    lookup_deadline: float
+    host_concurrency: int
+    compare_max_players: int
+
+
+class Hypixel(metaclass=YAMLGetter):
+    section = "hypixel"
+
+    api_keys: List[str]
+    poll_interval: int
+    history_span: int
+    default_ttl: int
+    cache_ttl: Dict[str, int]
+
+
+class Cluster(metaclass=YAMLGetter):
+    section = "cluster"
+
+    enabled: bool
+    clusters: int
+    # 0 asks discord for the recommended count
+    shard_count: int
+    heartbeat_interval: int
+    heartbeat_timeout: int
+    startup_timeout: int
+    restart_delay: int
+
+
+class Extensions(metaclass=YAMLGetter):
+    section = "extensions"
+
+    load: List[str]
+    # loaded in the background once the bot is ready
+    deferred: List[str]
+
+
+class Streams(metaclass=YAMLGetter):
+    section = "streams"
+
+    # extensions the gateway runs itself, every other command goes to the workers
+    gateway_extensions: List[str]
+    max_length: int
+    concurrency: int
+    block_timeout: float
+    max_age: int
+    claim_idle: int
+    claim_interval: int
+    max_deliveries: int
+    cache_ttl: int
+    cache_size: int
+    heartbeat_interval: int
+    heartbeat_timeout: int
+
+
+class Interactions(metaclass=YAMLGetter):
+    section = "interactions"
+
+    host: str
+    port: int
+    path: str
+    # hex public key from the developer portal
+    public_key: str
+    api_base: str
+    defer_after: float
+    max_skew: int
+    excluded_cogs: List[str]
+
+
+class Mojang(metaclass=YAMLGetter):
+    section = "mojang"
+
+    status_interval: int
+
+
+class Wiki(metaclass=YAMLGetter):
+    section = "wiki"
+
+    index_path: Optional[str]
+    mmap_size: int
+
+
+class Monitor(metaclass=YAMLGetter):
+    section = "monitor"
+
+    interval: int
+    slots: int
+    concurrency: int
+    max_per_guild: int
+    offline_after: int
+
+
+class History(metaclass=YAMLGetter):
+    section = "history"
+
+    capacity: int
+    # most servers to keep samples of in memory, watched ones are never dropped
+    max_servers: int
+    flush_interval: int
+    hourly_retention: int
+    daily_retention: int
+    idle_expiry: int
+
+
 # Paths
 BOT_DIR = os.path.dirname(__file__)
 PROJECT_ROOT = os.path.abspath(os.path.join(BOT_DIR, os.pardir))
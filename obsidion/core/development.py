@@ -63,12 +63,15 @@ class development(commands.Cog):
     @commands.command(hidden=True)
     async def shutdown(self, ctx: commands.Context):
         """shutdown the bot"""
-        self.bot.close()
+        await ctx.send(":white_check_mark: Shutting down once running commands finish")
+        # not awaited, the drain waits for this command to return
+        self.bot.loop.create_task(self.bot.shutdown())
 
     @commands.command(hidden=True)
-    async def reboot(self, _ctx: commands.Context):
-        """shutdown the bot"""
-        self.bot._recreate()
+    async def reboot(self, ctx: commands.Context):
+        """restart the bot"""
+        await ctx.send(":white_check_mark: Restarting once running commands finish")
+        self.bot.loop.create_task(self.bot.shutdown(restart=True))
 
 
 def setup(bot) -> None:
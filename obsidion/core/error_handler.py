@@ -5,6 +5,8 @@ from discord.ext.commands import Cog, Context, errors
 import discord
 
 from obsidion import constants
+from obsidion.bot import ShuttingDown
+from obsidion.startup import ServiceUnavailable
 
 log = logging.getLogger(__name__)
 
@@ -35,6 +37,10 @@ class ErrorHandler(Cog):
         ):
             # not deal with command not found
             pass
+        elif isinstance(e, ShuttingDown):
+            await ctx.send(
+                f"{ctx.author}, :x: I'm restarting, please try again in a moment."
+            )
         elif isinstance(e, errors.UserInputError):
             await self.handle_user_input_error(ctx, e)
         elif isinstance(e, errors.CheckFailure):
@@ -104,6 +110,7 @@ class ErrorHandler(Cog):
         * BotMissingAnyRole
         * NoPrivateMessage
         * InWhitelistCheckFailure
+        * ServiceUnavailable
         """
         bot_missing_errors = (
             errors.BotMissingPermissions,
@@ -124,6 +131,10 @@ class ErrorHandler(Cog):
             await ctx.send(
                 f"Sorry, it looks like I don't have the **{fmt}**permission(s) I need to do that."
             )
+        elif isinstance(e, ServiceUnavailable):
+            await ctx.send(
+                f"{ctx.author}, :x: This command is unavailable right now, please try again later."
+            )
 
     @staticmethod
     async def handle_unexpected_error(ctx: Context, e: errors.CommandError) -> None:
@@ -1,5 +1,5 @@
 # these are checks to run on every command
-from discord.ext.commands import Context
+from discord.ext.commands import Context, DisabledCommand
 
 
 def init_global_checks(bot):
@@ -17,3 +17,11 @@ def init_global_checks(bot):
     def bots(ctx: Context) -> bool:
         """Check the user is not another bot."""
         return not ctx.author.bot
+
+    # check rather than check_once so it also runs for every subcommand
+    @bot.check
+    def enabled_in_guild(ctx: Context) -> bool:
+        """Check the command or its cog hasn't been disabled in this guild."""
+        if ctx.guild and ctx.bot.settings.is_disabled(ctx.guild.id, ctx.command):
+            raise DisabledCommand(f"{ctx.command} is disabled in this server")
+        return True
@@ -2,7 +2,6 @@ import logging
 from datetime import datetime
 from time import mktime
 import discord
-import feedparser
 from discord.ext import commands, tasks
 
 from obsidion.bot import Obsidion
@@ -25,6 +24,9 @@ class MinecraftNews(commands.Cog):
     async def get_media(self) -> None:
         async with self.bot.http_session.get(Minecraft_News_RSS) as resp:
             text = await resp.text()
+        # imported on the first poll rather than at startup
+        import feedparser
+
         data = feedparser.parse(text)
 
         # select the most recent post
@@ -0,0 +1,515 @@
+"""
+Serve slash commands from Discord's interaction webhooks instead of the gateway.
+
+    python -m obsidion.interactions            # serve interactions
+    python -m obsidion.interactions --register # upload the slash commands
+
+Discord posts every interaction to the configured url. The request is
+verified against the application's public key, turned into the text a
+prefix command would have been invoked with and run through the normal
+command pipeline, so converters, checks, cooldowns and the error handler
+all behave the same. Replies go to the interaction's webhook. A command
+that hasn't replied within ``defer_after`` seconds is deferred and its
+first reply fills in the deferred message later.
+
+Nothing is kept between requests apart from the REST cache of guilds and
+channels, so any number of these processes can run behind a load balancer.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import signal
+import time
+from enum import IntEnum
+from typing import List, Optional, Sequence, Tuple
+
+import aiohttp
+import discord
+from aiohttp import web
+from discord.ext import commands
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
+
+from obsidion import constants
+from obsidion.streams import RestCache, login_without_gateway
+
+log = logging.getLogger(__name__)
+
+# Discord limits on application commands
+MAX_NAME_LENGTH = 32
+MAX_DESCRIPTION_LENGTH = 100
+
+
+class InteractionType(IntEnum):
+    PING = 1
+    APPLICATION_COMMAND = 2
+
+
+class ResponseType(IntEnum):
+    PONG = 1
+    CHANNEL_MESSAGE = 4
+    DEFERRED_CHANNEL_MESSAGE = 5
+
+
+class OptionType(IntEnum):
+    SUB_COMMAND = 1
+    SUB_COMMAND_GROUP = 2
+    STRING = 3
+    INTEGER = 4
+    BOOLEAN = 5
+
+
+# message flag that only shows a reply to the user who ran the command
+EPHEMERAL = 64
+
+
+def describe(command: commands.Command) -> str:
+    return (command.short_doc or command.name)[:MAX_DESCRIPTION_LENGTH]
+
+
+def param_options(command: commands.Command) -> List[dict]:
+    """Slash command options for the parameters of a command."""
+    options = []
+    for name, param in command.clean_params.items():
+        if param.annotation is int:
+            option_type = OptionType.INTEGER
+        elif param.annotation is bool:
+            option_type = OptionType.BOOLEAN
+        else:
+            option_type = OptionType.STRING
+        options.append(
+            {
+                "type": option_type,
+                "name": name.lower()[:MAX_NAME_LENGTH],
+                "description": name.replace("_", " "),
+                "required": param.default is param.empty
+                and param.kind is not param.VAR_POSITIONAL,
+            }
+        )
+    return options
+
+
+def command_schema(command: commands.Command) -> dict:
+    """The slash command for a command, groups get one level of subcommands."""
+    schema = {"name": command.name.lower(), "description": describe(command)}
+    if isinstance(command, commands.Group):
+        schema["options"] = [
+            {
+                "type": OptionType.SUB_COMMAND,
+                "name": sub.name.lower(),
+                "description": describe(sub),
+                "options": param_options(sub),
+            }
+            for sub in sorted(command.commands, key=lambda c: c.name)
+            if not sub.hidden
+        ]
+    else:
+        schema["options"] = param_options(command)
+    return schema
+
+
+def exported_commands(bot: commands.Bot) -> List[commands.Command]:
+    return [
+        command
+        for command in sorted(bot.commands, key=lambda c: c.name)
+        if not command.hidden
+        and command.cog_name not in constants.Interactions.excluded_cogs
+        and not (isinstance(command, commands.Group) and not command.commands)
+    ]
+
+
+def quote(value: str) -> str:
+    """Quote an argument so the command parser reads it as one word."""
+    if value and not any(c.isspace() for c in value) and not value.startswith('"'):
+        return value
+    return '"' + value.replace('"', '\\"') + '"'
+
+
+def invocation(
+    command: commands.Command, options: Sequence[dict]
+) -> Tuple[commands.Command, str]:
+    """The command an interaction runs and its arguments as command text.
+
+    Arguments are written in the order of the command's parameters, stopping
+    at the first one that wasn't given.
+    """
+    for option in options:
+        if option["type"] in (OptionType.SUB_COMMAND, OptionType.SUB_COMMAND_GROUP):
+            sub = command.get_command(option["name"])
+            if sub is not None:
+                return invocation(sub, option.get("options", []))
+    values = {option["name"]: option["value"] for option in options}
+    words = []
+    for name, param in command.clean_params.items():
+        value = values.get(name.lower())
+        if value is None:
+            break
+        if param.kind in (param.KEYWORD_ONLY, param.VAR_POSITIONAL):
+            # these consume the rest of the text anyway
+            words.append(str(value))
+        else:
+            words.append(quote(str(value)))
+    return command, " ".join(words)
+
+
+class InteractionMessage:
+    """A reply to an interaction, which only the interaction's webhook can edit."""
+
+    __slots__ = ("interaction", "id", "content", "embeds")
+
+    def __init__(self, interaction: "Interaction", message_id: str, data: dict):
+        self.interaction = interaction
+        self.id = message_id
+        self.content = data.get("content")
+        self.embeds = [discord.Embed.from_dict(e) for e in data.get("embeds", [])]
+
+    async def edit(self, *, content: Optional[str] = None, embed=None) -> None:
+        payload = {}
+        if content is not None:
+            payload["content"] = content
+        if embed is not None:
+            payload["embeds"] = [embed.to_dict()]
+        await self.interaction.request("PATCH", f"/messages/{self.id}", payload)
+
+    async def delete(self) -> None:
+        await self.interaction.request("DELETE", f"/messages/{self.id}")
+
+
+class Interaction:
+    """One slash command invocation and the webhook its replies go to."""
+
+    __slots__ = (
+        "bot",
+        "data",
+        "application_id",
+        "token",
+        "response",
+        "acknowledged",
+        "original_sent",
+    )
+
+    def __init__(self, bot, data: dict):
+        self.bot = bot
+        self.data = data
+        self.application_id = data.get("application_id") or bot.user.id
+        self.token = data["token"]
+        # body of the http response, set by the first reply or by deferring
+        self.response = bot.loop.create_future()
+        # the webhook only works once discord has the response
+        self.acknowledged = asyncio.Event()
+        self.original_sent = False
+
+    @property
+    def webhook_url(self) -> str:
+        return (
+            f"{constants.Interactions.api_base}/webhooks/"
+            f"{self.application_id}/{self.token}"
+        )
+
+    def defer(self) -> dict:
+        if not self.response.done():
+            self.response.set_result({"type": ResponseType.DEFERRED_CHANNEL_MESSAGE})
+        return self.response.result()
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[dict] = None,
+        files: Sequence[discord.File] = (),
+    ) -> Optional[dict]:
+        await self.acknowledged.wait()
+        if files:
+            form = aiohttp.FormData()
+            form.add_field(
+                "payload_json", json.dumps(payload), content_type="application/json"
+            )
+            for i, file in enumerate(files):
+                form.add_field(f"file{i}", file.fp, filename=file.filename)
+            kwargs = {"data": form}
+        else:
+            kwargs = {"json": payload}
+        async with self.bot.http_session.request(
+            method, self.webhook_url + path, **kwargs
+        ) as resp:
+            data = await resp.json() if resp.status != 204 else None
+            if resp.status >= 400:
+                raise discord.HTTPException(resp, data)
+            return data
+
+    async def send(
+        self,
+        content: Optional[str] = None,
+        *,
+        embed: Optional[discord.Embed] = None,
+        files: Sequence[discord.File] = (),
+        ephemeral: bool = False,
+    ) -> InteractionMessage:
+        payload = {
+            "content": content,
+            "embeds": [embed.to_dict()] if embed else [],
+        }
+        if self.bot.allowed_mentions:
+            payload["allowed_mentions"] = self.bot.allowed_mentions.to_dict()
+        if ephemeral:
+            payload["flags"] = EPHEMERAL
+
+        # the quickest replies go back in the http response itself
+        if not self.response.done() and not files:
+            self.response.set_result(
+                {"type": ResponseType.CHANNEL_MESSAGE, "data": payload}
+            )
+            self.original_sent = True
+            return InteractionMessage(self, "@original", payload)
+
+        self.defer()
+        if not self.original_sent and not files:
+            self.original_sent = True
+            data = await self.request("PATCH", "/messages/@original", payload)
+            return InteractionMessage(self, "@original", data)
+        # the deferred message can't take files, so they go in a followup
+        data = await self.request("POST", "?wait=true", payload, files)
+        return InteractionMessage(self, data["id"], data)
+
+    async def finish(self) -> None:
+        """Make sure the user isn't left waiting on a command that never replied."""
+        if not self.response.done():
+            await self.send(
+                ":x: This command has nothing to show here.", ephemeral=True
+            )
+        elif not self.original_sent:
+            await self.request("DELETE", "/messages/@original")
+
+
+class InteractionContext(commands.Context):
+    """Context whose replies go to the interaction's webhook."""
+
+    interaction: Interaction
+
+    async def send(
+        self, content=None, *, embed=None, file=None, files=None, **kwargs
+    ) -> InteractionMessage:
+        files = files or ([file] if file else [])
+        return await self.interaction.send(
+            None if content is None else str(content), embed=embed, files=files
+        )
+
+    async def trigger_typing(self) -> None:
+        # deferring already shows that the bot is thinking
+        pass
+
+
+def load_verify_key(public_key: Optional[str]) -> Optional[VerifyKey]:
+    """The key interactions are signed with, or None if it isn't configured.
+
+    Args:
+        public_key (Optional[str]): the application's public key in hex
+
+    Returns:
+        Optional[VerifyKey]: the key, None if unset, a placeholder or malformed
+    """
+    if not public_key or str(public_key).lower() == "none":
+        return None
+    try:
+        return VerifyKey(bytes.fromhex(str(public_key)))
+    except ValueError:
+        return None
+
+
+class InteractionServer:
+    """The web server Discord posts interactions to."""
+
+    def __init__(self, bot, verify_key: VerifyKey):
+        self.bot = bot
+        self.cache = RestCache(bot)
+        self.verify_key = verify_key
+        self.app = web.Application()
+        self.app.router.add_post(constants.Interactions.path, self.handle)
+        self._tasks = set()
+
+    def verify(self, signature: str, timestamp: str, body: bytes) -> bool:
+        """Check a request really comes from Discord and isn't being replayed."""
+        try:
+            if abs(time.time() - int(timestamp)) > constants.Interactions.max_skew:
+                return False
+            self.verify_key.verify(timestamp.encode() + body, bytes.fromhex(signature))
+        except (BadSignatureError, ValueError):
+            return False
+        return True
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        body = await request.read()
+        if not self.verify(
+            request.headers.get("X-Signature-Ed25519", ""),
+            request.headers.get("X-Signature-Timestamp", ""),
+            body,
+        ):
+            return web.Response(status=401, text="invalid request signature")
+
+        data = json.loads(body)
+        if data["type"] == InteractionType.PING:
+            return web.json_response({"type": ResponseType.PONG})
+        if data["type"] != InteractionType.APPLICATION_COMMAND:
+            return web.Response(status=400, text="unsupported interaction type")
+
+        interaction = Interaction(self.bot, data)
+        task = self.bot.create_background_task(self.run(interaction))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        try:
+            response = await asyncio.wait_for(
+                asyncio.shield(interaction.response),
+                constants.Interactions.defer_after,
+            )
+        except asyncio.TimeoutError:
+            response = interaction.defer()
+
+        resp = web.json_response(response)
+        await resp.prepare(request)
+        await resp.write_eof()
+        interaction.acknowledged.set()
+        return resp
+
+    async def get_context(self, interaction: Interaction) -> InteractionContext:
+        """Build the message a prefix command would have come from."""
+        data = interaction.data
+        command = self.bot.get_command(data["data"]["name"])
+        if command is None:
+            args = ""
+            name = data["data"]["name"]
+        else:
+            command, args = invocation(command, data["data"].get("options", []))
+            name = command.qualified_name
+
+        guild_id = data.get("guild_id")
+        member = data.get("member")
+        payload = {
+            "id": data["id"],
+            "channel_id": data["channel_id"],
+            "author": member["user"] if member else data["user"],
+            "content": f"{self.bot.settings.prefix(int(guild_id) if guild_id else None)}"
+            f"{name} {args}".rstrip(),
+            "timestamp": None,
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0,
+        }
+        if guild_id:
+            payload["guild_id"] = guild_id
+            payload["member"] = member
+
+        message = await self.cache.message(payload)
+        ctx = await self.bot.get_context(message, cls=InteractionContext)
+        ctx.interaction = interaction
+        return ctx
+
+    async def run(self, interaction: Interaction) -> None:
+        try:
+            try:
+                ctx = await self.get_context(interaction)
+            except discord.HTTPException as e:
+                log.warning(f"Could not fetch the channel of an interaction: {e}")
+                await interaction.send(
+                    ":x: I need to be in this server to run commands here.",
+                    ephemeral=True,
+                )
+                return
+            await self.bot.invoke(ctx)
+        except Exception:
+            log.exception(f"Failed to run interaction {interaction.data['id']}")
+        finally:
+            try:
+                await interaction.finish()
+            except (aiohttp.ClientError, discord.HTTPException) as e:
+                log.warning(f"Failed to finish interaction: {e}")
+
+    async def serve(self, token: str, stop: asyncio.Event) -> None:
+        await login_without_gateway(self.bot, self.cache, token)
+        runner = web.AppRunner(self.app)
+        await runner.setup()
+        site = web.TCPSite(
+            runner, constants.Interactions.host, constants.Interactions.port
+        )
+        await site.start()
+        log.info(
+            f"Serving interactions on {constants.Interactions.host}:"
+            f"{constants.Interactions.port}{constants.Interactions.path}"
+        )
+        await stop.wait()
+        await runner.cleanup()
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+
+
+async def register(bot, token: str, guild_id: Optional[int] = None) -> None:
+    """Replace the application's slash commands with the bot's commands.
+
+    Global commands take up to an hour to show up, commands registered to a
+    single guild show up at once so use that while testing.
+    """
+    await bot.login(token)
+    # the application id of a bot is its user id
+    application_id = (await bot.http.get_user("@me"))["id"]
+    url = f"{constants.Interactions.api_base}/applications/{application_id}"
+    if guild_id:
+        url += f"/guilds/{guild_id}"
+    schema = [command_schema(command) for command in exported_commands(bot)]
+    async with bot.http_session.put(
+        f"{url}/commands",
+        json=schema,
+        headers={"Authorization": f"Bot {token}"},
+    ) as resp:
+        resp.raise_for_status()
+    log.info(f"Registered {len(schema)} slash commands")
+
+
+def main() -> None:
+    # imported here so python -m obsidion.interactions can reuse the bot setup
+    from obsidion.__main__ import create_bot, load_extensions
+
+    parser = argparse.ArgumentParser(prog="obsidion.interactions")
+    parser.add_argument(
+        "--register", action="store_true", help="upload the slash commands and exit"
+    )
+    parser.add_argument(
+        "--guild", type=int, help="register to one guild instead of globally"
+    )
+    args = parser.parse_args()
+
+    bot = create_bot()
+    # every command has to be loaded to be registered
+    load_extensions(bot, interactions=True, defer=not args.register)
+    loop = bot.loop
+    try:
+        if args.register:
+            loop.run_until_complete(
+                register(bot, constants.Bot.discord_token, args.guild)
+            )
+            return
+        verify_key = load_verify_key(constants.Interactions.public_key)
+        if verify_key is None:
+            log.critical(
+                "Set interactions.public_key to the application's public key, "
+                "the 64 hex characters shown in the developer portal"
+            )
+            raise SystemExit(1)
+        server = InteractionServer(bot, verify_key)
+        stop = asyncio.Event()
+        loop.add_signal_handler(signal.SIGTERM, stop.set)
+        loop.run_until_complete(server.serve(constants.Bot.discord_token, stop))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(bot.close())
+
+
+if __name__ == "__main__":
+    main()
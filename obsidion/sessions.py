@@ -0,0 +1,92 @@
+"""
+Keep gateway sessions across restarts so shards can RESUME instead of IDENTIFY.
+
+When the bot closes gracefully every shard's session id and sequence number
+are written to Redis. The next process to start those shards tries to RESUME
+them. Discord answers a session it no longer knows with INVALID_SESSION and
+discord.py then identifies as usual, so a stale session only costs a round
+trip. Sessions are used once and expire after ``sessions.ttl`` seconds.
+
+A resumed session never sends GUILD_CREATE, so the guild ids of each shard
+are saved with its session and fetched over REST in the background once the
+shard has resumed. Messages from a guild that isn't fetched yet fetch it first.
+"""
+
+import json
+import logging
+from typing import Dict, Iterable, List
+
+import aioredis
+
+from obsidion import constants
+
+log = logging.getLogger(__name__)
+
+SESSION_KEY = "gateway_session_{}"
+
+
+async def save_sessions(
+    redis,
+    sockets: Dict[int, object],
+    shard_count: int,
+    guilds: Dict[int, List[int]],
+) -> None:
+    """Store the session of every shard that has one.
+
+    Args:
+        redis (aioredis.Redis): redis pool
+        sockets (Dict[int, DiscordWebSocket]): gateway socket of each shard
+        shard_count (int): total shards, a session is only valid for the same count
+        guilds (Dict[int, List[int]]): ids of the guilds of each shard
+    """
+    saved = 0
+    for shard_id, ws in sockets.items():
+        if ws.session_id is None:
+            continue
+        payload = {
+            "session_id": ws.session_id,
+            "sequence": ws.sequence,
+            "shard_count": shard_count,
+            "guilds": guilds.get(shard_id, []),
+        }
+        try:
+            await redis.set(
+                SESSION_KEY.format(shard_id),
+                json.dumps(payload),
+                expire=constants.Sessions.ttl,
+            )
+        except (aioredis.RedisError, OSError) as e:
+            log.warning(f"Could not save the session of shard {shard_id}: {e}")
+            return
+        saved += 1
+    log.info(f"Saved {saved} gateway sessions for resuming")
+
+
+async def load_sessions(
+    redis, shard_ids: Iterable[int], shard_count: int
+) -> Dict[int, dict]:
+    """Take the saved sessions of the given shards out of Redis.
+
+    Returns:
+        Dict[int, dict]: session id, sequence and guilds of each shard that can resume
+    """
+    shard_ids = list(shard_ids)
+    keys = [SESSION_KEY.format(shard_id) for shard_id in shard_ids]
+    if not keys:
+        return {}
+    try:
+        values = await redis.mget(*keys, encoding="utf-8")
+        # a session can only be resumed once
+        await redis.delete(*keys)
+    except (aioredis.RedisError, OSError) as e:
+        log.warning(f"Could not load the saved gateway sessions: {e}")
+        return {}
+
+    sessions = {}
+    for shard_id, value in zip(shard_ids, values):
+        if value is None:
+            continue
+        session = json.loads(value)
+        if session["shard_count"] == shard_count:
+            sessions[shard_id] = session
+    return sessions
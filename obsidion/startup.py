@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from discord.ext import commands
+
+from obsidion import constants
+
+log = logging.getLogger(__name__)
+
+
+class ServiceUnavailable(commands.CheckFailure):
+    """A command needs a service that failed to start."""
+
+    def __init__(self, name: str):
+        self.name = name
+        super().__init__(f"{name} is unavailable")
+
+
+class Service:
+    """One backing service and how its start went."""
+
+    __slots__ = (
+        "name",
+        "start",
+        "required",
+        "ready",
+        "settled",
+        "error",
+        "began",
+        "took",
+        "attempts",
+    )
+
+    def __init__(self, name: str, start: Callable[[], Awaitable[None]], required: bool):
+        self.name = name
+        self.start = start
+        # commands wait for required services before they run
+        self.required = required
+        self.ready = asyncio.Event()
+        # set once it is ready or has run out of attempts
+        self.settled = asyncio.Event()
+        self.error: Optional[BaseException] = None
+        self.began: Optional[float] = None
+        self.took: Optional[float] = None
+        self.attempts = 0
+
+    @property
+    def failed(self) -> bool:
+        return self.settled.is_set() and not self.ready.is_set()
+
+
+class Startup:
+    """Start the backing services concurrently and track when each is ready."""
+
+    def __init__(self):
+        self.services: Dict[str, Service] = {}
+        self.began = time.perf_counter()
+        self.done = asyncio.Event()
+        self.first_command: Optional[float] = None
+
+    def add(
+        self, name: str, start: Callable[[], Awaitable[None]], *, required: bool = True
+    ) -> None:
+        self.services[name] = Service(name, start, required)
+
+    async def run(self) -> None:
+        """Start every service, then log the timeline."""
+        self.began = time.perf_counter()
+        await asyncio.gather(*(self._start(s) for s in self.services.values()))
+        self.done.set()
+        log.info(self.timeline())
+
+    async def _start(self, service: Service) -> None:
+        service.began = time.perf_counter() - self.began
+        delay = constants.Startup.retry_delay
+        while service.attempts < constants.Startup.retries:
+            service.attempts += 1
+            try:
+                await asyncio.wait_for(service.start(), constants.Startup.timeout)
+            except Exception as e:
+                service.error = e
+                log.warning(
+                    f"Starting {service.name} failed (attempt {service.attempts}): "
+                    f"{e!r}"
+                )
+                if service.attempts < constants.Startup.retries:
+                    await asyncio.sleep(delay)
+                    delay *= 2
+            else:
+                service.error = None
+                service.ready.set()
+                break
+        service.took = time.perf_counter() - self.began - service.began
+        service.settled.set()
+        if service.failed:
+            log.error(
+                f"Giving up on {service.name}, commands that need it are disabled"
+            )
+
+    async def wait(self, names: Iterable[str], timeout: float) -> None:
+        """Wait for the given services.
+
+        Args:
+            names (Iterable[str]): services to wait for
+            timeout (float): longest to wait for them, in seconds
+
+        Raises:
+            ServiceUnavailable: a service failed or isn't up in time
+        """
+        services = [self.services[name] for name in names if name in self.services]
+        pending = [s.settled.wait() for s in services if not s.settled.is_set()]
+        if pending:
+            try:
+                await asyncio.wait_for(asyncio.gather(*pending), timeout)
+            except asyncio.TimeoutError:
+                pass
+        for service in services:
+            if not service.ready.is_set():
+                raise ServiceUnavailable(service.name)
+
+    async def gate(self) -> None:
+        """Hold a command until the required services have settled.
+
+        A service that failed doesn't block anything, only the commands
+        that ask for it with :func:`requires` fail.
+        """
+        if not self.done.is_set():
+            required = [s.name for s in self.services.values() if s.required]
+            try:
+                await self.wait(required, constants.Startup.gate_timeout)
+            except ServiceUnavailable:
+                pass
+        if self.first_command is None:
+            self.first_command = time.perf_counter() - self.began
+            log.info(f"First command served {self.first_command:.2f}s after startup")
+
+    def timeline(self) -> str:
+        lines = [f"Startup finished in {time.perf_counter() - self.began:.2f}s"]
+        for s in sorted(self.services.values(), key=lambda s: s.began or 0):
+            state = "ready" if s.ready.is_set() else f"failed: {s.error!r}"
+            lines.append(
+                f"  {s.name:<10} {s.began:6.2f}s -> {s.began + s.took:6.2f}s"
+                f"  ({s.attempts} attempt{'s' * (s.attempts != 1)}) {state}"
+            )
+        return "\n".join(lines)
+
+
+async def services_ready(ctx: commands.Context, *names: str) -> bool:
+    """Wait for the given services, for use in a cog_check.
+
+    Raises:
+        ServiceUnavailable: a service failed or isn't up in time
+    """
+    await ctx.bot.startup.wait(names, constants.Startup.gate_timeout)
+    return True
+
+
+def requires(*names: str):
+    """Check that the given services are up before running a command."""
+
+    async def predicate(ctx: commands.Context) -> bool:
+        return await services_ready(ctx, *names)
+
+    return commands.check(predicate)
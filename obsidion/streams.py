@@ -0,0 +1,386 @@
+"""
+Split gateway ingestion from command execution with a Redis Stream.
+
+A ``gateway`` process connects the shards and runs the few extensions that
+need the gateway's guild cache, but hands every other command to a stream
+instead of running it. Any number of ``worker`` processes, on any host, read
+the stream through a consumer group, run the command and reply over the REST
+API. Workers never connect to the gateway: the guild, channel and the bot's
+own member a command needs are fetched over REST the first time and kept for
+a while, which is enough for the permission checks and for replying.
+
+A worker acknowledges a message once its command has finished. Messages
+taken by a worker that died are claimed by another worker once they have
+been idle long enough, and dropped after a few attempts or once they are
+too old for a reply to still make sense.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+import aioredis
+import discord
+from aioredis.errors import BusyGroupError
+
+from obsidion import constants
+
+log = logging.getLogger(__name__)
+
+STREAM = "command_stream"
+GROUP = "command_workers"
+GATEWAY_KEY = "stream_gateway"
+
+
+def invoked_name(bot, data: dict) -> Optional[str]:
+    """The command name a raw message payload would invoke, without parsing it."""
+    if data.get("author", {}).get("bot"):
+        return None
+    guild_id = data.get("guild_id")
+    matcher = bot.command_matcher(
+        bot.settings.prefix(int(guild_id) if guild_id else None)
+    )
+    if matcher is None:
+        return None
+    content = data.get("content", "")
+    match = matcher.match(content)
+    if match is None:
+        return None
+    words = content[match.end() :].split(maxsplit=1)
+    return words[0] if words else None
+
+
+class StreamGateway:
+    """Publish the commands this process doesn't run itself to the stream."""
+
+    def install(self, bot) -> None:
+        connection = bot._connection
+        prefilter = connection.parsers["MESSAGE_CREATE"]
+
+        def route(data: dict) -> None:
+            name = invoked_name(bot, data)
+            if name is not None and name not in bot.all_commands:
+                bot.create_background_task(self.publish(bot, data))
+                if not (
+                    bot.extra_events.get("on_message") or bot._listeners.get("message")
+                ):
+                    return
+            prefilter(data)
+
+        connection.parsers["MESSAGE_CREATE"] = route
+
+    @property
+    def jobs(self):
+        return [self.heartbeat]
+
+    async def publish(self, bot, data: dict) -> None:
+        await bot.redis_ready.wait()
+        try:
+            await bot.redis_session.xadd(
+                STREAM,
+                {"data": json.dumps(data), "time": time.time()},
+                max_len=constants.Streams.max_length,
+            )
+        except (aioredis.RedisError, OSError) as e:
+            log.warning(f"Failed to publish message {data.get('id')}: {e}")
+
+    async def heartbeat(self, bot) -> None:
+        """Share the guild count with the workers, which have no guild cache."""
+        while not bot.is_closed():
+            payload = {
+                "guilds": len(bot.guilds),
+                "shards": bot.shard_count,
+                "time": time.time(),
+            }
+            try:
+                await bot.redis_session.set(
+                    GATEWAY_KEY,
+                    json.dumps(payload),
+                    expire=constants.Streams.heartbeat_timeout,
+                )
+            except (aioredis.RedisError, OSError) as e:
+                log.warning(f"Failed to send the gateway heartbeat: {e}")
+            await asyncio.sleep(constants.Streams.heartbeat_interval)
+
+    async def guild_count(self, bot) -> int:
+        return len(bot.guilds)
+
+
+class RestCache:
+    """
+    Guilds and channels fetched over REST, for a process without a gateway.
+
+    The objects live in discord.py's own state, so ``bot.get_guild`` and
+    ``bot.get_channel`` find them like they would after a GUILD_CREATE.
+    The least recently used guilds are dropped once there are too many.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        # guild id -> when it was fetched, least recently used first
+        self.guilds: "OrderedDict[int, float]" = OrderedDict()
+        self.channels: Dict[int, float] = {}
+        # guilds of the channels the bot posts to itself, never dropped
+        self.pinned: Set[int] = set()
+        self._pending: Dict[int, asyncio.Future] = {}
+
+    @staticmethod
+    def _fresh(fetched: Optional[float]) -> bool:
+        return (
+            fetched is not None
+            and time.monotonic() - fetched < constants.Streams.cache_ttl
+        )
+
+    async def _once(self, key: int, factory):
+        """Share one fetch between every message that needs it at the same time."""
+        task = self._pending.get(key)
+        if task is None:
+            task = self._pending[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def guild(self, guild_id: int) -> discord.Guild:
+        guild = self.bot.get_guild(guild_id)
+        if guild is None or not self._fresh(self.guilds.get(guild_id)):
+            guild = await self._once(guild_id, lambda: self._fetch_guild(guild_id))
+        self.guilds.move_to_end(guild_id)
+        return guild
+
+    async def _fetch_guild(self, guild_id: int) -> discord.Guild:
+        state = self.bot._connection
+        data, me = await asyncio.gather(
+            self.bot.http.get_guild(guild_id),
+            self.bot.http.get_member(guild_id, state.self_id),
+        )
+        guild = state._get_guild(guild_id)
+        if guild is None:
+            guild = discord.Guild(data=data, state=state)
+            state._add_guild(guild)
+        else:
+            guild._from_data(data)
+        guild._add_member(discord.Member(data=me, guild=guild, state=state))
+        self.guilds[guild_id] = time.monotonic()
+        self._evict()
+        return guild
+
+    def _evict(self) -> None:
+        state = self.bot._connection
+        candidates = [g for g in self.guilds if g not in self.pinned]
+        for guild_id in candidates[: len(self.guilds) - constants.Streams.cache_size]:
+            del self.guilds[guild_id]
+            guild = state._get_guild(guild_id)
+            if guild is not None:
+                for channel_id in guild._channels:
+                    self.channels.pop(channel_id, None)
+                state._remove_guild(guild)
+
+    async def channel(
+        self, channel_id: int, guild: Optional[discord.Guild] = None
+    ) -> discord.abc.Messageable:
+        if guild is not None:
+            channel = guild.get_channel(channel_id)
+        else:
+            channel = self.bot._connection._get_private_channel(channel_id)
+        if channel is None or not self._fresh(self.channels.get(channel_id)):
+            channel = await self._once(
+                channel_id, lambda: self._fetch_channel(channel_id, guild)
+            )
+        return channel
+
+    async def _fetch_channel(self, channel_id: int, guild: Optional[discord.Guild]):
+        state = self.bot._connection
+        data = await self.bot.http.get_channel(channel_id)
+        if guild is None:
+            channel = state._get_private_channel(channel_id)
+            if channel is None:
+                channel = discord.DMChannel(me=self.bot.user, state=state, data=data)
+                state._add_private_channel(channel)
+        else:
+            channel = guild.get_channel(channel_id)
+            if channel is None:
+                factory, _ = discord.channel._channel_factory(data["type"])
+                channel = factory(guild=guild, state=state, data=data)
+                guild._add_channel(channel)
+            else:
+                # picks up permission overwrites that changed
+                channel._update(guild, data)
+        self.channels[channel_id] = time.monotonic()
+        return channel
+
+    async def hydrate(self, guild_id: int) -> discord.Guild:
+        """Fetch a guild with every channel and keep it, as GUILD_CREATE would."""
+        # pinned first, the guild would be the first evicted otherwise
+        self.pinned.add(guild_id)
+        try:
+            guild = await self.guild(guild_id)
+            channels = await self.bot.http.get_all_guild_channels(guild_id)
+        except Exception:
+            self.pinned.discard(guild_id)
+            raise
+        state = self.bot._connection
+        for data in channels:
+            factory, _ = discord.channel._channel_factory(data["type"])
+            if factory is None:
+                continue
+            channel = guild.get_channel(int(data["id"]))
+            if channel is None:
+                guild._add_channel(factory(guild=guild, state=state, data=data))
+            else:
+                channel._update(guild, data)
+            self.channels[int(data["id"])] = time.monotonic()
+        return guild
+
+    async def pin(self, channel_id: int) -> None:
+        """Keep a channel the bot posts to by itself, like the feedback channel."""
+        data = await self.bot.http.get_channel(channel_id)
+        guild = await self.guild(int(data["guild_id"]))
+        self.pinned.add(guild.id)
+        await self.channel(channel_id, guild)
+
+    async def message(self, data: dict) -> discord.Message:
+        """Build the Message for a raw payload, fetching whatever isn't cached."""
+        guild_id = data.get("guild_id")
+        guild = await self.guild(int(guild_id)) if guild_id else None
+        channel = await self.channel(int(data["channel_id"]), guild)
+        return discord.Message(state=self.bot._connection, channel=channel, data=data)
+
+
+async def login_without_gateway(bot, cache: RestCache, token: str) -> None:
+    """Log in over REST only, for processes that never connect to the gateway."""
+    await bot.login(token)
+    state = bot._connection
+    state.user = discord.ClientUser(state=state, data=await bot.http.get_user("@me"))
+    for channel_id in (
+        constants.Channels.feedback_channel,
+        constants.Channels.bug_channel,
+        constants.Channels.favicon_channel,
+    ):
+        if channel_id is None:
+            continue
+        try:
+            await cache.pin(channel_id)
+        except discord.HTTPException as e:
+            log.warning(f"Could not fetch channel {channel_id}: {e}")
+    bot._ready.set()
+
+
+class StreamWorker:
+    """Run the commands published by the gateway, replying over REST."""
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.cache: Optional[RestCache] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def install(self, bot) -> None:
+        self.cache = RestCache(bot)
+
+    @property
+    def jobs(self):
+        return [self.reclaim]
+
+    async def guild_count(self, bot) -> int:
+        """Guild count from the gateway's heartbeat."""
+        status = await bot.redis_session.get(GATEWAY_KEY, encoding="utf-8")
+        return json.loads(status)["guilds"] if status else len(bot.guilds)
+
+    async def run(self, bot, token: str) -> None:
+        """Log in over REST only and run commands until the bot is closed."""
+        await login_without_gateway(bot, self.cache, token)
+        log.info(f"Stream worker {self.name} logged in as {bot.user}")
+        await self.consume(bot)
+
+    async def create_group(self, redis) -> None:
+        try:
+            await redis.xgroup_create(STREAM, GROUP, latest_id="$", mkstream=True)
+        except BusyGroupError:
+            pass
+
+    def spawn(self, bot, entry_id: bytes, fields: dict) -> None:
+        task = bot.create_background_task(self.handle(bot, entry_id, fields))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def consume(self, bot) -> None:
+        await bot.redis_ready.wait()
+        redis = bot.redis_session
+        await self.create_group(redis)
+        block = int(constants.Streams.block_timeout * 1000)
+        while not bot.is_closed() and not bot.draining:
+            free = constants.Streams.concurrency - len(self._tasks)
+            if free <= 0:
+                await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                entries = await redis.xread_group(
+                    GROUP,
+                    self.name,
+                    [STREAM],
+                    timeout=block,
+                    count=free,
+                    latest_ids=[">"],
+                )
+            except (aioredis.RedisError, OSError) as e:
+                if bot.is_closed():
+                    return
+                log.warning(f"Failed to read the command stream: {e}")
+                await asyncio.sleep(constants.Streams.block_timeout)
+                continue
+            for _stream, entry_id, fields in entries:
+                self.spawn(bot, entry_id, fields)
+
+    async def handle(self, bot, entry_id: bytes, fields: dict) -> None:
+        if bot.draining:
+            # left pending, another worker claims it once it has been idle
+            return
+        try:
+            age = time.time() - float(fields[b"time"])
+            data = json.loads(fields[b"data"])
+            name = invoked_name(bot, data)
+            if age > constants.Streams.max_age:
+                log.debug(f"Dropped message {data['id']}, it is {age:.0f}s old")
+            elif name is not None and name in bot.all_commands:
+                message = await self.cache.message(data)
+                await bot.process_commands(message)
+        except Exception:
+            log.exception(f"Failed to run stream entry {entry_id}")
+        finally:
+            try:
+                await bot.redis_session.xack(STREAM, GROUP, entry_id)
+            except (aioredis.RedisError, OSError) as e:
+                log.warning(f"Failed to acknowledge stream entry {entry_id}: {e}")
+
+    async def reclaim(self, bot) -> None:
+        """Take over the messages of workers that died before acknowledging them."""
+        redis = bot.redis_session
+        await self.create_group(redis)
+        idle = int(constants.Streams.claim_idle * 1000)
+        while not bot.is_closed():
+            await asyncio.sleep(constants.Streams.claim_interval)
+            try:
+                pending = await redis.xpending(
+                    STREAM, GROUP, "-", "+", constants.Streams.concurrency
+                )
+                retry: List[bytes] = []
+                abandoned: List[bytes] = []
+                for entry_id, _consumer, entry_idle, deliveries in pending:
+                    if entry_idle < idle:
+                        continue
+                    if deliveries >= constants.Streams.max_deliveries:
+                        abandoned.append(entry_id)
+                    else:
+                        retry.append(entry_id)
+                if abandoned:
+                    log.warning(f"Giving up on {len(abandoned)} stream entries")
+                    await redis.xack(STREAM, GROUP, *abandoned)
+                if retry:
+                    claimed = await redis.xclaim(STREAM, GROUP, self.name, idle, *retry)
+                    for entry_id, fields in claimed:
+                        self.spawn(bot, entry_id, fields)
+            except (aioredis.RedisError, OSError) as e:
+                log.warning(f"Failed to reclaim stream entries: {e}")
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import struct
+import time
+from typing import Dict
+
+from obsidion.utils.java_ping import FORMATTING_CODES, PingError
+
+# every RakNet offline message carries this magic sequence
+MAGIC = bytes.fromhex("00ffff00fefefefefdfdfdfd12345678")
+UNCONNECTED_PING = 0x01
+UNCONNECTED_PONG = 0x1C
+
+
+class _PongProtocol(asyncio.DatagramProtocol):
+    """Wait for the unconnected pong answering any of the pings sent."""
+
+    def __init__(self):
+        # timestamp of each ping -> when it was sent
+        self.sent: Dict[bytes, float] = {}
+        self.pong = asyncio.get_event_loop().create_future()
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        if (
+            data[:1] == bytes([UNCONNECTED_PONG])
+            and data[17:33] == MAGIC
+            and not self.pong.done()
+        ):
+            sent = self.sent.get(data[1:9])
+            if sent is not None:
+                # a late pong to an earlier ping is timed from that ping
+                self.pong.set_result((data, (time.perf_counter() - sent) * 1000))
+
+    def error_received(self, exc: Exception) -> None:
+        if not self.pong.done():
+            self.pong.set_exception(exc)
+
+
+def parse_pong(data: bytes, latency: float) -> dict:
+    """Read the server id string of an unconnected pong.
+
+    The string looks like ``MCPE;motd;protocol;version;online;max;server id;map;gamemode;...``
+
+    Args:
+        data (bytes): the pong packet
+        latency (float): round trip time of the ping in milliseconds
+
+    Returns:
+        dict: status of the server shaped like the Obsidion API's bedrock response
+    """
+    try:
+        (length,) = struct.unpack(">H", data[33:35])
+        fields = data[35 : 35 + length].decode("utf-8").split(";")
+        edition, motd, protocol, version, online, maximum = fields[:6]
+        return {
+            "edition": edition,
+            "motd": FORMATTING_CODES.sub("", motd),
+            "protocol": int(protocol),
+            "software": {"version": version},
+            "players": {"online": int(online), "max": int(maximum), "names": []},
+            "map": FORMATTING_CODES.sub("", fields[7]) if len(fields) > 7 else None,
+            "gamemode": fields[8] if len(fields) > 8 else None,
+            "latency": round(latency, 2),
+        }
+    except (struct.error, UnicodeDecodeError, ValueError) as e:
+        raise PingError("Malformed unconnected pong") from e
+
+
+async def ping_bedrock(
+    host: str, port: int = 19132, *, timeout: float = 1.5, retries: int = 3
+) -> dict:
+    """Get the status of a Bedrock edition server with a RakNet unconnected ping.
+
+    UDP packets get lost, so the ping is sent up to ``retries`` times, waiting
+    ``timeout`` seconds for the pong after each one.
+
+    Args:
+        host (str): address of the server
+        port (int, optional): port of the server. Defaults to 19132.
+        timeout (float, optional): seconds to wait for each attempt. Defaults to 1.5.
+        retries (int, optional): number of pings to send. Defaults to 3.
+
+    Raises:
+        PingError: the server is offline or did not answer correctly
+
+    Returns:
+        dict: motd, version, players, map and latency of the server
+    """
+    loop = asyncio.get_event_loop()
+    guid = os.urandom(8)
+    try:
+        transport, protocol = await asyncio.wait_for(
+            loop.create_datagram_endpoint(_PongProtocol, remote_addr=(host, port)),
+            timeout,
+        )
+    except (asyncio.TimeoutError, OSError) as e:
+        raise PingError(f"Could not resolve {host}:{port}") from e
+
+    try:
+        for attempt in range(retries):
+            # every attempt gets its own timestamp so its pong can be told apart
+            timestamp = struct.pack(">q", int(time.time() * 1000) + attempt)
+            protocol.sent[timestamp] = time.perf_counter()
+            transport.sendto(bytes([UNCONNECTED_PING]) + timestamp + MAGIC + guid)
+            try:
+                data, latency = await asyncio.wait_for(
+                    asyncio.shield(protocol.pong), timeout
+                )
+            except asyncio.TimeoutError:
+                continue
+            except OSError as e:
+                raise PingError(f"{host}:{port} refused the ping") from e
+            return parse_pong(data, latency)
+    finally:
+        transport.close()
+    raise PingError(f"{host}:{port} did not answer the ping")
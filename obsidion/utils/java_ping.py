@@ -0,0 +1,346 @@
+import asyncio
+import ipaddress
+import json
+import re
+import struct
+import time
+from typing import Optional, Tuple
+
+from obsidion.utils.resolver import CachingResolver
+
+# protocol version sent in the handshake, servers answer status requests for any version
+HANDSHAKE_PROTOCOL = 47
+FORMATTING_CODES = re.compile("§[0-9a-fk-or]", re.IGNORECASE)
+
+
+class PingError(Exception):
+    """Raised when a server does not answer a ping in a way we understand."""
+
+
+def pack_varint(value: int) -> bytes:
+    """Encode an integer as a Minecraft protocol VarInt.
+
+    Args:
+        value (int): signed 32 bit integer
+
+    Returns:
+        bytes: between one and five bytes
+    """
+    value &= 0xFFFFFFFF
+    data = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            data.append(byte | 0x80)
+        else:
+            data.append(byte)
+            return bytes(data)
+
+
+def unpack_varint(data: bytes, offset: int = 0) -> Tuple[int, int]:
+    """Decode a VarInt from a buffer.
+
+    Args:
+        data (bytes): buffer to read from
+        offset (int, optional): where the VarInt starts. Defaults to 0.
+
+    Returns:
+        Tuple[int, int]: the value and the offset just past it
+    """
+    value = 0
+    for i in range(5):
+        if offset >= len(data):
+            raise PingError("VarInt is truncated")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << (7 * i)
+        if not byte & 0x80:
+            if value & 0x80000000:
+                value -= 1 << 32
+            return value, offset
+    raise PingError("VarInt is too big")
+
+
+def pack_string(value: str) -> bytes:
+    encoded = value.encode("utf-8")
+    return pack_varint(len(encoded)) + encoded
+
+
+def pack_packet(packet_id: int, payload: bytes = b"") -> bytes:
+    body = pack_varint(packet_id) + payload
+    return pack_varint(len(body)) + body
+
+
+async def read_varint(reader: asyncio.StreamReader) -> int:
+    data = bytearray()
+    for _ in range(5):
+        byte = await reader.readexactly(1)
+        data += byte
+        if not byte[0] & 0x80:
+            return unpack_varint(data)[0]
+    raise PingError("VarInt is too big")
+
+
+async def read_packet(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    length = await read_varint(reader)
+    if length <= 0 or length > 0x1FFFFF:
+        raise PingError(f"Invalid packet length {length}")
+    body = await reader.readexactly(length)
+    packet_id, offset = unpack_varint(body)
+    return packet_id, body[offset:]
+
+
+def flatten_description(description) -> str:
+    """Turn a chat component (or plain string) into text without formatting codes."""
+    if isinstance(description, str):
+        text = description
+    elif isinstance(description, dict):
+        text = description.get("text", "") + "".join(
+            flatten_description(extra) for extra in description.get("extra", [])
+        )
+    elif isinstance(description, list):
+        text = "".join(flatten_description(part) for part in description)
+    else:
+        text = ""
+    return FORMATTING_CODES.sub("", text)
+
+
+def _count(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError) as e:
+        raise PingError(f"Invalid player count {value!r}") from e
+
+
+def _normalise(status: dict, latency: float) -> dict:
+    """Shape a status response like the one from the Obsidion API."""
+    if not isinstance(status, dict):
+        raise PingError("Status response is not a JSON object")
+    # servers and proxies send null or leave these out
+    players = status.get("players") or {}
+    version = status.get("version") or {}
+    if not isinstance(players, dict) or not isinstance(version, dict):
+        raise PingError("Status response has malformed players or version")
+    return {
+        "description": flatten_description(status.get("description", "")),
+        "players": {
+            "online": _count(players.get("online")),
+            "max": _count(players.get("max")),
+            "sample": [
+                player
+                for player in players.get("sample") or []
+                if isinstance(player, dict) and "name" in player
+            ],
+        },
+        "version": {
+            "name": FORMATTING_CODES.sub("", str(version.get("name") or "")),
+            "protocol": version.get("protocol"),
+        },
+        "favicon": status.get("favicon"),
+        "latency": round(latency, 2),
+    }
+
+
+async def _modern_ping(host: str, port: int, connect_host: str) -> dict:
+    reader, writer = await asyncio.open_connection(connect_host, port)
+    try:
+        handshake = (
+            pack_varint(HANDSHAKE_PROTOCOL)
+            + pack_string(host)
+            + struct.pack(">H", port)
+            + pack_varint(1)
+        )
+        writer.write(pack_packet(0x00, handshake) + pack_packet(0x00))
+        await writer.drain()
+
+        packet_id, payload = await read_packet(reader)
+        if packet_id != 0x00:
+            raise PingError(f"Unexpected status packet {packet_id:#x}")
+        length, offset = unpack_varint(payload)
+        try:
+            status = json.loads(payload[offset : offset + length].decode("utf-8"))
+        except ValueError as e:
+            raise PingError("Status response is not valid JSON") from e
+
+        # the ping/pong round trip is the latency a client would see
+        token = int(time.time() * 1000)
+        start = time.perf_counter()
+        writer.write(pack_packet(0x01, struct.pack(">q", token)))
+        await writer.drain()
+        try:
+            packet_id, payload = await read_packet(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # some proxies close the connection instead of answering the ping
+            latency = (time.perf_counter() - start) * 1000
+        else:
+            latency = (time.perf_counter() - start) * 1000
+            if (
+                packet_id != 0x01
+                or len(payload) < 8
+                or struct.unpack(">q", payload[:8])[0] != token
+            ):
+                raise PingError("Server answered the ping with the wrong payload")
+        return _normalise(status, latency)
+    finally:
+        writer.close()
+
+
+async def _legacy_ping(port: int, connect_host: str) -> dict:
+    """Ping a server older than 1.7 using the 0xFE server list ping."""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(connect_host, port)
+    try:
+        writer.write(b"\xfe\x01")
+        await writer.drain()
+        header = await reader.readexactly(3)
+        latency = (time.perf_counter() - start) * 1000
+        if header[0] != 0xFF:
+            raise PingError("Server did not answer the legacy ping")
+        length = struct.unpack(">H", header[1:])[0]
+        response = (await reader.readexactly(length * 2)).decode("utf-16-be")
+    finally:
+        writer.close()
+
+    if response.startswith("§1\x00"):
+        # 1.4 - 1.6: §1, protocol, version, motd, online, max
+        _, protocol, version, motd, online, maximum = response.split("\x00")
+    else:
+        # beta 1.8 - 1.3: motd§online§max
+        motd, online, maximum = response.rsplit("§", 2)
+        protocol, version = None, "Legacy"
+    return _normalise(
+        {
+            "description": motd,
+            "players": {"online": int(online), "max": int(maximum)},
+            "version": {
+                "name": version,
+                "protocol": int(protocol) if protocol else None,
+            },
+        },
+        latency,
+    )
+
+
+def split_address(address: str) -> Tuple[str, Optional[int]]:
+    """Split a ``host[:port]`` address into its host and port.
+
+    Args:
+        address (str): address as a user would type it
+
+    Returns:
+        Tuple[str, Optional[int]]: host and port, None if no port was given
+    """
+    host, _, port = address.strip().rpartition(":")
+    if not host or not port.isdigit():
+        return address.strip().lower(), None
+    return host.lower(), int(port)
+
+
+def normalise_address(address: str) -> str:
+    """The form an address is stored and compared in, ``host`` or ``host:port``."""
+    host, port = split_address(address)
+    return f"{host}:{port}" if port else host
+
+
+def valid_address(host: str, port: Optional[int]) -> bool:
+    """Whether a split address could name a server at all.
+
+    Args:
+        host (str): host from split_address
+        port (Optional[int]): port from split_address
+
+    Returns:
+        bool: False for an empty or overlong host, a port that didn't parse or one out of range
+    """
+    return (
+        0 < len(host) <= 253
+        and ":" not in host
+        and not any(c.isspace() for c in host)
+        and (port is None or 0 < port < 65536)
+    )
+
+
+async def resolve_java_address(
+    resolver: CachingResolver, host: str, port: Optional[int] = None
+) -> Tuple[str, int, str]:
+    """Work out where a vanilla client would connect to for a server address.
+
+    When no port is given the ``_minecraft._tcp`` SRV record decides the real
+    host and port, falling back to the address itself on 25565. Every lookup
+    goes through the resolver's cache so popular networks skip DNS entirely.
+
+    Args:
+        resolver (CachingResolver): resolver to look records up with
+        host (str): address the user gave
+        port (int, optional): port the user gave. Defaults to None.
+
+    Raises:
+        PingError: the address does not resolve
+
+    Returns:
+        Tuple[str, int, str]: host to send in the handshake, port and IP address
+    """
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        pass
+    else:
+        return host, port or 25565, host
+
+    if port is None:
+        records = await resolver.resolve_srv("minecraft", "tcp", host)
+        if records:
+            host, port = records[0].host.rstrip("."), records[0].port
+    port = port or 25565
+
+    try:
+        addresses = await resolver.resolve(host, port)
+    except OSError as e:
+        raise PingError(f"Could not resolve {host}") from e
+    return host, port, addresses[0]["host"]
+
+
+async def ping_java(
+    host: str,
+    port: int = 25565,
+    *,
+    timeout: float = 5.0,
+    connect_host: Optional[str] = None,
+) -> dict:
+    """Get the status of a Java edition server with the Server List Ping protocol.
+
+    Servers that do not understand the modern handshake are retried with the
+    legacy (pre 1.7) ping.
+
+    Args:
+        host (str): address of the server, sent in the handshake
+        port (int, optional): port of the server. Defaults to 25565.
+        timeout (float, optional): seconds to wait for each attempt. Defaults to 5.0.
+        connect_host (str, optional): address to actually connect to if it has
+            already been resolved. Defaults to host.
+
+    Raises:
+        PingError: the server is offline or did not answer correctly
+
+    Returns:
+        dict: description, players, version, favicon and latency of the server
+    """
+    connect_host = connect_host or host
+    try:
+        return await asyncio.wait_for(_modern_ping(host, port, connect_host), timeout)
+    except (PingError, asyncio.IncompleteReadError, ConnectionResetError) as e:
+        modern_error = e
+    except (asyncio.TimeoutError, OSError) as e:
+        raise PingError(f"Could not connect to {host}:{port}") from e
+
+    try:
+        return await asyncio.wait_for(_legacy_ping(port, connect_host), timeout)
+    except (
+        PingError,
+        asyncio.IncompleteReadError,
+        asyncio.TimeoutError,
+        OSError,
+        ValueError,
+    ):
+        raise PingError(f"{host}:{port} did not answer the ping") from modern_error
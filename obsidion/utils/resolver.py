@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import socket
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiodns
+from aiohttp.abc import AbstractResolver
+
+log = logging.getLogger(__name__)
+
+# answers which mean the record does not exist rather than that the lookup failed
+_MISSING_RECORD_ERRORS = (aiodns.error.ARES_ENODATA, aiodns.error.ARES_ENOTFOUND)
+
+
+class CachingResolver(AbstractResolver):
+    """
+    Resolve hostnames through aiodns and keep every answer until its TTL runs out.
+
+    aiohttp's own DNS cache applies one fixed TTL to every host, so the upstreams
+    we talk to constantly get looked up again every few seconds. This resolver
+    remembers each answer for as long as the record's TTL allows (clamped between
+    ``min_ttl`` and ``max_ttl``), caches missing records for ``negative_ttl``, and
+    coalesces concurrent lookups of the same name into a single query. Hostnames
+    come from users, so only the ``max_entries`` most recently used answers are kept.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_ttl: int = 30,
+        max_ttl: int = 3600,
+        negative_ttl: int = 60,
+        max_entries: int = 10000,
+        loop=None,
+    ):
+        self._resolver = aiodns.DNSResolver(loop=loop)
+        self._min_ttl = min_ttl
+        self._max_ttl = max_ttl
+        self._negative_ttl = negative_ttl
+        self._max_entries = max_entries
+        # least recently used first
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, List[Any]]]" = (
+            OrderedDict()
+        )
+        self._pending: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    def _clamp(self, ttl: int) -> int:
+        return max(self._min_ttl, min(ttl, self._max_ttl))
+
+    def _cached(self, key: Tuple[str, str]) -> Optional[List[Any]]:
+        """A fresh cached answer, dropping it if it has expired."""
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        if cached[0] <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return cached[1]
+
+    def _store(self, key: Tuple[str, str], ttl: int, answers: List[Any]) -> None:
+        self._cache[key] = (time.monotonic() + ttl, answers)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._max_entries:
+            self._cache.popitem(last=False)
+
+    async def query(self, host: str, qtype: str) -> List[Any]:
+        """Run a DNS query, answering from the cache while the record is still fresh.
+
+        Args:
+            host (str): name to look up
+            qtype (str): record type such as ``A``, ``AAAA`` or ``SRV``
+
+        Returns:
+            List[Any]: aiodns answers, empty if the record does not exist
+        """
+        key = (host.lower(), qtype)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._query(key))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _query(self, key: Tuple[str, str]) -> List[Any]:
+        host, qtype = key
+        try:
+            answers = await self._resolver.query(host, qtype)
+        except aiodns.error.DNSError as e:
+            if e.args[0] not in _MISSING_RECORD_ERRORS:
+                raise
+            answers = []
+        if answers:
+            ttl = self._clamp(min(answer.ttl for answer in answers))
+        else:
+            ttl = self._negative_ttl
+
+        self._store(key, ttl, answers)
+        return answers
+
+    async def resolve_srv(self, service: str, protocol: str, host: str) -> List[Any]:
+        """Look up the SRV records of a service, best record first.
+
+        Args:
+            service (str): service name without the underscore, e.g. ``minecraft``
+            protocol (str): ``tcp`` or ``udp``
+            host (str): domain publishing the records
+
+        Returns:
+            List[Any]: records ordered by priority then weight, empty if there are none
+        """
+        try:
+            answers = await self.query(f"_{service}._{protocol}.{host}", "SRV")
+        except aiodns.error.DNSError:
+            return []
+        return sorted(answers, key=lambda answer: (answer.priority, -answer.weight))
+
+    async def _gethostbyname(self, host: str, family: int) -> List[str]:
+        """Resolve names that never reach DNS, such as /etc/hosts or docker links."""
+        key = (host.lower(), f"hosts_{family}")
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        try:
+            result = await self._resolver.gethostbyname(host, family)
+        except aiodns.error.DNSError as e:
+            msg = e.args[1] if len(e.args) >= 2 else "DNS lookup failed"
+            raise OSError(msg) from e
+
+        self._store(key, self._min_ttl, result.addresses)
+        return result.addresses
+
+    async def resolve(
+        self, host: str, port: int = 0, family: int = socket.AF_INET
+    ) -> List[Dict[str, Any]]:
+        """Return the addresses of a host in the format aiohttp's connector expects."""
+        qtype = "AAAA" if family == socket.AF_INET6 else "A"
+        try:
+            addresses = [answer.host for answer in await self.query(host, qtype)]
+        except aiodns.error.DNSError:
+            addresses = []
+
+        if not addresses:
+            addresses = await self._gethostbyname(host, family)
+        if not addresses:
+            raise OSError("DNS lookup failed")
+
+        return [
+            {
+                "hostname": host,
+                "host": address,
+                "port": port,
+                "family": socket.AF_INET6 if ":" in address else socket.AF_INET,
+                "proto": 0,
+                "flags": socket.AI_NUMERICHOST,
+            }
+            for address in addresses
+        ]
+
+    async def close(self) -> None:
+        self._resolver.cancel()
@@ -0,0 +1,222 @@
+import logging
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+from discord.ext import commands
+
+log = logging.getLogger(__name__)
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS guild_settings (
+    guild_id BIGINT PRIMARY KEY,
+    prefix TEXT,
+    disabled_commands TEXT[] NOT NULL DEFAULT '{}',
+    disabled_cogs TEXT[] NOT NULL DEFAULT '{}',
+    default_server TEXT
+)
+"""
+
+UPSERT_SETTINGS = """
+INSERT INTO guild_settings (guild_id, prefix, disabled_commands, disabled_cogs, default_server)
+VALUES ($1, $2, $3, $4, $5)
+ON CONFLICT (guild_id) DO UPDATE SET
+    prefix = EXCLUDED.prefix,
+    disabled_commands = EXCLUDED.disabled_commands,
+    disabled_cogs = EXCLUDED.disabled_cogs,
+    default_server = EXCLUDED.default_server
+"""
+
+# redis channel every process listens on for settings that changed elsewhere
+INVALIDATION_CHANNEL = "guild_settings"
+
+
+class BitRegistry:
+    """Give each name a bit so a set of names fits in a single int.
+
+    Bits are only meaningful inside one process, the database stores names.
+    """
+
+    def __init__(self):
+        self._bits: Dict[str, int] = {}
+
+    def bit(self, name: str) -> int:
+        bit = self._bits.get(name)
+        if bit is None:
+            bit = self._bits[name] = 1 << len(self._bits)
+        return bit
+
+    def pack(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            mask |= self.bit(name)
+        return mask
+
+    def unpack(self, mask: int) -> List[str]:
+        return sorted(name for name, bit in self._bits.items() if mask & bit)
+
+
+class GuildSettings:
+    """Settings of one guild, with the disabled commands and cogs as bitsets."""
+
+    __slots__ = ("prefix", "disabled_commands", "disabled_cogs", "default_server")
+
+    def __init__(
+        self,
+        prefix: Optional[str] = None,
+        disabled_commands: int = 0,
+        disabled_cogs: int = 0,
+        default_server: Optional[str] = None,
+    ):
+        self.prefix = prefix
+        self.disabled_commands = disabled_commands
+        self.disabled_cogs = disabled_cogs
+        self.default_server = default_server
+
+    def is_default(self) -> bool:
+        return not (
+            self.prefix
+            or self.disabled_commands
+            or self.disabled_cogs
+            or self.default_server
+        )
+
+
+class SettingsStore:
+    """
+    Per-guild settings kept in Postgres and cached in memory.
+
+    Every lookup is served from memory, so the prefix callable and the
+    disabled command check never wait on the database. Only guilds that
+    changed something are held at all. When a process changes a guild it
+    publishes the guild id over Redis and every other process reloads that
+    one row.
+    """
+
+    # settings can always be changed, or a guild could lock itself out
+    PROTECTED_COGS = {"config"}
+
+    def __init__(self, default_prefix: str):
+        self.default_prefix = default_prefix
+        self.guilds: Dict[int, GuildSettings] = {}
+        self.commands = BitRegistry()
+        self.cogs = BitRegistry()
+        # lets a process ignore its own invalidations
+        self.instance = uuid.uuid4().hex
+        self.ready = False
+
+    def get(self, guild_id: Optional[int]) -> Optional[GuildSettings]:
+        return self.guilds.get(guild_id)
+
+    def prefix(self, guild_id: Optional[int]) -> str:
+        settings = self.guilds.get(guild_id)
+        if settings is not None and settings.prefix:
+            return settings.prefix
+        return self.default_prefix
+
+    def default_server(self, guild_id: Optional[int]) -> Optional[str]:
+        settings = self.guilds.get(guild_id)
+        return settings.default_server if settings is not None else None
+
+    def is_disabled(self, guild_id: Optional[int], command: commands.Command) -> bool:
+        """Whether a command, one of its parents or its cog is disabled in a guild."""
+        settings = self.guilds.get(guild_id)
+        if settings is None:
+            return False
+        if command.cog_name and command.cog_name in self.PROTECTED_COGS:
+            return False
+        if settings.disabled_cogs and command.cog_name:
+            if settings.disabled_cogs & self.cogs.bit(command.cog_name):
+                return True
+        while command is not None and settings.disabled_commands:
+            if settings.disabled_commands & self.commands.bit(command.qualified_name):
+                return True
+            command = command.parent
+        return False
+
+    def _from_row(self, row) -> GuildSettings:
+        return GuildSettings(
+            row["prefix"],
+            self.commands.pack(row["disabled_commands"]),
+            self.cogs.pack(row["disabled_cogs"]),
+            row["default_server"],
+        )
+
+    def _store(self, guild_id: int, settings: GuildSettings) -> None:
+        if settings.is_default():
+            self.guilds.pop(guild_id, None)
+        else:
+            self.guilds[guild_id] = settings
+
+    async def load(self, pool) -> None:
+        """Create the table if needed and cache the settings of every guild."""
+        async with pool.acquire() as conn:
+            await conn.execute(CREATE_TABLE)
+            rows = await conn.fetch("SELECT * FROM guild_settings")
+        for row in rows:
+            self._store(row["guild_id"], self._from_row(row))
+        self.ready = True
+        log.info(f"Loaded settings for {len(self.guilds)} guilds")
+
+    async def reload(self, pool, guild_id: int) -> None:
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(
+                "SELECT * FROM guild_settings WHERE guild_id = $1", guild_id
+            )
+        self._store(guild_id, self._from_row(row) if row else GuildSettings())
+
+    async def update(self, pool, redis, guild_id: int, **changes) -> GuildSettings:
+        """Change some settings of a guild and tell the other processes.
+
+        Args:
+            pool: postgres pool
+            redis: redis session to publish the invalidation on
+            guild_id (int): guild to change
+            **changes: new values for attributes of :class:`GuildSettings`,
+                disabled commands and cogs as lists of names
+
+        Returns:
+            GuildSettings: the guild's settings after the change
+        """
+        current = self.guilds.get(guild_id) or GuildSettings()
+        values = {
+            "prefix": current.prefix,
+            "disabled_commands": self.commands.unpack(current.disabled_commands),
+            "disabled_cogs": self.cogs.unpack(current.disabled_cogs),
+            "default_server": current.default_server,
+        }
+        values.update(changes)
+        async with pool.acquire() as conn:
+            await conn.execute(
+                UPSERT_SETTINGS,
+                guild_id,
+                values["prefix"],
+                values["disabled_commands"],
+                values["disabled_cogs"],
+                values["default_server"],
+            )
+        settings = GuildSettings(
+            values["prefix"],
+            self.commands.pack(values["disabled_commands"]),
+            self.cogs.pack(values["disabled_cogs"]),
+            values["default_server"],
+        )
+        self._store(guild_id, settings)
+        await redis.publish(INVALIDATION_CHANNEL, f"{self.instance}:{guild_id}")
+        return settings
+
+    async def listen(self, pool, redis) -> None:
+        """Reload guilds whenever another process says they changed."""
+        (channel,) = await redis.subscribe(INVALIDATION_CHANNEL)
+        try:
+            while await channel.wait_message():
+                message = await channel.get(encoding="utf-8")
+                instance, _, guild_id = message.partition(":")
+                if instance == self.instance:
+                    continue
+                try:
+                    await self.reload(pool, int(guild_id))
+                except Exception:
+                    log.exception(f"Failed to reload the settings of {guild_id}")
+        finally:
+            if not redis.closed:
+                await redis.unsubscribe(INVALIDATION_CHANNEL)
@@ -0,0 +1,239 @@
+"""
+Offline index of the Minecraft wiki for the wiki command.
+
+The index is a read only SQLite database holding the title and intro of every
+article, every redirect, and an FTS5 table of titles for ranked fuzzy matching.
+It is built from a MediaWiki XML export by running this module:
+
+    python -m obsidion.utils.wiki_index minecraft-wiki-dump.xml wiki.sqlite3
+
+The new index is written next to the old one and swapped in atomically. The
+bot keeps reading the old file until its next lookup notices the swap and
+reopens the index.
+"""
+
+import argparse
+import logging
+import os
+import re
+import sqlite3
+import xml.etree.ElementTree as ET
+from typing import Iterator, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE pages (title TEXT PRIMARY KEY COLLATE NOCASE, extract TEXT NOT NULL);
+CREATE TABLE redirects (title TEXT PRIMARY KEY COLLATE NOCASE, target TEXT NOT NULL);
+CREATE VIRTUAL TABLE titles USING fts5(title, target UNINDEXED);
+"""
+
+TEMPLATE = re.compile(r"\{\{[^{}]*\}\}")
+TABLE = re.compile(r"\{\|.*?\|\}", re.DOTALL)
+REFERENCE = re.compile(r"<ref[^>]*/>|<ref[^>]*>.*?</ref>", re.DOTALL)
+COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+FILE_LINK = re.compile(
+    r"\[\[(?:File|Image|Category):[^\[\]]*(?:\[\[[^\]]*\]\][^\[\]]*)*\]\]"
+)
+LINK = re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]")
+EXTERNAL_LINK = re.compile(r"\[https?://\S+ ([^\]]*)\]")
+TAG = re.compile(r"<[^>]+>")
+WORD = re.compile(r"\w+")
+
+# lowest fuzzy match score accepted for a title that isn't an exact match
+MATCH_CUTOFF = 70
+
+
+def plain_intro(wikitext: str) -> str:
+    """Turn the wikitext before the first heading into plain text.
+
+    Args:
+        wikitext (str): source of an article
+
+    Returns:
+        str: the intro paragraphs without markup
+    """
+    intro = wikitext.split("\n==", 1)[0]
+    # templates nest, so strip the innermost ones until nothing changes
+    previous = None
+    while previous != intro:
+        previous = intro
+        intro = TEMPLATE.sub("", intro)
+    for pattern in (TABLE, REFERENCE, COMMENT, FILE_LINK):
+        intro = pattern.sub("", intro)
+    intro = LINK.sub(r"\1", intro)
+    intro = EXTERNAL_LINK.sub(r"\1", intro)
+    intro = TAG.sub("", intro).replace("'''", "").replace("''", "")
+    return "\n".join(line.strip() for line in intro.splitlines() if line.strip())
+
+
+def read_dump(path: str) -> Iterator[Tuple[str, Optional[str], str]]:
+    """Stream the articles of a MediaWiki XML export.
+
+    Yields:
+        Tuple[str, Optional[str], str]: title, redirect target and wikitext of each article
+    """
+    page = {}
+    root = None
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        if root is None:
+            root = element
+        if event != "end":
+            continue
+        tag = element.tag.rsplit("}", 1)[-1]
+        if tag in ("title", "ns", "text"):
+            page[tag] = element.text or ""
+        elif tag == "redirect":
+            page["redirect"] = element.get("title")
+        elif tag == "page":
+            if page.get("ns") == "0":
+                yield page["title"], page.get("redirect"), page.get("text", "")
+            page = {}
+            element.clear()
+            # the root still holds every cleared page, drop them too
+            root.clear()
+
+
+def build_index(dump_path: str, index_path: str) -> int:
+    """Build a new index from a wiki dump and swap it in place of the old one.
+
+    Returns:
+        int: number of articles indexed
+    """
+    temporary = f"{index_path}.tmp"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+
+    db = sqlite3.connect(temporary)
+    db.executescript(SCHEMA)
+    articles = 0
+    for title, redirect, text in read_dump(dump_path):
+        if redirect:
+            db.execute(
+                "INSERT OR REPLACE INTO redirects VALUES (?, ?)", (title, redirect)
+            )
+            db.execute("INSERT INTO titles VALUES (?, ?)", (title, redirect))
+            continue
+        db.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?)", (title, plain_intro(text))
+        )
+        db.execute("INSERT INTO titles VALUES (?, ?)", (title, title))
+        articles += 1
+    db.execute("INSERT INTO titles(titles) VALUES ('optimize')")
+    db.commit()
+    db.execute("VACUUM")
+    db.close()
+
+    os.replace(temporary, index_path)
+    return articles
+
+
+class WikiIndex:
+    """Read only, memory mapped view of an index built by :func:`build_index`."""
+
+    def __init__(self, path: str, mmap_size: int = 256 * 1024 * 1024):
+        self.path = path
+        self.mmap_size = int(mmap_size)
+        self.db = None
+        self._identity = None
+        self._open()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _open(self) -> None:
+        identity = self._stat()
+        db = sqlite3.connect(
+            f"file:{self.path}?mode=ro&immutable=1", uri=True, check_same_thread=False
+        )
+        db.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        if self.db is not None:
+            self.db.close()
+        self.db, self._identity = db, identity
+
+    def reopen_if_replaced(self) -> bool:
+        """Reopen the index if a rebuild has swapped a new file in.
+
+        The connection is immutable, so it would otherwise keep reading the
+        old file, or garbage if the old file was rewritten in place.
+
+        Returns:
+            bool: whether the index was reopened
+        """
+        identity = self._stat()
+        if identity is None or identity == self._identity:
+            # a missing file keeps the old index rather than none at all
+            return False
+        self._open()
+        log.info(f"Reopened the wiki index at {self.path}")
+        return True
+
+    def close(self) -> None:
+        self.db.close()
+
+    def _page(self, title: str) -> Optional[Tuple[str, str]]:
+        row = self.db.execute(
+            "SELECT title, extract FROM pages WHERE title = ?", (title,)
+        ).fetchone()
+        if row is None:
+            row = self.db.execute(
+                "SELECT pages.title, pages.extract FROM redirects "
+                "JOIN pages ON pages.title = redirects.target WHERE redirects.title = ?",
+                (title,),
+            ).fetchone()
+        return row
+
+    def lookup(self, query: str) -> Optional[Tuple[str, str]]:
+        """Find the article best matching a query.
+
+        Exact titles and redirects win, otherwise titles sharing words with the
+        query are ranked by FTS5 and the closest fuzzy match is used.
+
+        Args:
+            query (str): what the user searched for
+
+        Returns:
+            Optional[Tuple[str, str]]: title and intro of the article, None if nothing matches
+        """
+        self.reopen_if_replaced()
+        query = query.replace("_", " ").strip()
+        page = self._page(query)
+        if page is not None:
+            return page
+
+        words = WORD.findall(query)
+        if not words:
+            return None
+        match = " OR ".join(f'"{word}"*' for word in words)
+        candidates = self.db.execute(
+            "SELECT title, target FROM titles WHERE titles MATCH ? "
+            "ORDER BY bm25(titles) LIMIT 25",
+            (match,),
+        ).fetchall()
+        if not candidates:
+            return None
+
+        # imported here so loading the index doesn't pull in fuzzywuzzy
+        from fuzzywuzzy import fuzz
+
+        score, _, target = max(
+            (fuzz.token_sort_ratio(query, title), -rank, target)
+            for rank, (title, target) in enumerate(candidates)
+        )
+        if score < MATCH_CUTOFF:
+            return None
+        return self._page(target)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline wiki index.")
+    parser.add_argument("dump", help="MediaWiki XML export of the Minecraft wiki")
+    parser.add_argument("index", help="where to write the SQLite index")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    log.info(f"Indexed {build_index(args.dump, args.index):,} articles")
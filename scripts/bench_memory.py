@@ -0,0 +1,235 @@
+"""
+Measure resident memory per 1000 guilds, with the default caches and in lean mode.
+
+    python scripts/bench_memory.py [--guilds 5000] [--messages 20000]
+
+Each mode runs in its own process. Synthetic GUILD_CREATE payloads, sized
+like an average server, are fed through the gateway parsers, then messages
+are fed through MESSAGE_CREATE to fill the message cache. The RSS growth
+is reported per 1000 guilds. No connection to Discord is made.
+"""
+
+import argparse
+import gc
+import json
+import subprocess
+import sys
+
+import discord
+
+from obsidion.bot import Obsidion
+
+BOT_ID = 691589447074054224
+ROLES = 15
+TEXT_CHANNELS = 20
+VOICE_CHANNELS = 8
+CATEGORIES = 5
+EMOJIS = 30
+
+
+def rss() -> int:
+    """Current resident set size in bytes."""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * 4096
+
+
+def snowflake(guild: int, i: int) -> str:
+    return str(700000000000000000 + guild * 1000 + i)
+
+
+def guild_payload(guild: int) -> dict:
+    guild_id = snowflake(guild, 0)
+    # discord.py pops the id out of each overwrite, so every channel needs its own
+    overwrite = {"id": guild_id, "type": "role", "allow": "0", "deny": "2048"}
+    channels = [
+        {
+            "id": snowflake(guild, 100 + i),
+            "type": 4,
+            "name": f"category-{i}",
+            "position": i,
+            "permission_overwrites": [],
+        }
+        for i in range(CATEGORIES)
+    ]
+    channels += [
+        {
+            "id": snowflake(guild, 200 + i),
+            "type": 0,
+            "name": f"text-{i}",
+            "position": i,
+            "topic": "a channel topic that is about this long",
+            "parent_id": snowflake(guild, 100 + i % CATEGORIES),
+            "permission_overwrites": [dict(overwrite)] if i % 4 == 0 else [],
+            "nsfw": False,
+            "rate_limit_per_user": 0,
+        }
+        for i in range(TEXT_CHANNELS)
+    ]
+    channels += [
+        {
+            "id": snowflake(guild, 300 + i),
+            "type": 2,
+            "name": f"voice-{i}",
+            "position": i,
+            "bitrate": 64000,
+            "user_limit": 0,
+            "parent_id": snowflake(guild, 100 + i % CATEGORIES),
+            "permission_overwrites": [],
+        }
+        for i in range(VOICE_CHANNELS)
+    ]
+    return {
+        "id": guild_id,
+        "name": f"guild {guild}",
+        "region": "us-east",
+        "owner_id": snowflake(guild, 1),
+        "member_count": 250,
+        "roles": [
+            {
+                "id": guild_id if i == 0 else snowflake(guild, 400 + i),
+                "name": f"role-{i}",
+                "permissions": "104324673",
+                "position": i,
+                "color": 0,
+                "hoist": False,
+                "managed": False,
+                "mentionable": False,
+            }
+            for i in range(ROLES)
+        ],
+        "emojis": [
+            {
+                "id": snowflake(guild, 500 + i),
+                "name": f"emoji_{i}",
+                "roles": [],
+                "require_colons": True,
+                "managed": False,
+                "animated": False,
+                "available": True,
+            }
+            for i in range(EMOJIS)
+        ],
+        "channels": channels,
+        "members": [
+            {
+                "user": {
+                    "id": str(BOT_ID),
+                    "username": "Obsidion",
+                    "discriminator": "0000",
+                    "avatar": None,
+                    "bot": True,
+                },
+                "roles": [snowflake(guild, 401)],
+                "joined_at": "2020-01-01T00:00:00.000000+00:00",
+                "deaf": False,
+                "mute": False,
+            }
+        ],
+        "voice_states": [],
+        "presences": [],
+    }
+
+
+def message_payload(i: int, guilds: int) -> dict:
+    guild = i % guilds
+    return {
+        "id": str(10**17 + i),
+        "channel_id": snowflake(guild, 200 + i % TEXT_CHANNELS),
+        "guild_id": snowflake(guild, 0),
+        "author": {
+            "id": str(300000000000000000 + i % 5000),
+            "username": "player",
+            "discriminator": "0001",
+            "avatar": None,
+        },
+        "member": {
+            "roles": [],
+            "joined_at": "2020-01-01T00:00:00.000000+00:00",
+            "deaf": False,
+            "mute": False,
+        },
+        "content": "a message that is about as long as most chat messages are",
+        "timestamp": "2020-11-01T00:00:00.000000+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+def measure(lean: bool, guilds: int, messages: int) -> dict:
+    intents = discord.Intents.none()
+    intents.messages = True
+    intents.guilds = True
+    bot = Obsidion(command_prefix="/", intents=intents, lean=lean)
+    connection = bot._connection
+    # only the caches are measured, nothing should hold on to events
+    connection.dispatch = lambda *args, **kwargs: None
+    connection.user = discord.ClientUser(
+        state=connection,
+        data={
+            "id": BOT_ID,
+            "username": "Obsidion",
+            "discriminator": "0000",
+            "avatar": None,
+            "bot": True,
+        },
+    )
+
+    gc.collect()
+    before = rss()
+    for guild in range(guilds):
+        connection.parsers["GUILD_CREATE"](guild_payload(guild))
+    # every message the prefilter lets through ends up in the message cache
+    for i in range(messages):
+        connection.parse_message_create(message_payload(i, guilds))
+    gc.collect()
+    used = rss() - before
+    return {
+        "lean": lean,
+        "per_1000_guilds": used / guilds * 1000,
+        "cached_messages": len(connection._messages or ()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--guilds", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--mode", choices=["default", "lean"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode == "lean", args.guilds, args.messages)))
+        return
+
+    results = []
+    for mode in ("default", "lean"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode]
+            + ["--guilds", str(args.guilds), "--messages", str(args.messages)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{args.guilds:,} guilds, {args.messages:,} messages")
+    for result in results:
+        name = "lean" if result["lean"] else "default"
+        print(
+            f"{name:<8} {result['per_1000_guilds'] / 2 ** 20:>8.2f} MiB per 1000 guilds"
+            f"  ({result['cached_messages']:,} messages cached)"
+        )
+    saved = 1 - results[1]["per_1000_guilds"] / results[0]["per_1000_guilds"]
+    print(f"lean mode saves {saved:.0%}")
+
+
+if __name__ == "__main__":
+    main()
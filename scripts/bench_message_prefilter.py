@@ -0,0 +1,135 @@
+"""
+Measure how many MESSAGE_CREATE payloads one core can process per second,
+with and without the raw message prefilter.
+
+    python scripts/bench_message_prefilter.py [--messages 200000] [--commands 0.01]
+
+The payloads are fed straight into the gateway parser, so the numbers cover
+everything after the websocket: building the Message, dispatching on_message,
+get_context and invoke. No connection to Discord is made.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import discord
+
+from obsidion import constants
+from obsidion.bot import Obsidion, guild_prefix
+
+BOT_ID = 691589447074054224
+
+
+def make_payloads(count: int, command_ratio: float):
+    prefix = constants.Bot.default_prefix
+    chatter = [
+        "lol",
+        "anyone want to play bedwars later?",
+        "gg",
+        "the server is lagging so hard right now",
+        f"<@{BOT_ID + 1}> check this out",
+        "https://example.com/screenshot.png",
+    ]
+    payloads = []
+    for i in range(count):
+        if random.random() < command_ratio:
+            content = random.choice([f"{prefix}bench", f"<@!{BOT_ID}> bench"])
+        else:
+            content = random.choice(chatter)
+        payloads.append(
+            {
+                "id": str(10**17 + i),
+                "channel_id": "700000000000000001",
+                "guild_id": "700000000000000000",
+                "author": {
+                    "id": str(300000000000000000 + i % 500),
+                    "username": "player",
+                    "discriminator": "0001",
+                    "avatar": None,
+                    "bot": i % 50 == 0,
+                },
+                "content": content,
+                "timestamp": "2020-11-01T00:00:00.000000+00:00",
+                "edited_timestamp": None,
+                "tts": False,
+                "mention_everyone": False,
+                "mentions": [],
+                "mention_roles": [],
+                "attachments": [],
+                "embeds": [],
+                "pinned": False,
+                "type": 0,
+            }
+        )
+    return payloads
+
+
+async def drain() -> None:
+    """Wait for every on_message task the parser scheduled."""
+    current = asyncio.current_task()
+    while True:
+        pending = [task for task in asyncio.all_tasks() if task is not current]
+        if not pending:
+            return
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def run(parser, payloads) -> float:
+    start = time.perf_counter()
+    for i, payload in enumerate(payloads):
+        parser(payload)
+        if i % 1000 == 999:
+            await drain()
+    await drain()
+    return len(payloads) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--commands", type=float, default=0.01)
+    args = parser.parse_args()
+
+    intents = discord.Intents.none()
+    intents.messages = True
+    intents.guilds = True
+    bot = Obsidion(
+        command_prefix=guild_prefix,
+        intents=intents,
+    )
+    bot._connection.user = discord.ClientUser(
+        state=bot._connection,
+        data={
+            "id": BOT_ID,
+            "username": "Obsidion",
+            "discriminator": "0000",
+            "avatar": None,
+            "bot": True,
+        },
+    )
+    # the synthetic channels aren't cached, so the permission checks can't run
+    bot._check_once.clear()
+
+    @bot.command()
+    async def bench(ctx):
+        pass
+
+    payloads = make_payloads(args.messages, args.commands)
+    connection = bot._connection
+    unfiltered = bot.loop.run_until_complete(
+        run(connection.parse_message_create, payloads)
+    )
+    filtered = bot.loop.run_until_complete(
+        run(connection.parsers["MESSAGE_CREATE"], payloads)
+    )
+
+    print(f"{args.messages:,} messages, {args.commands:.1%} commands")
+    print(f"without prefilter: {unfiltered:>12,.0f} messages/s")
+    print(f"with prefilter:    {filtered:>12,.0f} messages/s")
+    print(f"speedup:           {filtered / unfiltered:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Measure how long the bot takes to start and which imports cost the most.
+
+    python scripts/bench_startup.py [--top 15] [--repeat 15]
+    python scripts/bench_startup.py --connect
+
+Imports are timed with ``python -X importtime`` in a fresh process, once for
+the extensions loaded at startup and once with the deferred ones as well.
+The wall time of importing the bot, then creating it and loading the
+extensions, is the fastest of --repeat fresh processes, since single runs
+vary by more than the difference being measured.
+--connect also logs in with the configured token and reports the time until
+on_ready, then disconnects.
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+HEAVY = ["bs4", "lxml", "feedparser", "fuzzywuzzy", "dbl", "asyncrcon"]
+
+LOAD = """
+from obsidion.__main__ import create_bot, load_extensions
+bot = create_bot()
+load_extensions(bot, defer={defer})
+"""
+
+TIMED_LOAD = """
+import time
+start = time.perf_counter()
+from obsidion.__main__ import create_bot, load_extensions
+imported = time.perf_counter()
+bot = create_bot()
+load_extensions(bot, defer={defer})
+print(imported - start, time.perf_counter() - imported)
+"""
+
+Import = namedtuple("Import", "name self cumulative")
+
+
+def importtime(defer: bool) -> dict:
+    """Import times in microseconds, by module name."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", LOAD.format(defer=defer)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        if not own.strip().isdigit():
+            # the header line
+            continue
+        name = name.strip()
+        imports[name] = Import(name, int(own), int(cumulative))
+    return imports
+
+
+def wall_time(defer: bool, repeat: int) -> tuple:
+    """Fastest import and extension loading times in seconds."""
+    runs = [
+        subprocess.run(
+            [sys.executable, "-c", TIMED_LOAD.format(defer=defer)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        for _ in range(repeat)
+    ]
+    return min(float(r[0]) for r in runs), min(float(r[1]) for r in runs)
+
+
+def report(title: str, imports: dict, top: int) -> None:
+    total = sum(i.self for i in imports.values())
+    print(f"{title}: {len(imports)} modules, {total / 1e6:.2f}s")
+    print(f"  {'self ms':>8} {'cumul ms':>9}  module")
+    for i in sorted(imports.values(), key=lambda i: i.self, reverse=True)[:top]:
+        print(f"  {i.self / 1e3:>8.1f} {i.cumulative / 1e3:>9.1f}  {i.name}")
+    for name in HEAVY:
+        i = imports.get(name)
+        state = f"{i.cumulative / 1e3:.1f}ms" if i else "not imported"
+        print(f"  {name:<12} {state}")
+    print()
+
+
+def connect() -> None:
+    """Time the imports, the extensions and the login until on_ready."""
+    start = time.perf_counter()
+    from obsidion import constants
+    from obsidion.__main__ import create_bot, load_extensions
+
+    imported = time.perf_counter()
+    bot = create_bot()
+    load_extensions(bot)
+    loaded = time.perf_counter()
+
+    @bot.event
+    async def on_ready():
+        ready = time.perf_counter()
+        print(f"imports     {imported - start:.2f}s")
+        print(f"extensions  {loaded - imported:.2f}s")
+        print(f"on_ready    {ready - loaded:.2f}s")
+        print(f"total       {ready - start:.2f}s")
+        await bot.close()
+
+    bot.run(constants.Bot.discord_token)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--top", type=int, default=15, help="modules to list")
+    parser.add_argument("--repeat", type=int, default=15, help="processes to time")
+    parser.add_argument("--connect", action="store_true", help="log in to Discord")
+    args = parser.parse_args()
+
+    report("startup", importtime(defer=True), args.top)
+    report("all extensions", importtime(defer=False), args.top)
+    for title, defer in (("startup", True), ("all extensions", False)):
+        imported, loaded = wall_time(defer, args.repeat)
+        print(
+            f"{title:<15} import {imported * 1e3:6.1f}ms  "
+            f"create and load {loaded * 1e3:6.1f}ms"
+        )
+    if args.connect:
+        connect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Post signed fake interactions to a local interactions server.
+
+    python scripts/post_interaction.py --generate-key
+    python scripts/post_interaction.py --key SIGNING_KEY --ping
+    python scripts/post_interaction.py --key SIGNING_KEY --guild ID --channel ID \\
+        --user ID status address=hypixel.net
+    python scripts/post_interaction.py --key SIGNING_KEY ... settings prefix prefix=!
+
+--generate-key prints a signing key and its public key. Put the public key
+in interactions.public_key and pass the signing key here. The command is its
+name, an optional subcommand and name=value options.
+
+The server fetches the guild and channel over REST, so --guild and --channel
+must belong to a server the bot is in. Use --capture to see the replies. It
+serves a fake webhook API on that port and prints every call the server
+makes. Point interactions.api_base at it, e.g. http://localhost:8081.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import aiohttp
+from aiohttp import web
+from nacl.signing import SigningKey
+
+APPLICATION_COMMAND = 2
+PING = 1
+SUB_COMMAND = 1
+
+
+def options_from_args(words):
+    """Turn ``[sub] name=value ...`` into interaction options."""
+    options = [
+        {"type": 3, "name": name, "value": value}
+        for name, _, value in (word.partition("=") for word in words if "=" in word)
+    ]
+    subcommands = [word for word in words if "=" not in word]
+    if subcommands:
+        return [{"type": SUB_COMMAND, "name": subcommands[0], "options": options}]
+    return options
+
+
+def make_interaction(args) -> dict:
+    interaction_id = str((int(time.time() * 1000) - 1420070400000) << 22)
+    if args.ping:
+        return {"id": interaction_id, "type": PING, "token": "fake"}
+    user = {
+        "id": str(args.user),
+        "username": "tester",
+        "discriminator": "0001",
+        "avatar": None,
+    }
+    data = {
+        "id": interaction_id,
+        "type": APPLICATION_COMMAND,
+        "token": f"fake-{random.getrandbits(64):x}",
+        "channel_id": str(args.channel),
+        "data": {
+            "id": "0",
+            "name": args.command[0],
+            "options": options_from_args(args.command[1:]),
+        },
+    }
+    if args.guild:
+        data["guild_id"] = str(args.guild)
+        data["member"] = {
+            "user": user,
+            "roles": [],
+            "joined_at": "2020-01-01T00:00:00.000000+00:00",
+            "deaf": False,
+            "mute": False,
+            "permissions": str(args.permissions),
+        }
+    else:
+        data["user"] = user
+    return data
+
+
+async def capture(port: int) -> web.AppRunner:
+    """Answer the webhook calls of the server and print them."""
+
+    async def handle(request: web.Request) -> web.Response:
+        if request.content_type.startswith("multipart"):
+            form = await request.post()
+            payload = json.loads(form["payload_json"])
+            files = [name for name in form if name != "payload_json"]
+        else:
+            payload = await request.json() if request.can_read_body else None
+            files = []
+        print(f"<- {request.method} {request.path_qs}")
+        print(json.dumps(payload, indent=2))
+        if files:
+            print(f"   with files {files}")
+        if request.method == "DELETE":
+            return web.Response(status=204)
+        return web.json_response({"id": str(random.getrandbits(60)), **(payload or {})})
+
+    app = web.Application()
+    app.router.add_route("*", "/webhooks/{application}/{token}", handle)
+    app.router.add_route("*", "/webhooks/{application}/{token}/messages/{id}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", port).start()
+    return runner
+
+
+async def post(args) -> None:
+    runner = await capture(args.capture) if args.capture else None
+    key = SigningKey(bytes.fromhex(args.key))
+    body = json.dumps(make_interaction(args)).encode()
+    timestamp = str(int(time.time()))
+    signature = key.sign(timestamp.encode() + body).signature.hex()
+    if args.bad_signature:
+        signature = "00" * 64
+    headers = {
+        "Content-Type": "application/json",
+        "X-Signature-Ed25519": signature,
+        "X-Signature-Timestamp": timestamp,
+    }
+    async with aiohttp.ClientSession() as session:
+        async with session.post(args.url, data=body, headers=headers) as resp:
+            print(f"-> {resp.status}")
+            print(await resp.text())
+    if runner:
+        # give deferred commands time to send their replies
+        await asyncio.sleep(args.wait)
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", nargs="*", help="command, subcommand and options")
+    parser.add_argument("--generate-key", action="store_true")
+    parser.add_argument("--key", help="hex signing key from --generate-key")
+    parser.add_argument("--url", default="http://localhost:8080/interactions")
+    parser.add_argument("--ping", action="store_true", help="send a PING")
+    parser.add_argument("--bad-signature", action="store_true")
+    parser.add_argument("--guild", type=int)
+    parser.add_argument("--channel", type=int, default=0)
+    parser.add_argument("--user", type=int, default=300000000000000000)
+    parser.add_argument(
+        "--permissions", type=int, default=2147483647, help="member permissions"
+    )
+    parser.add_argument("--capture", type=int, help="port for the fake webhook API")
+    parser.add_argument("--wait", type=float, default=15.0)
+    args = parser.parse_args()
+
+    if args.generate_key:
+        key = SigningKey.generate()
+        print(f"signing key: {key.encode().hex()}")
+        print(f"public key:  {key.verify_key.encode().hex()}")
+        return
+    if not args.key or not (args.ping or args.command):
+        parser.error("--key and a command (or --ping) are needed")
+    asyncio.get_event_loop().run_until_complete(post(args))
+
+
+if __name__ == "__main__":
+    main()
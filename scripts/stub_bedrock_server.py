@@ -0,0 +1,152 @@
+"""
+A local Bedrock edition server that only answers unconnected pings, for testing the pinger.
+
+    PYTHONPATH=. python scripts/stub_bedrock_server.py [--port 19132] [--mode normal]
+    PYTHONPATH=. python scripts/stub_bedrock_server.py --self-test
+
+Point the serverpe command at localhost:PORT. --mode picks how the server
+answers, including lost and broken answers the pinger has to survive.
+--self-test starts the server in every mode and pings it with
+obsidion.utils.bedrock_ping.
+"""
+
+import argparse
+import asyncio
+import struct
+
+from obsidion.utils.bedrock_ping import (
+    MAGIC,
+    UNCONNECTED_PING,
+    UNCONNECTED_PONG,
+    PingError,
+    ping_bedrock,
+)
+
+SERVER_ID = [
+    "MCPE",
+    "§aA §lstub§r server",
+    "422",
+    "1.16.201",
+    "3",
+    "20",
+    "1234567890",
+    "Stub world",
+    "Survival",
+]
+
+MODES = {
+    "normal": "a full server id string",
+    "empty-motd": "an empty motd",
+    "short-id": "a server id string with only the edition and motd",
+    "bad-numbers": "player counts that aren't numbers",
+    "drop-first": "ignores the first ping, answers the second",
+    "slow-first": "answers the first ping after the second one is sent",
+    "wrong-timestamp": "echoes a timestamp that was never sent",
+    "silent": "never answers",
+}
+
+
+def server_id_for(mode: str) -> bytes:
+    fields = list(SERVER_ID)
+    if mode == "empty-motd":
+        fields[1] = ""
+    elif mode == "short-id":
+        fields = fields[:2]
+    elif mode == "bad-numbers":
+        fields[4] = "lots"
+    return ";".join(fields).encode("utf-8")
+
+
+def pong(timestamp: bytes, mode: str) -> bytes:
+    server_id = server_id_for(mode)
+    return (
+        bytes([UNCONNECTED_PONG])
+        + timestamp
+        + struct.pack(">q", 1234567890)  # server guid
+        + MAGIC
+        + struct.pack(">H", len(server_id))
+        + server_id
+    )
+
+
+class StubProtocol(asyncio.DatagramProtocol):
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.pings = 0
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        if data[:1] != bytes([UNCONNECTED_PING]) or data[9:25] != MAGIC:
+            return
+        self.pings += 1
+        timestamp = data[1:9]
+        if self.mode == "silent":
+            return
+        if self.mode == "drop-first" and self.pings == 1:
+            return
+        if self.mode == "wrong-timestamp":
+            timestamp = bytes(8)
+        if self.mode == "slow-first":
+            if self.pings == 1:
+                # late enough that the pinger has already sent its retry
+                delay = 1.5
+                asyncio.get_event_loop().call_later(
+                    delay, self.transport.sendto, pong(timestamp, "normal"), addr
+                )
+            return
+        self.transport.sendto(pong(timestamp, self.mode), addr)
+
+
+async def serve(host: str, port: int, mode: str):
+    transport, _protocol = await asyncio.get_event_loop().create_datagram_endpoint(
+        lambda: StubProtocol(mode), local_addr=(host, port)
+    )
+    return transport
+
+
+async def self_test() -> None:
+    for mode, description in MODES.items():
+        transport = await serve("127.0.0.1", 0, mode)
+        port = transport.get_extra_info("sockname")[1]
+        try:
+            data = await ping_bedrock("127.0.0.1", port, timeout=1.0, retries=3)
+        except PingError as e:
+            result = f"PingError: {e}"
+        except Exception as e:
+            result = f"UNHANDLED {e.__class__.__name__}: {e}"
+        else:
+            result = (
+                f"motd={data['motd']!r} "
+                f"players={data['players']['online']}/{data['players']['max']} "
+                f"version={data['software']['version']!r} "
+                f"latency={data['latency']}ms"
+            )
+        finally:
+            transport.close()
+        print(f"{mode:<16} ({description})\n    {result}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=19132)
+    parser.add_argument("--mode", choices=MODES, default="normal")
+    parser.add_argument("--self-test", action="store_true")
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    if args.self_test:
+        loop.run_until_complete(self_test())
+        return
+    loop.run_until_complete(serve(args.host, args.port, args.mode))
+    print(f"Answering pings on {args.host}:{args.port} with {MODES[args.mode]}")
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+A local Java edition server that only answers status pings, for testing the pinger.
+
+    PYTHONPATH=. python scripts/stub_java_server.py [--port 25565] [--mode normal]
+    PYTHONPATH=. python scripts/stub_java_server.py --self-test
+
+Point the server command at localhost:PORT. --mode picks how the server
+answers, including broken answers the pinger has to survive. --self-test
+starts the server in every mode and pings it with obsidion.utils.java_ping.
+"""
+
+import argparse
+import asyncio
+import json
+import struct
+
+from obsidion.utils.java_ping import (
+    PingError,
+    pack_packet,
+    pack_string,
+    ping_java,
+    read_packet,
+    unpack_varint,
+)
+
+STATUS = {
+    "description": {"text": "§aA §lstub§r server"},
+    "players": {"online": 3, "max": 20, "sample": [{"name": "Steve", "id": "0"}]},
+    "version": {"name": "1.16.4", "protocol": 754},
+}
+
+MODES = {
+    "normal": "a full status and a matching pong",
+    "empty-motd": "an empty description",
+    "null-players": '"players": null',
+    "not-object": "a JSON list instead of an object",
+    "bad-json": "a status that is not JSON",
+    "short-pong": "a pong shorter than eight bytes",
+    "no-pong": "closes the connection instead of answering the ping",
+    "legacy": "only the pre 1.7 server list ping",
+}
+
+
+def status_for(mode: str) -> bytes:
+    if mode == "bad-json":
+        return b"{not json"
+    if mode == "not-object":
+        return b"[]"
+    status = dict(STATUS)
+    if mode == "empty-motd":
+        status["description"] = ""
+    elif mode == "null-players":
+        status["players"] = None
+    return json.dumps(status).encode("utf-8")
+
+
+async def answer_legacy(writer: asyncio.StreamWriter) -> None:
+    response = "\x00".join(["§1", "47", "1.4.7", "A legacy stub", "1", "20"])
+    encoded = response.encode("utf-16-be")
+    writer.write(b"\xff" + struct.pack(">H", len(response)) + encoded)
+    await writer.drain()
+
+
+async def handle(mode: str, reader, writer) -> None:
+    try:
+        first = await reader.readexactly(1)
+        if mode == "legacy":
+            await answer_legacy(writer)
+            return
+        if first == b"\xfe":
+            # so a broken modern answer isn't hidden by the legacy retry
+            return
+        # the first byte starts the length of the handshake packet
+        length = bytearray(first)
+        while length[-1] & 0x80:
+            length += await reader.readexactly(1)
+        await reader.readexactly(unpack_varint(length)[0])  # handshake
+        await read_packet(reader)  # status request
+        status = status_for(mode).decode("utf-8")
+        writer.write(pack_packet(0x00, pack_string(status)))
+        await writer.drain()
+
+        _packet_id, payload = await read_packet(reader)
+        if mode == "no-pong":
+            return
+        if mode == "short-pong":
+            payload = payload[:3]
+        writer.write(pack_packet(0x01, payload))
+        await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError, PingError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int, mode: str) -> asyncio.AbstractServer:
+    return await asyncio.start_server(
+        lambda r, w: handle(mode, r, w), host=host, port=port
+    )
+
+
+async def self_test() -> None:
+    for mode, description in MODES.items():
+        server = await serve("127.0.0.1", 0, mode)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            data = await ping_java("127.0.0.1", port, timeout=2.0)
+        except PingError as e:
+            result = f"PingError: {e}"
+        except Exception as e:
+            result = f"UNHANDLED {e.__class__.__name__}: {e}"
+        else:
+            result = (
+                f"description={data['description']!r} "
+                f"players={data['players']['online']}/{data['players']['max']} "
+                f"version={data['version']['name']!r}"
+            )
+        finally:
+            server.close()
+            await server.wait_closed()
+        print(f"{mode:<13} ({description})\n    {result}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=25565)
+    parser.add_argument("--mode", choices=MODES, default="normal")
+    parser.add_argument("--self-test", action="store_true")
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    if args.self_test:
+        loop.run_until_complete(self_test())
+        return
+    server = loop.run_until_complete(serve(args.host, args.port, args.mode))
+    print(f"Answering pings on {args.host}:{args.port} with {MODES[args.mode]}")
+    try:
+        loop.run_until_complete(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()